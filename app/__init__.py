@@ -25,6 +25,27 @@ def create_app(config_name=None):
     Migrate(app, db)
     CORS(app)
     
+    # PRAGMAs do SQLite por conexão (WAL, busy_timeout etc. em produção)
+    from app.services.sqlite_pragmas import register_sqlite_pragmas
+    register_sqlite_pragmas(app, db)
+    
+    # Gravação do SQL executado para o assistente de índices (opcional)
+    from app.services.sql_workload import register_sql_workload
+    register_sql_workload(app, db)
+    
+    # Quantidade e tempo de SQL por requisição (opcional)
+    from app.services.sql_instrumentation import register_sql_instrumentation
+    register_sql_instrumentation(app, db)
+    
+    # Log de consultas lentas com EXPLAIN QUERY PLAN (opcional)
+    from app.services.slow_queries import register_slow_query_log
+    register_slow_query_log(app, db)
+    
+    # Métricas do Prometheus (o prometheus_client só é importado se ligadas)
+    if app.config.get('METRICS_ENABLED'):
+        from app.services.metrics import register_metrics
+        register_metrics(app, db)
+    
     # Configuração do login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
@@ -51,6 +72,38 @@ def create_app(config_name=None):
     app.register_blueprint(finance_bp)
     app.register_blueprint(schedule_bp)
     
+    # Manutenção incremental dos agregados diários do dashboard
+    from app.services.rollup import register_rollup_listeners
+    register_rollup_listeners()
+    
+    # Invalidação do cache de totais do estoque
+    from app.services.stock import register_stock_listeners
+    register_stock_listeners()
+    
+    # Invalidação dos totais cacheados da paginação
+    from app.services.pagination import register_pagination_listeners
+    register_pagination_listeners()
+    
+    # Invalidação do cache do usuário autenticado
+    from app.services.user_cache import register_user_cache_listeners
+    register_user_cache_listeners()
+    
+    # Índices de busca textual (FTS5) criados junto com as tabelas
+    from app.services.search import register_search_indexes
+    register_search_indexes()
+    
+    # Configurações do sistema em cache (invalidadas pelo contador de versão)
+    from app.services.settings import register_settings
+    register_settings(app)
+    
+    # Índice de trigramas dos produtos para o typeahead do ponto de venda
+    from app.services.typeahead import register_typeahead
+    register_typeahead(app)
+    
+    # Opções dos campos de seleção remota (clientes e produtos) em cache
+    from app.services.lookups import register_lookups
+    register_lookups(app)
+    
     # Criação das tabelas (apenas em desenvolvimento)
     if app.config.get('DEBUG', False):
         with app.app_context():
@@ -3,5 +3,5 @@ from app.models.crm import Customer, Sale, SaleItem
 from app.models.inventory import Product, Category, StockMovement
 from app.models.finance import Transaction, Account, Invoice
 from app.models.schedule import Appointment, Event
-from app.models.settings import SystemSettings, EmailSettings, BackupSettings
-
+from app.models.settings import SystemSettings, EmailSettings, BackupSettings, SettingsVersion
+from app.models.rollup import DailyKPI, DailyCustomerSales
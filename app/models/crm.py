@@ -1,9 +1,29 @@
 from app import db
+from app.services.normalize import normalize_name
 from datetime import datetime
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import validates
+
+def _name_key_default(context):
+    return normalize_name(context.get_current_parameters().get('name'))
+
+def _digits(column):
+    """Expressão SQL com só os dígitos (mesma regra de normalize_digits para os formatos usuais)"""
+    expression = column
+    for char in ' ()-+./':
+        # literal_column: o índice e as consultas precisam gerar o mesmo SQL
+        expression = func.replace(expression, literal_column(f"'{char}'"), literal_column("''"))
+    return expression
+
+def _instagram(column):
+    """Expressão SQL sem o @ inicial e em minúsculas (normalize_instagram)"""
+    return func.lower(func.ltrim(column, literal_column("'@'")))
 
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # Nome normalizado (sem acentos, minúsculo) para buscas exatas indexadas
+    name_key = db.Column(db.String(100), default=_name_key_default)
     email = db.Column(db.String(120), unique=False)
     phone = db.Column(db.String(20))
     instagram = db.Column(db.String(100))
@@ -21,9 +41,35 @@ class Customer(db.Model):
     sales = db.relationship('Sale', backref='customer', lazy=True)
     appointments = db.relationship('Appointment', backref='customer', lazy=True)
     
+    # Sincronização incremental da API (?updated_since=, ordenada por updated_at, id)
+    # e buscas exatas de CUSTOMER_LOOKUPS (as mesmas expressões, para o SQLite usar os índices)
+    __table_args__ = (
+        db.Index('ix_customer_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_customer_name_key', 'name_key'),
+        db.Index('ix_customer_email_key', func.lower(email)),
+        db.Index('ix_customer_phone_key', _digits(phone)),
+        db.Index('ix_customer_instagram_key', _instagram(instagram)),
+        db.Index('ix_customer_cpf_cnpj_key', _digits(cpf_cnpj)),
+    )
+    
+    @validates('name')
+    def _sync_name_key(self, key, value):
+        self.name_key = normalize_name(value)
+        return value
+    
     def __repr__(self):
         return f'<Customer {self.name}>'
 
+# Expressão indexada (ver __table_args__) de cada campo de busca de clientes;
+# o valor procurado passa pela normalização equivalente de app/services/normalize.py
+CUSTOMER_LOOKUPS = {
+    'name': Customer.name_key,
+    'email': func.lower(Customer.email),
+    'phone': _digits(Customer.phone),
+    'instagram': _instagram(Customer.instagram),
+    'cpf_cnpj': _digits(Customer.cpf_cnpj),
+}
+
 class Sale(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
@@ -39,6 +85,12 @@ class Sale(db.Model):
     # Relacionamentos
     items = db.relationship('SaleItem', backref='sale', lazy=True, cascade='all, delete-orphan')
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_sale_sale_date', 'sale_date'),
+        db.Index('ix_sale_customer_id_sale_date', 'customer_id', 'sale_date'),
+    )
+    
     def __repr__(self):
         return f'<Sale {self.id}>'
 
@@ -50,6 +102,12 @@ class SaleItem(db.Model):
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
     
+    # Itens por venda e vendas por produto
+    __table_args__ = (
+        db.Index('ix_sale_item_sale_id', 'sale_id'),
+        db.Index('ix_sale_item_product_id', 'product_id'),
+    )
+    
     def __repr__(self):
         return f'<SaleItem {self.id}>'
 
@@ -34,6 +34,14 @@ class Transaction(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_transaction_status_type_date', 'status', 'transaction_type', 'transaction_date'),
+        db.Index('ix_transaction_account_id_date', 'account_id', 'transaction_date'),
+        db.Index('ix_transaction_transaction_date', 'transaction_date'),
+        db.Index('ix_transaction_created_at', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Transaction {self.id}>'
 
@@ -51,6 +59,15 @@ class Invoice(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Relacionamentos
+    customer = db.relationship('Customer', lazy=True)
+    
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_invoice_status_due_date', 'status', 'due_date'),
+        db.Index('ix_invoice_issue_date', 'issue_date'),
+    )
+    
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
     
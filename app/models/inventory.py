@@ -36,6 +36,13 @@ class Product(db.Model):
     stock_movements = db.relationship('StockMovement', backref='product', lazy=True)
     sale_items = db.relationship('SaleItem', backref='product', lazy=True)
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_product_is_active_category_id', 'is_active', 'category_id'),
+        db.Index('ix_product_category_id', 'category_id'),
+        db.Index('ix_product_name', 'name'),
+    )
+    
     def __repr__(self):
         return f'<Product {self.name}>'
 
@@ -81,6 +88,12 @@ class StockMovement(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     movement_date = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_id_date', 'product_id', 'movement_date'),
+        db.Index('ix_stock_movement_movement_date', 'movement_date'),
+    )
+    
     def __repr__(self):
         return f'<StockMovement {self.id}>'
 
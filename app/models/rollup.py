@@ -0,0 +1,31 @@
+from app import db
+from datetime import datetime
+
+class DailyKPI(db.Model):
+    """Agregados diários usados pelo dashboard (mantidos incrementalmente)"""
+    __tablename__ = 'daily_kpi'
+
+    day = db.Column(db.Date, primary_key=True)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    sales_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    new_customers = db.Column(db.Integer, nullable=False, default=0)
+    new_products = db.Column(db.Integer, nullable=False, default=0)
+    income_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # receitas concluídas
+    expense_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # despesas concluídas
+    stock_value_change = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # variação do valor do estoque no dia
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DailyKPI {self.day}>'
+
+class DailyCustomerSales(db.Model):
+    """Total vendido por cliente e por dia (base do ranking de clientes)"""
+    __tablename__ = 'daily_customer_sales'
+
+    day = db.Column(db.Date, primary_key=True)
+    customer_id = db.Column(db.Integer, primary_key=True)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    sales_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyCustomerSales {self.day} {self.customer_id}>'
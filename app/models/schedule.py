@@ -16,6 +16,11 @@ class Event(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_event_user_id_start_date', 'user_id', 'start_date'),
+    )
+    
     def __repr__(self):
         return f'<Event {self.title}>'
 
@@ -34,6 +39,13 @@ class Appointment(db.Model):
     reminder_sent = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Índices dos filtros e ordenações mais usados nas listagens
+    __table_args__ = (
+        db.Index('ix_appointment_status_date', 'status', 'appointment_date'),
+        db.Index('ix_appointment_appointment_date', 'appointment_date'),
+        db.Index('ix_appointment_customer_id', 'customer_id'),
+    )
+    
     def __repr__(self):
         return f'<Appointment {self.title}>'
 
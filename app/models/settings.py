@@ -41,3 +41,14 @@ class BackupSettings(db.Model):
     def __repr__(self):
         return f'<BackupSettings {self.frequency}>'
 
+
+class SettingsVersion(db.Model):
+    """Contador incrementado a cada gravação das configurações (invalida o cache dos workers)"""
+    __tablename__ = 'settings_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SettingsVersion {self.version}>'
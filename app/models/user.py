@@ -26,6 +26,8 @@ class User(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    # Cache por processo, invalidado quando o usuário é alterado
+    from app.services.user_cache import cached_user
+    return cached_user(int(id))
 
 
@@ -1,10 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
 from flask_login import login_required, current_user
 from app.models.crm import Customer, Sale, SaleItem
-from app.models.inventory import Product
 from app import db
 from datetime import datetime
 from sqlalchemy import func
+from app.services.export import export_response
+from app.services.customer_api import api_authorized, customers_response, lookup_customers, lookup_response
+from app.services.lookups import lookup_option
+from app.services.pagination import paginate_request, pagination_args
+
+# Chaves de ordenação (keyset) das listagens; o id desempata
+CUSTOMER_SORT_KEYS = [(Customer.name, False), (Customer.id, False)]
+SALE_SORT_KEYS = [(Sale.sale_date, True), (Sale.id, True)]
 
 crm_bp = Blueprint('crm', __name__, url_prefix='/crm')
 
@@ -17,11 +24,39 @@ def index():
 @crm_bp.route('/customers')
 @login_required
 def customers():
-    page = request.args.get('page', 1, type=int)
-    customers = Customer.query.paginate(
-        page=page, per_page=20, error_out=False
+    pagination = paginate_request(Customer.query, CUSTOMER_SORT_KEYS, per_page=20)
+    return render_template('crm/customers.html',
+                         customers=pagination.items,
+                         pagination=pagination,
+                         current_args=pagination_args(request.args))
+
+@crm_bp.route('/customers/export')
+@login_required
+def export_customers():
+    query = db.session.query(
+        Customer.id,
+        Customer.name,
+        Customer.email,
+        Customer.phone,
+        Customer.instagram,
+        Customer.company,
+        Customer.cpf_cnpj,
+        Customer.address,
+        Customer.city,
+        Customer.state,
+        Customer.zip_code,
+        Customer.status,
+        Customer.created_at
     )
-    return render_template('crm/customers.html', customers=customers)
+    
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Customer.status == status)
+    
+    header = ['ID', 'Nome', 'Email', 'Telefone', 'Instagram', 'Empresa', 'CPF/CNPJ',
+              'Endereço', 'Cidade', 'Estado', 'CEP', 'Status', 'Cadastrado em']
+    return export_response('clientes', request.args.get('format', 'csv'),
+                           header, query.order_by(Customer.id), title='Clientes')
 
 @crm_bp.route('/customers/new', methods=['GET', 'POST'])
 @login_required
@@ -103,11 +138,44 @@ def edit_customer(id):
 @crm_bp.route('/sales')
 @login_required
 def sales():
-    page = request.args.get('page', 1, type=int)
-    sales_pagination = Sale.query.order_by(Sale.sale_date.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
-    return render_template('crm/sales.html', sales=sales_pagination.items, pagination=sales_pagination)
+    sales_pagination = paginate_request(Sale.query, SALE_SORT_KEYS, per_page=20)
+    return render_template('crm/sales.html',
+                         sales=sales_pagination.items,
+                         pagination=sales_pagination,
+                         current_args=pagination_args(request.args))
+
+@crm_bp.route('/sales/export')
+@login_required
+def export_sales():
+    query = db.session.query(
+        Sale.id,
+        Sale.sale_date,
+        Customer.name,
+        Sale.status,
+        Sale.payment_method,
+        Sale.discount,
+        Sale.tax,
+        Sale.total_amount,
+        Sale.notes
+    ).join(Customer, Customer.id == Sale.customer_id)
+    
+    # Período opcional (mesmos parâmetros do relatório de vendas)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if start_date and end_date:
+        query = query.filter(
+            Sale.sale_date >= start_date,
+            Sale.sale_date <= end_date
+        )
+    
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Sale.status == status)
+    
+    header = ['ID', 'Data', 'Cliente', 'Status', 'Forma de Pagamento',
+              'Desconto', 'Impostos', 'Total', 'Observações']
+    return export_response('vendas', request.args.get('format', 'csv'), header,
+                           query.order_by(Sale.sale_date.desc(), Sale.id.desc()), title='Vendas')
 
 @crm_bp.route('/sales/new', methods=['GET', 'POST'])
 @login_required
@@ -137,11 +205,10 @@ def new_sale():
         flash('Venda registrada com sucesso!', 'success')
         return redirect(url_for('crm.sales'))
     
-    customers = Customer.query.filter_by(status='active').all()
-    products = Product.query.filter_by(is_active=True).all()
+    # Clientes e produtos são buscados sob demanda (main.lookup e
+    # inventory.product_typeahead); só o cliente já escolhido vai na página
     return render_template('crm/new_sale.html', 
-                         customers=customers, 
-                         products=products,
+                         selected_customer=lookup_option('customers', request.args.get('customer_id', type=int)),
                          today=datetime.now().strftime('%Y-%m-%d'))
 
 @crm_bp.route('/sales/<int:id>')
@@ -244,45 +311,27 @@ def reports():
 # API Endpoints
 @crm_bp.route('/api/customers', methods=['GET'])
 def api_get_customers():
-    customers = Customer.query.all()
-    return jsonify([
-        {
-            'id': c.id,
-            'name': c.name,
-            'email': c.email,
-            'phone': c.phone,
-            'instagram': c.instagram,
-            'address': c.address,
-            'city': c.city,
-            'state': c.state,
-            'zip_code': c.zip_code,
-            'company': c.company,
-            'cpf_cnpj': c.cpf_cnpj,
-            'status': c.status,
-            'created_at': c.created_at.isoformat(),
-            'updated_at': c.updated_at.isoformat()
-        } for c in customers
-    ])
+    # Paginada por cursor, com ?fields=, ?updated_since= e ?format=ndjson
+    if not api_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return customers_response()
+
+@crm_bp.route('/api/customers/lookup', methods=['GET'])
+def api_lookup_customers():
+    # Busca exata e indexada por name, email, phone, instagram ou cpf_cnpj
+    if not api_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return lookup_response()
 
 @crm_bp.route('/api/customers/<string:name>', methods=['GET'])
 def api_get_customer(name):
-    customer = Customer.query.filter_by(name=name).first_or_404()
-    return jsonify({
-        'id': customer.id,
-        'name': customer.name,
-        'email': customer.email,
-        'phone': customer.phone,
-        'instagram': customer.instagram,
-        'address': customer.address,
-        'city': customer.city,
-        'state': customer.state,
-        'zip_code': customer.zip_code,
-        'company': customer.company,
-        'cpf_cnpj': customer.cpf_cnpj,
-        'status': customer.status,
-        'created_at': customer.created_at.isoformat(),
-        'updated_at': customer.updated_at.isoformat()
-    })
+    # Mantida para integrações existentes: nome sem diferenciar maiúsculas e acentos
+    if not api_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    customers = lookup_customers('name', name, limit=1)
+    if not customers:
+        abort(404)
+    return jsonify(customers[0])
 
 @crm_bp.route('/api/customers', methods=['POST'])
 def api_create_customer():
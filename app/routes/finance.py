@@ -3,8 +3,21 @@ from flask_login import login_required, current_user
 from app.models.finance import Transaction, Account, Invoice
 from app.models.crm import Customer, Sale
 from app import db
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app.services.finance_reports import (
+    report_groups, report_totals, detail_query, cash_flow,
+    DETAIL_KEYS, DETAIL_PER_PAGE, NO_CATEGORY,
+)
+from app.services.pagination import paginate_request, pagination_args
+from app.services.export import export_response
+from app.services.search import search_filter
+from app.services.settings import get_settings, local_today
+
+# Chaves de ordenação (keyset) das listagens; o id desempata
+TRANSACTION_SORT_KEYS = [(Transaction.transaction_date, True), (Transaction.id, True)]
+INVOICE_SORT_KEYS = [(Invoice.issue_date, True), (Invoice.id, True)]
 
 finance_bp = Blueprint('finance', __name__, url_prefix='/finance')
 
@@ -39,37 +52,27 @@ def index():
                          recent_transactions=recent_transactions,
                          accounts=accounts)
 
-@finance_bp.route('/transactions')
-@login_required
-def transactions():
-    page = request.args.get('page', 1, type=int)
+def _filter_transactions(query, args):
+    """Filtros da listagem de transações (também usados na exportação)"""
+    condition = search_filter('transactions', Transaction.id, args.get('search'))
+    if condition is not None:
+        query = query.filter(condition)
     
-    # Query base
-    query = Transaction.query
-    
-    # Aplicar filtros
-    search = request.args.get('search')
-    if search:
-        query = query.filter(
-            Transaction.description.contains(search) | 
-            Transaction.reference.contains(search)
-        )
-    
-    transaction_type = request.args.get('type')
+    transaction_type = args.get('type')
     if transaction_type:
         query = query.filter(Transaction.transaction_type == transaction_type)
     
-    account_id = request.args.get('account', type=int)
+    account_id = args.get('account', type=int)
     if account_id:
         query = query.filter(Transaction.account_id == account_id)
     
-    status = request.args.get('status')
+    status = args.get('status')
     if status:
         query = query.filter(Transaction.status == status)
     
-    date_range = request.args.get('date_range')
+    date_range = args.get('date_range')
     if date_range:
-        today = date.today()
+        today = local_today()
         if date_range == 'today':
             query = query.filter(Transaction.transaction_date == today)
         elif date_range == 'week':
@@ -84,11 +87,19 @@ def transactions():
         elif date_range == 'year':
             year_ago = today - timedelta(days=365)
             query = query.filter(Transaction.transaction_date >= year_ago)
+    return query
+
+@finance_bp.route('/transactions')
+@login_required
+def transactions():
+    # Query base
+    query = Transaction.query
     
-    # Paginação
-    transactions_pagination = query.order_by(
-        Transaction.transaction_date.desc()
-    ).paginate(page=page, per_page=20, error_out=False)
+    # Aplicar filtros
+    query = _filter_transactions(query, request.args)
+    
+    # Paginação por keyset
+    transactions_pagination = paginate_request(query, TRANSACTION_SORT_KEYS, per_page=20)
     
     # Calcular resumo
     total_revenue = db.session.query(func.sum(Transaction.amount)).filter(
@@ -120,9 +131,36 @@ def transactions():
     return render_template('finance/transactions.html', 
                          transactions=transactions_pagination.items,
                          pagination=transactions_pagination,
+                         current_args=pagination_args(request.args),
                          accounts=accounts,
                          summary=summary)
 
+@finance_bp.route('/transactions/export')
+@login_required
+def export_transactions():
+    # Mesmos filtros da listagem, lidos direto do banco em lotes
+    query = db.session.query(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.transaction_type,
+        Transaction.category,
+        Transaction.description,
+        Account.name,
+        Transaction.amount,
+        Transaction.status,
+        Transaction.payment_method,
+        Transaction.reference,
+        Transaction.due_date
+    ).join(Account, Account.id == Transaction.account_id)
+    query = _filter_transactions(query, request.args).order_by(
+        Transaction.transaction_date.desc(), Transaction.id.desc()
+    )
+    
+    header = ['ID', 'Data', 'Tipo', 'Categoria', 'Descrição', 'Conta', 'Valor',
+              'Status', 'Forma de Pagamento', 'Referência', 'Vencimento']
+    return export_response('transacoes', request.args.get('format', 'csv'),
+                           header, query, title='Transações')
+
 @finance_bp.route('/transactions/new', methods=['GET', 'POST'])
 @login_required
 def new_transaction():
@@ -142,41 +180,41 @@ def new_transaction():
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             
             if not transaction_type:
                 flash('Selecione o tipo de transação!', 'error')
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             
             if not description:
                 flash('A descrição é obrigatória!', 'error')
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             
             if not amount:
                 flash('O valor é obrigatório!', 'error')
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             if float(amount) <= 0:
                 flash('O valor deve ser maior que zero!', 'error')
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             
             if not transaction_date:
                 flash('A data da transação é obrigatória!', 'error')
                 accounts = Account.query.filter_by(is_active=True).all()
                 return render_template('finance/new_transaction.html', 
                                      accounts=accounts,
-                                     today=datetime.now().strftime('%Y-%m-%d'))
+                                     today=local_today().isoformat())
             
             # Processar data de vencimento
             due_date = None
@@ -188,7 +226,7 @@ def new_transaction():
                     accounts = Account.query.filter_by(is_active=True).all()
                     return render_template('finance/new_transaction.html', 
                                          accounts=accounts,
-                                         today=datetime.now().strftime('%Y-%m-%d'))
+                                         today=local_today().isoformat())
             
             transaction = Transaction(
                 account_id=account_id,
@@ -222,7 +260,7 @@ def new_transaction():
     accounts = Account.query.filter_by(is_active=True).all()
     return render_template('finance/new_transaction.html', 
                          accounts=accounts,
-                         today=datetime.now().strftime('%Y-%m-%d'))
+                         today=local_today().isoformat())
 
 @finance_bp.route('/transactions/<int:id>')
 @login_required
@@ -351,14 +389,12 @@ def account_detail(id):
 @finance_bp.route('/invoices')
 @login_required
 def invoices():
-    page = request.args.get('page', 1, type=int)
-    invoices_pagination = Invoice.query.order_by(Invoice.issue_date.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    invoices_pagination = paginate_request(Invoice.query, INVOICE_SORT_KEYS, per_page=20)
     return render_template('finance/invoices.html', 
                          invoices=invoices_pagination.items,
                          pagination=invoices_pagination,
-                         today=date.today())
+                         current_args=pagination_args(request.args),
+                         today=local_today())
 
 @finance_bp.route('/invoices/new', methods=['GET', 'POST'])
 @login_required
@@ -388,78 +424,57 @@ def new_invoice():
         return redirect(url_for('finance.invoices'))
     
     sales = Sale.query.filter_by(status='completed').all()
+    today = local_today()
     return render_template('finance/new_invoice.html', 
                          sales=sales,
-                         today=date.today())
+                         today=today,
+                         due_date=today + timedelta(days=get_settings().invoice_due_days))
 
 @finance_bp.route('/reports')
 @login_required
 def reports():
     # Relatório de receitas e despesas por período
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    account_id = request.args.get('account_id')
-    transaction_type = request.args.get('transaction_type')
-    
-    # Query base para transações
-    query = Transaction.query
+    filters = {
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+        'account_id': request.args.get('account_id'),
+        'transaction_type': request.args.get('transaction_type'),
+    }
     
-    # Aplicar filtros
-    if start_date and end_date:
-        query = query.filter(
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
+    # Totais agrupados por tipo, status, conta e categoria (calculados no banco)
+    groups = report_groups(**filters)
+    totals = report_totals(groups)
+    
+    # Detalhamento: transações de um grupo, paginadas, só quando solicitado
+    detail = None
+    if request.args.get('detail'):
+        query = detail_query(
+            detail_type=request.args.get('detail_type'),
+            detail_status=request.args.get('detail_status'),
+            detail_account=request.args.get('detail_account'),
+            detail_category=request.args.get('detail_category'),
+            **filters
         )
-    
-    if account_id:
-        query = query.filter(Transaction.account_id == account_id)
-    
-    if transaction_type:
-        query = query.filter(Transaction.transaction_type == transaction_type)
-    
-    # Buscar transações
-    transactions = query.all()
-    
-    # Separar receitas e despesas
-    income_report = [t for t in transactions if t.transaction_type == 'receita']
-    expense_report = [t for t in transactions if t.transaction_type == 'despesa']
-    
-    # Calcular totais
-    total_income = sum(t.amount for t in income_report if t.status == 'completed')
-    total_expenses = sum(t.amount for t in expense_report if t.status == 'completed')
-    net_income = total_income - total_expenses
-    total_transactions = len(transactions)
+        detail = paginate_request(query, DETAIL_KEYS, per_page=DETAIL_PER_PAGE)
     
     # Faturas vencidas
-    overdue_invoices = Invoice.query.filter(
+    overdue_invoices = Invoice.query.options(joinedload(Invoice.customer)).filter(
         Invoice.status == 'pending',
-        Invoice.due_date < date.today()
-    ).all()
-    
-    # Fluxo de caixa
-    cash_flow = db.session.query(
-        func.date(Transaction.transaction_date).label('date'),
-        func.sum(Transaction.amount).label('amount')
-    ).filter(
-        Transaction.status == 'completed'
-    ).group_by(
-        func.date(Transaction.transaction_date)
-    ).order_by(
-        func.date(Transaction.transaction_date)
+        Invoice.due_date < local_today()
     ).all()
     
     # Contas para filtro
     accounts = Account.query.all()
     
     return render_template('finance/reports.html',
-                         income_report=income_report,
-                         expense_report=expense_report,
+                         groups=groups,
+                         detail=detail,
+                         current_args=pagination_args(request.args),
+                         filter_args={key: value for key, value in filters.items() if value},
+                         no_category=NO_CATEGORY,
                          overdue_invoices=overdue_invoices,
-                         cash_flow=cash_flow,
-                         total_income=total_income,
-                         total_expenses=total_expenses,
-                         net_income=net_income,
-                         total_transactions=total_transactions,
+                         cash_flow=cash_flow(),
                          accounts=accounts,
-                         today=date.today())
+                         today=local_today(),
+                         **totals)
 
@@ -2,57 +2,25 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from flask_login import login_required, current_user
 from app.models.inventory import Product, Category, StockMovement
 from app import db
-from datetime import datetime
+from app.services.stock import stock_totals, move_stock, bulk_move_stock, StockError, BulkStockError
+from app.services.pagination import paginate_request, pagination_args
+from app.services.export import export_response
+from app.services.search import ranked_search
+from app.services.typeahead import search_products, TYPEAHEAD_LIMIT
+from app.services.lookups import lookup_option
+from app.services.settings import get_settings
+from datetime import datetime, timedelta
 from sqlalchemy import func, or_
-from urllib.parse import urlencode
 
-def create_pagination_urls(base_url, current_args, page):
-    """Cria URLs de paginação preservando todos os filtros"""
-    args = current_args.copy()
-    args['page'] = page
-    return f"{base_url}?{urlencode(args)}"
+# Chaves de ordenação (keyset) por opção de ordenação; o id desempata
+PRODUCT_SORT_KEYS = {
+    'name': [(Product.name, False), (Product.id, False)],
+    'price': [(func.coalesce(Product.sale_price, 0), False), (Product.id, False)],
+    'stock': [(func.coalesce(Product.current_stock, 0), False), (Product.id, False)],
+    'created_at': [(Product.created_at, True), (Product.id, True)],
+}
 
-def create_pagination(query, page, per_page):
-    """Função utilitária para criar paginação compatível com Flask-SQLAlchemy 3.0.5"""
-    # Contar total de registros
-    total = query.count()
-    
-    # Calcular offset
-    offset = (page - 1) * per_page
-    
-    # Buscar itens paginados
-    items = query.offset(offset).limit(per_page).all()
-    
-    # Criar objeto de paginação
-    class Pagination:
-        def __init__(self, items, page, per_page, total):
-            self.items = items
-            self.page = page
-            self.per_page = per_page
-            self.total = total
-            self.pages = (total + per_page - 1) // per_page if total > 0 else 0
-            self.has_prev = page > 1
-            self.has_next = page < self.pages
-            self.prev_num = page - 1 if self.has_prev else None
-            self.next_num = page + 1 if self.has_next else None
-        
-        def iter_pages(self, left_edge=2, left_current=2, right_current=5, right_edge=2):
-            """Método para iterar sobre as páginas da paginação"""
-            if self.pages == 0:
-                return
-                
-            last = 0
-            for num in range(1, self.pages + 1):
-                if (num <= left_edge or 
-                    (num > self.page - left_current - 1 and 
-                     num < self.page + right_current) or 
-                    num > self.pages - right_edge):
-                    if last + 1 != num:
-                        yield None
-                    yield num
-                    last = num
-    
-    return Pagination(items, page, per_page, total)
+MOVEMENT_SORT_KEYS = [(StockMovement.movement_date, True), (StockMovement.id, True)]
 
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
@@ -77,26 +45,16 @@ def products():
         category_id = request.args.get('category', type=int)
         status = request.args.get('status', '')
         stock_status = request.args.get('stock_status', '')
-        sort = request.args.get('sort', 'name')
-        page = request.args.get('page', 1, type=int)
+        sort = request.args.get('sort') or ('relevance' if search else 'name')
         per_page = 20
         
-        # Debug: imprimir parâmetros recebidos
-        print(f"DEBUG - Filtros recebidos: search='{search}', category_id={category_id}, status='{status}', stock_status='{stock_status}', sort='{sort}', page={page}")
-        
         # Query base
         query = Product.query
         
-        # Aplicar filtros
+        # Aplicar filtros (busca textual por prefixo, com a relevância de cada produto)
+        rank = None
         if search:
-            query = query.filter(
-                or_(
-                    Product.name.ilike(f'%{search}%'),
-                    Product.sku.ilike(f'%{search}%'),
-                    Product.barcode.ilike(f'%{search}%'),
-                    Product.description.ilike(f'%{search}%')
-                )
-            )
+            query, rank = ranked_search(query, 'products', search)
         
         if category_id:
             query = query.filter(Product.category_id == category_id)
@@ -127,39 +85,23 @@ def products():
                 )
             )
         
-        # Ordenação
-        if sort == 'name':
-            query = query.order_by(Product.name.asc())
-        elif sort == 'price':
-            query = query.order_by(Product.sale_price.asc())
-        elif sort == 'stock':
-            query = query.order_by(Product.current_stock.asc())
-        elif sort == 'created_at':
-            query = query.order_by(Product.created_at.desc())
+        # Ordenação + paginação por keyset; com busca, o padrão é a relevância
+        if rank is not None and sort == 'relevance':
+            sort_keys = [(rank, False), (Product.id, False)]
         else:
-            query = query.order_by(Product.name.asc())
-        
-        # Usar função utilitária para paginação
-        pagination = create_pagination(query, page, per_page)
+            sort_keys = PRODUCT_SORT_KEYS.get(sort, PRODUCT_SORT_KEYS['name'])
+        pagination = paginate_request(query, sort_keys, per_page)
         
         # Buscar categorias para o filtro
         categories = Category.query.all()
         
-        # Criar URLs de paginação preservando filtros
-        base_url = url_for('inventory.products')
-        current_args = dict(request.args)
-        if 'page' in current_args:
-            del current_args['page']
-        
-        # Debug: imprimir resultados
-        print(f"DEBUG - Total de produtos encontrados: {pagination.total}")
-        print(f"DEBUG - Produtos na página atual: {len(pagination.items)}")
+        # Filtros preservados nos links de paginação
+        current_args = pagination_args(request.args)
         
         return render_template('inventory/products.html',
                               products=pagination.items,
                               pagination=pagination,
                               categories=categories,
-                              base_url=base_url,
                               current_args=current_args)
     
     except Exception as e:
@@ -188,7 +130,7 @@ def new_product():
             current_stock = int(current_stock) if current_stock else 0
             
             min_stock = request.form.get('min_stock')
-            min_stock = int(min_stock) if min_stock else 0
+            min_stock = int(min_stock) if min_stock else get_settings().low_stock_threshold
             
             max_stock = request.form.get('max_stock')
             max_stock = int(max_stock) if max_stock else 0
@@ -379,21 +321,89 @@ def delete_category(id):
     flash('Categoria excluída com sucesso!', 'success')
     return redirect(url_for('inventory.categories'))
 
+def _filter_movements(query, args):
+    """
+    Filtros da listagem de movimentações (também usados na exportação).
+    A consulta deve ter o Product já unido para a busca por nome/SKU.
+    """
+    search = args.get('search')
+    if search:
+        query = query.filter(
+            or_(
+                Product.name.ilike(f'%{search}%'),
+                Product.sku.ilike(f'%{search}%'),
+                StockMovement.reference.ilike(f'%{search}%')
+            )
+        )
+    
+    movement_type = args.get('movement_type')
+    if movement_type:
+        query = query.filter(StockMovement.movement_type == movement_type)
+    
+    date_from = _parse_date(args.get('date_from'))
+    if date_from:
+        query = query.filter(StockMovement.movement_date >= date_from)
+    
+    date_to = _parse_date(args.get('date_to'))
+    if date_to:
+        query = query.filter(StockMovement.movement_date < date_to + timedelta(days=1))
+    return query
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
 @inventory_bp.route('/movements')
 @login_required
 def movements():
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     # Query base
-    query = StockMovement.query.order_by(StockMovement.movement_date.desc())
+    query = StockMovement.query.join(Product, Product.id == StockMovement.product_id)
+    query = _filter_movements(query, request.args)
     
-    # Usar função utilitária para paginação
-    pagination = create_pagination(query, page, per_page)
+    # Paginação por keyset (mais recentes primeiro)
+    pagination = paginate_request(query, MOVEMENT_SORT_KEYS, per_page)
     
     return render_template('inventory/movements.html', 
                          movements=pagination.items,
-                         pagination=pagination)
+                         pagination=pagination,
+                         current_args=pagination_args(request.args))
+
+@inventory_bp.route('/movements/export')
+@login_required
+def export_movements():
+    query = db.session.query(
+        StockMovement.id,
+        StockMovement.movement_date,
+        Product.sku,
+        Product.name,
+        StockMovement.movement_type,
+        StockMovement.quantity,
+        StockMovement.previous_stock,
+        StockMovement.new_stock,
+        StockMovement.unit_cost,
+        StockMovement.total_cost,
+        StockMovement.reference,
+        StockMovement.notes
+    ).select_from(StockMovement).join(Product, Product.id == StockMovement.product_id)
+    query = _filter_movements(query, request.args)
+    
+    header = ['ID', 'Data', 'SKU', 'Produto', 'Tipo', 'Quantidade', 'Estoque Anterior',
+              'Estoque Novo', 'Custo Unitário', 'Custo Total', 'Referência', 'Observações']
+    return export_response('movimentacoes', request.args.get('format', 'csv'), header,
+                           query.order_by(StockMovement.movement_date.desc(), StockMovement.id.desc()),
+                           title='Movimentações')
+
+def _new_movement_form():
+    # Só o produto já escolhido vai para a página; os demais são buscados
+    # em /lookups/products
+    product_id = request.form.get('product_id', type=int) or request.args.get('product_id', type=int)
+    return render_template('inventory/new_movement.html',
+                           selected_product=lookup_option('products', product_id),
+                           now=datetime.now())
 
 @inventory_bp.route('/movements/new', methods=['GET', 'POST'])
 @login_required
@@ -409,48 +419,20 @@ def new_movement():
             
             if not product_id:
                 flash('Selecione um produto!', 'error')
-                products = Product.query.filter_by(is_active=True).all()
-                return render_template('inventory/new_movement.html', 
-                                     products=products,
-                                     now=datetime.now())
-            
-            product = Product.query.get(product_id)
-            if not product:
-                flash('Produto não encontrado!', 'error')
-                products = Product.query.filter_by(is_active=True).all()
-                return render_template('inventory/new_movement.html', 
-                                     products=products,
-                                     now=datetime.now())
+                return _new_movement_form()
             
             if quantity <= 0:
                 flash('A quantidade deve ser maior que zero!', 'error')
-                products = Product.query.filter_by(is_active=True).all()
-                return render_template('inventory/new_movement.html', 
-                                     products=products,
-                                     now=datetime.now())
+                return _new_movement_form()
             
-            previous_stock = product.current_stock
+            # Atualização atômica do saldo (sem ler-modificar-gravar)
+            try:
+                previous_stock, new_stock = move_stock(int(product_id), movement_type, quantity)
+            except StockError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
+                return _new_movement_form()
             
-            if movement_type == 'entrada':
-                product.current_stock += quantity
-            elif movement_type == 'saida':
-                if product.current_stock < quantity:
-                    flash('Estoque insuficiente!', 'error')
-                    products = Product.query.filter_by(is_active=True).all()
-                    return render_template('inventory/new_movement.html', 
-                                         products=products,
-                                         now=datetime.now())
-                product.current_stock -= quantity
-            elif movement_type == 'ajuste':
-                product.current_stock = quantity
-            else:
-                flash('Tipo de movimentação inválido!', 'error')
-                products = Product.query.filter_by(is_active=True).all()
-                return render_template('inventory/new_movement.html', 
-                                     products=products,
-                                     now=datetime.now())
-            
-            new_stock = product.current_stock
             total_cost = quantity * unit_cost
             
             movement = StockMovement(
@@ -480,10 +462,56 @@ def new_movement():
             db.session.rollback()
             print(f"Erro detalhado no movimento: {e}")
     
-    products = Product.query.filter_by(is_active=True).all()
-    return render_template('inventory/new_movement.html', 
-                         products=products,
-                         now=datetime.now())
+    return _new_movement_form()
+
+@inventory_bp.route('/api/products/typeahead')
+@login_required
+def product_typeahead():
+    """Produtos ativos parecidos com o SKU, código de barras ou nome digitado"""
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), 50)
+    return jsonify({'query': query, 'items': search_products(query, limit)})
+
+@inventory_bp.route('/api/movements/bulk', methods=['POST'])
+@login_required
+def api_bulk_movements():
+    # Lote de movimentações (ex.: recebimento de uma nota de fornecedor)
+    data = request.get_json(silent=True)
+    lines = data.get('lines') if isinstance(data, dict) else data
+    if not isinstance(lines, list):
+        return jsonify({
+            'success': False,
+            'message': 'Envie {"lines": [...]} com as movimentações.'
+        }), 400
+    
+    try:
+        movements = bulk_move_stock(lines, current_user.id)
+    except BulkStockError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'errors': e.errors
+        }), 400
+    except StockError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'count': len(movements),
+        'movements': [
+            {
+                'product_id': movement['product_id'],
+                'movement_type': movement['movement_type'],
+                'quantity': movement['quantity'],
+                'previous_stock': movement['previous_stock'],
+                'new_stock': movement['new_stock']
+            }
+            for movement in movements
+        ]
+    })
 
 @inventory_bp.route('/reports')
 @login_required
@@ -496,9 +524,7 @@ def reports():
     ).count()
     
     # Valor total do estoque
-    total_stock_value = db.session.query(
-        func.sum(Product.current_stock * Product.cost_price)
-    ).scalar() or 0
+    total_stock_value = stock_totals()['total_value']
     
     # Produtos com estoque baixo
     low_stock_products = Product.query.filter(
@@ -526,15 +552,23 @@ def reports():
         func.count(Product.id)
     ).join(Product).group_by(Category.name).all()
     
+    category_data = {
+        'labels': [name for name, _ in products_by_category],
+        'values': [count for _, count in products_by_category]
+    }
+    
     stock_status_data = {
-        'normal': Product.query.filter(
-            Product.current_stock > Product.min_stock,
-            Product.current_stock < Product.max_stock
-        ).count(),
-        'low': low_stock_products_count,
-        'high': Product.query.filter(
-            Product.current_stock >= Product.max_stock
-        ).count()
+        'labels': ['Normal', 'Baixo', 'Alto'],
+        'values': [
+            Product.query.filter(
+                Product.current_stock > Product.min_stock,
+                Product.current_stock < Product.max_stock
+            ).count(),
+            low_stock_products_count,
+            Product.query.filter(
+                Product.current_stock >= Product.max_stock
+            ).count()
+        ]
     }
     
     summary = {
@@ -550,19 +584,19 @@ def reports():
                          total_stock_value=total_stock_value,
                          movements_report=movements_report,
                          categories=categories,
-                         products_by_category=products_by_category,
+                         category_data=category_data,
                          stock_status_data=stock_status_data)
 
 @inventory_bp.route('/stock-summary')
 @login_required
 def stock_summary():
-    # Calculate stock summary metrics
-    total_quantity = db.session.query(func.sum(Product.current_stock)).scalar() or 0
-    total_value = db.session.query(func.sum(Product.current_stock * Product.cost_price)).scalar() or 0
+    # Totais do estoque (consulta única, cacheada)
+    totals = stock_totals()
 
     # Return data as JSON
     return jsonify({
-        'total_quantity': int(total_quantity),
-        'total_value': float(total_value)
+        'total_quantity': totals['total_quantity'],
+        'total_value': totals['total_value'],
+        'total_potential_sales_value': totals['total_potential_sales_value']
     })
 
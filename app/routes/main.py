@@ -1,17 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from app.models.crm import Customer, Sale
 from app.models.inventory import Product, Category
 from app.models.finance import Transaction, Account
 from app.models.schedule import Appointment, Event
 from app.models.settings import SystemSettings, EmailSettings, BackupSettings
 from app import db
+from app.services.rollup import kpi_summary, top_customers
+from app.services.pagination import cursor_json, paginate_keyset, InvalidCursor
+from app.services.stock import filter_products, stock_totals
+from app.services.settings import get_settings
+from app.services.search import global_search, SEARCH_LIMIT
+from app.services.lookups import lookup_page, LOOKUP_PER_PAGE, LOOKUP_SOURCES
 from datetime import datetime, timedelta
-from sqlalchemy import func
 from werkzeug.security import check_password_hash, generate_password_hash
 
 main_bp = Blueprint('main', __name__)
 
+DASHBOARD_PRODUCTS_PER_PAGE = 50
+
 @main_bp.route('/')
 @main_bp.route('/dashboard')
 @login_required
@@ -56,90 +62,43 @@ def dashboard():
     if end_date:
         end_date = end_date.replace(hour=23, minute=59, second=59)
 
-    # Estatísticas do dashboard
-    total_customers = Customer.query.count()
-    total_products = Product.query.count()
-    total_sales = Sale.query.count()
-    
-    # Vendas no período
-    sales_query = Sale.query
-    if start_date:
-        sales_query = sales_query.filter(Sale.sale_date >= start_date)
-    if end_date:
-        sales_query = sales_query.filter(Sale.sale_date <= end_date)
-    
-    filtered_sales_count = sales_query.count()
-    filtered_sales_total = db.session.query(func.sum(Sale.total_amount)).filter(
-        sales_query.subquery().c.id == Sale.id
-    ).scalar() or 0
+    # Estatísticas do dashboard (somadas a partir dos agregados diários)
+    start_day = start_date.date() if start_date else None
+    end_day = end_date.date() if end_date else None
+    kpis = kpi_summary(start_day, end_day)
+
+    total_customers = kpis['total_customers']
+    total_products = kpis['total_products']
+    total_sales = kpis['total_sales']
     
-    # Novos clientes no período
-    customers_query = Customer.query
-    if start_date:
-        customers_query = customers_query.filter(Customer.created_at >= start_date)
-    if end_date:
-        customers_query = customers_query.filter(Customer.created_at <= end_date)
-    new_customers_period = customers_query.count()
+    # Vendas e novos clientes no período
+    filtered_sales_count = kpis['sales_count']
+    filtered_sales_total = kpis['sales_total']
+    new_customers_period = kpis['new_customers']
 
     # Ticket médio no período
     average_ticket_period = filtered_sales_total / filtered_sales_count if filtered_sales_count > 0 else 0
 
+    # Receitas e despesas concluídas e variação do valor do estoque no período
+    income_period = kpis['income_total']
+    expense_period = kpis['expense_total']
+    stock_value_end = kpis['stock_value_end']
+    stock_value_change_period = stock_value_end - kpis['stock_value_start']
+
     # Top 5 clientes por valor de compra no período
-    top_customers_query = db.session.query(
-        Customer.name,
-        func.sum(Sale.total_amount).label('total_spent')
-    ).join(Sale).filter(Sale.customer_id == Customer.id)
-    
-    if start_date:
-        top_customers_query = top_customers_query.filter(Sale.sale_date >= start_date)
-    if end_date:
-        top_customers_query = top_customers_query.filter(Sale.sale_date <= end_date)
-    
-    top_5_customers = top_customers_query.group_by(Customer.name).order_by(
-        func.sum(Sale.total_amount).desc()
-    ).limit(5).all()
+    top_5_customers = top_customers(start_day, end_day, limit=5)
 
     # Produtos com estoque baixo (não filtrado por data, é um estado atual)
     # Query base para produtos
-    products_query = Product.query
-
-    # Aplicar filtros de produto
-    if product_search:
-        products_query = products_query.filter(
-            or_(
-                Product.name.ilike(f'%{product_search}%'),
-                Product.sku.ilike(f'%{product_search}%'),
-                Product.barcode.ilike(f'%{product_search}%')
-            )
-        )
-    
-    if product_category_id:
-        products_query = products_query.filter(Product.category_id == product_category_id)
-    
-    if product_stock_status == 'in_stock':
-        products_query = products_query.filter(
-            Product.current_stock > func.coalesce(Product.min_stock, 0)
-        )
-    elif product_stock_status == 'low_stock':
-        products_query = products_query.filter(
-            Product.current_stock > 0,
-            Product.current_stock <= func.coalesce(Product.min_stock, 0)
-        )
-    elif product_stock_status == 'out_of_stock':
-        products_query = products_query.filter(
-            or_(
-                Product.current_stock == 0,
-                Product.current_stock.is_(None)
-            )
-        )
+    products_query = filter_products(Product.query, product_search,
+                                     product_category_id, product_stock_status)
 
     # Produtos com estoque baixo (agora filtrados também pelos parâmetros gerais de produto)
     low_stock_products = products_query.filter(
         Product.current_stock <= Product.min_stock
     ).limit(5).all()
 
-    # Todos os produtos (com filtros aplicados)
-    all_filtered_products = products_query.order_by(Product.name.asc()).all()
+    # A lista completa de produtos é carregada sob demanda via api_products
     
     # Próximos agendamentos (filtrado por data)
     appointments_query = Appointment.query.filter(
@@ -165,10 +124,7 @@ def dashboard():
     ).limit(5).all()
 
     # Resumo do estoque (agora baseado nos produtos filtrados)
-    filtered_products_subquery = products_query.subquery()
-    total_stock_quantity = db.session.query(func.sum(filtered_products_subquery.c.current_stock)).scalar() or 0
-    total_stock_value = db.session.query(func.sum(filtered_products_subquery.c.current_stock * filtered_products_subquery.c.cost_price)).scalar() or 0
-    total_potential_sales_value = db.session.query(func.sum(filtered_products_subquery.c.current_stock * filtered_products_subquery.c.sale_price)).scalar() or 0
+    stock = stock_totals(product_search, product_category_id, product_stock_status)
     
     # Buscar categorias para o filtro de produtos
     categories = Category.query.all()
@@ -181,14 +137,18 @@ def dashboard():
                          filtered_sales_total=filtered_sales_total,
                          new_customers_period=new_customers_period,
                          average_ticket_period=average_ticket_period,
+                         income_period=income_period,
+                         expense_period=expense_period,
+                         net_result_period=income_period - expense_period,
+                         stock_value_end=stock_value_end,
+                         stock_value_change_period=stock_value_change_period,
                          top_5_customers=top_5_customers,
                          low_stock_products=low_stock_products,
-                         all_filtered_products=all_filtered_products, # Novo: todos os produtos filtrados
                          upcoming_appointments=upcoming_appointments,
                          recent_transactions=recent_transactions,
-                         total_stock_quantity=int(total_stock_quantity),
-                         total_stock_value=float(total_stock_value),
-                         total_potential_sales_value=float(total_potential_sales_value),
+                         total_stock_quantity=stock['total_quantity'],
+                         total_stock_value=stock['total_value'],
+                         total_potential_sales_value=stock['total_potential_sales_value'],
                          current_date=datetime.now(),
                          start_date=start_date.strftime('%Y-%m-%d') if start_date else '',
                          end_date=end_date.strftime('%Y-%m-%d') if end_date else '',
@@ -197,6 +157,60 @@ def dashboard():
                          product_category_id=product_category_id,
                          product_stock_status=product_stock_status)
 
+@main_bp.route('/dashboard/products')
+@login_required
+def api_products():
+    """Lista paginada (keyset) dos produtos filtrados do dashboard"""
+    per_page = min(max(request.args.get('per_page', DASHBOARD_PRODUCTS_PER_PAGE, type=int), 1), 200)
+    query = filter_products(
+        Product.query,
+        request.args.get('product_search', '').strip(),
+        request.args.get('product_category', type=int),
+        request.args.get('product_stock_status', '')
+    )
+    
+    try:
+        page = paginate_keyset(query, [(Product.name, False), (Product.id, False)],
+                               after=request.args.get('after'), per_page=per_page,
+                               with_total=False)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return cursor_json([
+        {
+            'id': p.id,
+            'name': p.name,
+            'sku': p.sku,
+            'current_stock': p.current_stock,
+            'sale_price': float(p.sale_price or 0),
+            'stock_status': p.stock_status,
+            'url': url_for('inventory.product_detail', id=p.id)
+        } for p in page.items
+    ], page.next_cursor)
+
+@main_bp.route('/search')
+@login_required
+def search():
+    """Busca global (produtos, clientes e transações) por relevância"""
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), 50)
+    return jsonify({'query': query, 'results': global_search(query, limit)})
+
+@main_bp.route('/lookups/<source>')
+@login_required
+def lookup(source):
+    """Página de opções para os campos de seleção remota (macros/remote_select.html)"""
+    if source not in LOOKUP_SOURCES:
+        return jsonify({'error': 'Fonte desconhecida'}), 404
+    filters = [name for name in LOOKUP_SOURCES[source].filters if request.args.get(name) == '1']
+    try:
+        page = lookup_page(source, request.args.get('q', ''), filters,
+                           after=request.args.get('after'),
+                           per_page=request.args.get('per_page', LOOKUP_PER_PAGE, type=int))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return cursor_json(page['items'], page['next_cursor'])
+
 @main_bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
@@ -242,15 +256,9 @@ def change_password():
 @main_bp.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
-    # Buscar configurações existentes ou criar padrão
-    system_settings = SystemSettings.query.first()
-    if not system_settings:
-        system_settings = SystemSettings()
-        db.session.add(system_settings)
-        db.session.commit()
-    
     if request.method == 'POST':
         # Atualizar configurações do sistema
+        system_settings = _settings_row(SystemSettings)
         system_settings.company_name = request.form.get('company_name')
         system_settings.company_email = request.form.get('company_email')
         system_settings.company_phone = request.form.get('company_phone')
@@ -264,27 +272,32 @@ def settings():
         flash('Configurações salvas com sucesso!', 'success')
         return redirect(url_for('main.settings'))
     
-    # Buscar configurações de email e backup
-    email_settings = EmailSettings.query.first()
-    backup_settings = BackupSettings.query.first()
-    
+    # Exibição a partir do snapshot em cache (sem consultas enquanto não houver gravações)
+    snapshot = get_settings()
     return render_template('main/settings.html', 
-                         settings=system_settings,
-                         email_settings=email_settings,
-                         backup_settings=backup_settings)
+                         settings=snapshot.system,
+                         email_settings=snapshot.email,
+                         backup_settings=snapshot.backup)
+
+def _settings_row(model):
+    """Linha única de configurações para edição (criada na primeira gravação)"""
+    row = model.query.first()
+    if not row:
+        row = model()
+        db.session.add(row)
+    return row
 
 @main_bp.route('/email_settings', methods=['POST'])
 @login_required
 def email_settings():
-    email_settings = EmailSettings.query.first()
-    if not email_settings:
-        email_settings = EmailSettings()
-        db.session.add(email_settings)
+    email_settings = _settings_row(EmailSettings)
     
     email_settings.smtp_server = request.form.get('smtp_server')
     email_settings.smtp_port = int(request.form.get('smtp_port', 587))
     email_settings.smtp_username = request.form.get('smtp_username')
-    email_settings.smtp_password = request.form.get('smtp_password')
+    # A senha não volta para o formulário: em branco mantém a atual
+    if request.form.get('smtp_password'):
+        email_settings.smtp_password = request.form.get('smtp_password')
     email_settings.smtp_use_tls = bool(request.form.get('smtp_use_tls'))
     
     db.session.commit()
@@ -294,10 +307,7 @@ def email_settings():
 @main_bp.route('/backup_settings', methods=['POST'])
 @login_required
 def backup_settings():
-    backup_settings = BackupSettings.query.first()
-    if not backup_settings:
-        backup_settings = BackupSettings()
-        db.session.add(backup_settings)
+    backup_settings = _settings_row(BackupSettings)
     
     backup_settings.frequency = request.form.get('backup_frequency')
     backup_settings.retention_days = int(request.form.get('backup_retention', 30))
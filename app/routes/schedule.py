@@ -5,6 +5,12 @@ from app.models.crm import Customer
 from app import db
 from datetime import datetime, timedelta
 from sqlalchemy import func
+from app.services.pagination import paginate_request, pagination_args
+from app.services.search import search_filter
+from app.services.lookups import lookup_option
+
+# Chaves de ordenação (keyset) dos eventos; o id desempata
+EVENT_SORT_KEYS = [(Event.start_date, True), (Event.id, True)]
 
 schedule_bp = Blueprint('schedule', __name__, url_prefix='/schedule')
 
@@ -50,11 +56,11 @@ def calendar():
 @schedule_bp.route('/events')
 @login_required
 def events():
-    page = request.args.get('page', 1, type=int)
-    events = Event.query.filter_by(user_id=current_user.id).order_by(
-        Event.start_date.desc()
-    ).paginate(page=page, per_page=20, error_out=False)
-    return render_template('schedule/events.html', events=events)
+    events = paginate_request(Event.query.filter_by(user_id=current_user.id),
+                              EVENT_SORT_KEYS, per_page=20)
+    return render_template('schedule/events.html',
+                         events=events,
+                         current_args=pagination_args(request.args))
 
 @schedule_bp.route('/events/new', methods=['GET', 'POST'])
 @login_required
@@ -121,12 +127,23 @@ def appointments():
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
     
-    # Query base
-    query = Appointment.query
+    # Query base: apenas as colunas exibidas, com o cliente no mesmo SELECT
+    query = db.session.query(
+        Appointment.id,
+        Appointment.title,
+        Appointment.appointment_date,
+        Appointment.duration_minutes,
+        Appointment.appointment_type,
+        Appointment.status,
+        Appointment.notes,
+        Customer.name.label('customer_name'),
+        Customer.phone.label('customer_phone')
+    ).outerjoin(Customer, Customer.id == Appointment.customer_id)
     
     # Aplicar filtros
-    if search:
-        query = query.join(Customer).filter(Customer.name.ilike(f'%{search}%'))
+    condition = search_filter('customers', Appointment.customer_id, search, columns=('name',))
+    if condition is not None:
+        query = query.filter(condition)
     if status:
         query = query.filter(Appointment.status == status)
     if date_from:
@@ -141,7 +158,15 @@ def appointments():
     
     return render_template('schedule/appointments.html', 
                          appointments=appointments_pagination.items,
-                         pagination=appointments_pagination)
+                         pagination=appointments_pagination,
+                         current_args=pagination_args(request.args))
+
+def _new_appointment_form():
+    # Só o cliente já escolhido vai para a página; os demais (todos, de
+    # qualquer status) são buscados em /lookups/customers
+    customer_id = request.form.get('customer_id', type=int) or request.args.get('customer_id', type=int)
+    return render_template('schedule/new_appointment.html',
+                           selected_customer=lookup_option('customers', customer_id))
 
 @schedule_bp.route('/appointments/new', methods=['GET', 'POST'])
 @login_required
@@ -156,49 +181,41 @@ def new_appointment():
             
             if not customer_id:
                 flash('Selecione um cliente!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             if not title:
                 flash('O título é obrigatório!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             if not appointment_date:
                 flash('A data e hora do agendamento são obrigatórias!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             # Validar se o cliente existe
             customer = Customer.query.get(customer_id)
             if not customer:
                 flash('Cliente não encontrado!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             # Validar duração
             try:
                 duration_minutes = int(duration_minutes)
                 if duration_minutes <= 0:
                     flash('A duração deve ser maior que zero!', 'error')
-                    customers = Customer.query.all()
-                    return render_template('schedule/new_appointment.html', customers=customers)
+                    return _new_appointment_form()
             except ValueError:
                 flash('Duração inválida!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             # Validar data
             try:
                 appointment_datetime = datetime.strptime(appointment_date, '%Y-%m-%dT%H:%M')
                 if appointment_datetime < datetime.now():
                     flash('A data do agendamento não pode ser no passado!', 'error')
-                    customers = Customer.query.all()
-                    return render_template('schedule/new_appointment.html', customers=customers)
+                    return _new_appointment_form()
             except ValueError:
                 flash('Data e hora inválidas!', 'error')
-                customers = Customer.query.all()
-                return render_template('schedule/new_appointment.html', customers=customers)
+                return _new_appointment_form()
             
             appointment = Appointment(
                 customer_id=customer_id,
@@ -227,9 +244,7 @@ def new_appointment():
             db.session.rollback()
             print(f"Erro detalhado no agendamento: {e}")
     
-    # Buscar todos os clientes, independente do status
-    customers = Customer.query.all()
-    return render_template('schedule/new_appointment.html', customers=customers)
+    return _new_appointment_form()
 
 @schedule_bp.route('/appointments/<int:id>')
 @login_required
@@ -257,9 +272,9 @@ def edit_appointment(id):
         flash('Agendamento atualizado com sucesso!', 'success')
         return redirect(url_for('schedule.appointment_detail', id=appointment.id))
     
-    customers = Customer.query.all()
     return render_template('schedule/edit_appointment.html', 
-                         appointment=appointment, customers=customers)
+                         appointment=appointment,
+                         selected_customer=lookup_option('customers', appointment.customer_id))
 
 @schedule_bp.route('/api/events')
 @login_required
@@ -267,7 +282,13 @@ def api_events():
     start = request.args.get('start')
     end = request.args.get('end')
     
-    events = Event.query.filter(
+    events = db.session.query(
+        Event.id,
+        Event.title,
+        Event.start_date,
+        Event.end_date,
+        Event.is_all_day
+    ).filter(
         Event.user_id == current_user.id,
         Event.start_date >= start,
         Event.end_date <= end
@@ -292,17 +313,26 @@ def api_appointments():
     start = request.args.get('start')
     end = request.args.get('end')
     
-    appointments = Appointment.query.filter(
+    # Nome do cliente no mesmo SELECT (evita uma consulta por agendamento)
+    appointments = db.session.query(
+        Appointment.id,
+        Appointment.title,
+        Appointment.appointment_date,
+        Appointment.duration_minutes,
+        Customer.name.label('customer_name')
+    ).outerjoin(
+        Customer, Customer.id == Appointment.customer_id
+    ).filter(
         Appointment.appointment_date >= start,
         Appointment.appointment_date <= end
     ).all()
     
     appointments_data = []
     for appointment in appointments:
-        end_time = appointment.appointment_date + timedelta(minutes=appointment.duration_minutes)
+        end_time = appointment.appointment_date + timedelta(minutes=appointment.duration_minutes or 0)
         appointments_data.append({
             'id': appointment.id,
-            'title': f"{appointment.title} - {appointment.customer.name}",
+            'title': f"{appointment.title} - {appointment.customer_name}",
             'start': appointment.appointment_date.isoformat(),
             'end': end_time.isoformat(),
             'url': url_for('schedule.appointment_detail', id=appointment.id)
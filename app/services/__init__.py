@@ -0,0 +1,3 @@
+"""
+Serviços de domínio compartilhados entre os blueprints
+"""
@@ -0,0 +1,164 @@
+"""
+Caches em memória do processo e a invalidação deles pelos commits.
+
+TTLCache guarda valores por chave com LRU, validade (TTL) e um contador de
+geração: um valor calculado antes de uma invalidação não é guardado, para
+que uma leitura lenta não recoloque no cache um dado já alterado. Cada
+leitura é informada a record_cache (acertos e falhas, ver cache_stats.py).
+
+    totals = TTLCache('stock_totals', ttl=30, size=128)
+    totals.get(key, lambda: compute(key))
+    totals.invalidate()          # tudo
+    totals.invalidate(key)       # uma chave
+
+Com `revalidate`, um valor vencido é conferido (ex.: por um contador de
+versão no banco) e, se ainda valer, ganha nova validade sem ser recalculado.
+
+watch_changes liga um cache às gravações da sessão: `collect(session)` é
+chamado no before_flush e devolve as marcas do que mudou (ids, nomes de
+fontes, ou True); no commit, `invalidate(marcas)` recebe todas as marcas da
+transação e, no rollback, elas são descartadas. Escritas fora do ORM
+(UPDATE direto) avisam com mark_changed(nome, *marcas). Um único conjunto
+de listeners da sessão atende todos os caches.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from app import db
+from app.services.cache_stats import record_cache
+
+_CHANGES_KEY = 'cache_changes'
+_FLUSH_KEY = 'cache_flush_changes'
+
+_ALL = object()
+
+class TTLCache:
+    """Valores por chave com LRU, TTL e geração (seguro entre threads)"""
+
+    def __init__(self, name, ttl, size):
+        self.name = name
+        self.ttl = ttl
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+
+    def lookup(self, key):
+        """(encontrado, valor, geração); a geração vai para o store() do valor calculado"""
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self.entries.move_to_end(key)
+                record_cache(self.name, True)
+                return True, cached[1], self.generation
+            generation = self.generation
+        record_cache(self.name, False)
+        return False, None, generation
+
+    def store(self, key, value, generation):
+        """Guarda o valor, a não ser que o cache tenha sido invalidado depois da leitura"""
+        stored = time.monotonic()
+        with self.lock:
+            if generation != self.generation:
+                return False
+            self.entries[key] = (stored, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            return True
+
+    def get(self, key, compute, ttl=None, revalidate=None):
+        """
+        Valor da chave, calculado por compute() na falta dele. `ttl`
+        substitui a validade do cache nesta leitura; com `revalidate(valor)`,
+        um valor vencido que ainda vale é renovado.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self.lock:
+            cached = self.entries.get(key)
+            generation = self.generation
+            if cached and now - cached[0] < ttl:
+                self.entries.move_to_end(key)
+                record_cache(self.name, True)
+                return cached[1]
+
+        if cached and revalidate is not None and revalidate(cached[1]):
+            with self.lock:
+                if self.generation == generation and key in self.entries:
+                    self.entries[key] = (now, cached[1])
+            record_cache(self.name, True)
+            return cached[1]
+
+        record_cache(self.name, False)
+        value = compute()
+        self.store(key, value, generation)
+        return value
+
+    def invalidate(self, key=_ALL):
+        """Descarta uma chave (ou todas, sem argumento)"""
+        with self.lock:
+            self.generation += 1
+            if key is _ALL:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+class _Watcher:
+    def __init__(self, collect, invalidate, on_flush):
+        self.collect = collect
+        self.invalidate = invalidate
+        self.on_flush = on_flush
+
+# Caches ligados às gravações, por nome
+_watchers = {}
+
+def watch_changes(name, collect, invalidate, on_flush=None):
+    """
+    Chama `invalidate(marcas)` no commit das transações em que `collect(session)`
+    (no before_flush) ou mark_changed(name) apontaram alterações.
+    `on_flush(session, marcas)`, se informado, roda no after_flush com as
+    marcas daquele flush, ainda dentro da transação.
+    """
+    _watchers[name] = _Watcher(collect, invalidate, on_flush)
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+
+def mark_changed(name, *marks):
+    """Invalida o cache `name` no próximo commit (para escritas fora do ORM)"""
+    db.session.info.setdefault(_CHANGES_KEY, {}).setdefault(name, set()).update(marks or (True,))
+
+def _before_flush(session, flush_context, instances):
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    flushed = session.info[_FLUSH_KEY] = {}
+    for name, watcher in list(_watchers.items()):
+        marks = set(watcher.collect(session) or ())
+        if marks:
+            changes.setdefault(name, set()).update(marks)
+            flushed[name] = marks
+
+def _after_flush(session, flush_context):
+    flushed = session.info.pop(_FLUSH_KEY, None) or {}
+    for name, marks in flushed.items():
+        watcher = _watchers.get(name)
+        if watcher is not None and watcher.on_flush is not None:
+            watcher.on_flush(session, marks)
+
+def _after_commit(session):
+    changes = session.info.pop(_CHANGES_KEY, None) or {}
+    for name, marks in changes.items():
+        watcher = _watchers.get(name)
+        if watcher is not None and marks:
+            watcher.invalidate(marks)
+
+def _after_rollback(session):
+    session.info.pop(_CHANGES_KEY, None)
+    session.info.pop(_FLUSH_KEY, None)
@@ -0,0 +1,23 @@
+"""
+Acertos e falhas dos caches em memória do processo.
+
+Os caches (TTLCache de app/services/cache.py e o índice do typeahead) chamam
+record_cache a cada leitura; quem precisa dos números (métricas do
+Prometheus, ver app/services/metrics.py) se registra com add_cache_observer.
+Sem observadores, o custo é uma chamada vazia.
+"""
+
+_observers = []
+
+def add_cache_observer(observer):
+    """Registra observer(cache, hit) para todas as leituras de cache"""
+    if observer not in _observers:
+        _observers.append(observer)
+
+def remove_cache_observer(observer):
+    if observer in _observers:
+        _observers.remove(observer)
+
+def record_cache(cache, hit):
+    for observer in _observers:
+        observer(cache, hit)
@@ -0,0 +1,189 @@
+"""
+Listagem de clientes da API (GET /crm/api/customers) para integrações.
+
+Cada chamada devolve no máximo uma página (per_page, até MAX_PER_PAGE),
+buscada por keyset: o cursor `after` continua depois do último cliente da
+página anterior, e o próximo cursor vai nos cabeçalhos `X-Next-Cursor` e
+`Link: <...>; rel="next"`. O corpo continua sendo uma lista JSON.
+
+    ?fields=id,name,email       só as colunas pedidas (o id sempre vem)
+    ?updated_since=<ISO 8601>   só clientes alterados a partir do instante,
+                                ordenados por (updated_at, id): quem muda
+                                durante a sincronização reaparece no final
+    ?format=ndjson              os clientes do filtro em streaming, um JSON
+                                por linha, com memória constante; no máximo
+                                CRM_API_NDJSON_MAX_ROWS por resposta, com o
+                                cursor da continuação em `X-Next-Cursor`
+
+Busca exata (GET /crm/api/customers/lookup) por um dos campos de
+CUSTOMER_LOOKUPS, normalizado dos dois lados e resolvido pelo índice:
+
+    ?name=jose da silva   ?email=  ?phone=  ?instagram=  ?cpf_cnpj=
+
+As consultas são só de colunas (sem o identity map do ORM) e o NDJSON usa
+o mesmo cursor do lado do servidor das exportações.
+
+Todas as rotas exigem um usuário logado ou, para integrações,
+"Authorization: Bearer <CRM_API_TOKEN>"; sem o token configurado, só
+usuários logados.
+"""
+
+import hmac
+import json
+from datetime import datetime
+
+from flask import Response, current_app, jsonify, request, stream_with_context, url_for
+from flask_login import current_user
+
+from app import db
+from app.models.crm import Customer, CUSTOMER_LOOKUPS
+from app.services.normalize import normalize_digits, normalize_email, normalize_instagram, normalize_name
+from app.services.export import stream_rows
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor, order_by_keys, seek_condition
+
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+CUSTOMER_FIELDS = ('id', 'name', 'email', 'phone', 'instagram', 'address', 'city', 'state',
+                   'zip_code', 'company', 'cpf_cnpj', 'status', 'created_at', 'updated_at')
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+LOOKUP_LIMIT = 20
+
+# Normalização do valor procurado, equivalente à expressão indexada do campo
+LOOKUP_NORMALIZERS = {
+    'name': normalize_name,
+    'email': normalize_email,
+    'phone': normalize_digits,
+    'instagram': normalize_instagram,
+    'cpf_cnpj': normalize_digits,
+}
+
+class CustomerQueryError(ValueError):
+    """Parâmetro inválido na listagem de clientes da API"""
+
+def parse_fields(value):
+    """Colunas pedidas em ?fields= (todas quando vazio), com o id sempre primeiro"""
+    if not value:
+        return list(CUSTOMER_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(CUSTOMER_FIELDS))
+    if unknown:
+        raise CustomerQueryError(f'Campos desconhecidos: {", ".join(unknown)}')
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+
+def parse_updated_since(value):
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise CustomerQueryError('updated_since deve estar no formato ISO 8601')
+    # updated_at é gravado em UTC sem fuso
+    if moment.tzinfo is not None:
+        moment = (moment - moment.utcoffset()).replace(tzinfo=None)
+    return moment
+
+def customer_keys(updated_since):
+    if updated_since is not None:
+        return [(Customer.updated_at, False), (Customer.id, False)]
+    return [(Customer.id, False)]
+
+def customer_query(fields, updated_since=None, after=None):
+    """Consulta só de colunas, ordenada pelas chaves do keyset (mais as colunas das chaves)"""
+    keys = customer_keys(updated_since)
+    query = db.session.query(*[getattr(Customer, field) for field in fields],
+                             *[column for column, _ in keys])
+    if updated_since is not None:
+        query = query.filter(Customer.updated_at >= updated_since)
+    if after:
+        query = query.filter(seek_condition(keys, decode_cursor(after, len(keys))))
+    return query.order_by(*order_by_keys(keys)), len(keys)
+
+def serialize(fields, row):
+    return {field: value.isoformat() if isinstance(value, datetime) else value
+            for field, value in zip(fields, row)}
+
+def _page(fields, updated_since, after, per_page):
+    query, key_count = customer_query(fields, updated_since, after)
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(list(rows[-1])[-key_count:]) if rows and has_more else None
+    return [serialize(fields, row) for row in rows], next_cursor
+
+def _ndjson_cursor(updated_since, after, max_rows):
+    """Cursor da continuação quando o filtro tem mais que `max_rows` clientes"""
+    query, key_count = customer_query([], updated_since, after)
+    rows = query.offset(max_rows - 1).limit(2).all()
+    return encode_cursor(list(rows[0])[-key_count:]) if len(rows) == 2 else None
+
+def _ndjson(fields, updated_since, after, max_rows):
+    query, _ = customer_query(fields, updated_since, after)
+    for row in stream_rows(query.limit(max_rows)):
+        yield json.dumps(serialize(fields, row), ensure_ascii=False) + '\n'
+
+def lookup_query(field, value, fields=CUSTOMER_FIELDS):
+    """Clientes cujo campo normalizado é igual ao valor (busca pelo índice do campo)"""
+    key = LOOKUP_NORMALIZERS[field](value)
+    return (db.session.query(*[getattr(Customer, name) for name in fields])
+            .filter(CUSTOMER_LOOKUPS[field] == key)
+            .order_by(Customer.id))
+
+def lookup_customers(field, value, fields=CUSTOMER_FIELDS, limit=LOOKUP_LIMIT):
+    return [serialize(fields, row) for row in lookup_query(field, value, fields).limit(limit)]
+
+def api_authorized():
+    """Usuário logado ou o token CRM_API_TOKEN; sem o token configurado, só usuários logados"""
+    if current_user.is_authenticated:
+        return True
+    token = current_app.config.get('CRM_API_TOKEN')
+    if not token:
+        return False
+    header = request.headers.get('Authorization', '')
+    return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+
+def customers_response():
+    """Resposta da listagem para a requisição atual (página JSON ou NDJSON)"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        updated_since = parse_updated_since(request.args.get('updated_since'))
+        after = request.args.get('after')
+        if after:
+            decode_cursor(after, len(customer_keys(updated_since)))
+        per_page = request.args.get('per_page', DEFAULT_PER_PAGE, type=int)
+        if per_page < 1:
+            raise CustomerQueryError('per_page deve ser maior que zero')
+        per_page = min(per_page, MAX_PER_PAGE)
+    except (CustomerQueryError, InvalidCursor) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('format') == 'ndjson':
+        max_rows = current_app.config['CRM_API_NDJSON_MAX_ROWS']
+        response = Response(stream_with_context(_ndjson(fields, updated_since, after, max_rows)),
+                            mimetype=NDJSON_MIMETYPE)
+        next_cursor = _ndjson_cursor(updated_since, after, max_rows)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    items, next_cursor = _page(fields, updated_since, after, per_page)
+    response = jsonify(items)
+    if next_cursor:
+        args = dict(request.args, after=next_cursor)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    return response
+
+def lookup_response():
+    """Resposta da busca exata para a requisição atual (lista JSON, vazia sem resultados)"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        criteria = [field for field in LOOKUP_NORMALIZERS if request.args.get(field, '').strip()]
+        if len(criteria) != 1:
+            raise CustomerQueryError(f'Informe um (e só um) destes parâmetros: {", ".join(LOOKUP_NORMALIZERS)}')
+    except CustomerQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    field = criteria[0]
+    return jsonify(lookup_customers(field, request.args[field], fields))
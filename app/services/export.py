@@ -0,0 +1,112 @@
+"""
+Exportação de listagens em CSV e XLSX sem carregar tudo na memória.
+
+As linhas vêm de consultas só de colunas executadas com `yield_per`
+(cursor do lado do servidor, lotes de EXPORT_BATCH_SIZE), sem passar pelo
+identity map do ORM.
+
+O CSV é o formato em streaming: é enviado em blocos à medida que os lotes
+chegam. O XLSX é bufferizado: o modo write-only do openpyxl mantém a
+memória constante gravando as linhas em um arquivo temporário, mas o zip
+só fica pronto quando a planilha é fechada, então o primeiro byte sai
+depois de todas as linhas lidas e o disco guarda o arquivo inteiro. Para
+exportações grandes, prefira o CSV.
+
+Textos que começam com =, +, -, @, tabulação ou CR seriam interpretados
+como fórmula pelo Excel (CSV injection): no CSV recebem um apóstrofo na
+frente e no XLSX são gravados explicitamente como texto.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_FORMATS = ('csv', 'xlsx')
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def stream_rows(query):
+    """Percorre `query` em lotes, com cursor do lado do servidor"""
+    return query.yield_per(EXPORT_BATCH_SIZE)
+
+def _is_formula(value):
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+def csv_cell(value):
+    """Valor da célula do CSV: vazio para None e texto de fórmula neutralizado"""
+    if value is None:
+        return ''
+    if _is_formula(value):
+        return "'" + value
+    return value
+
+def _xlsx_cell(sheet, value):
+    if _is_formula(value):
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+def csv_chunks(header, rows):
+    """Gera o CSV em blocos de aproximadamente EXPORT_CHUNK_SIZE bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM para o Excel reconhecer UTF-8 (acentos)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([csv_cell(value) for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def xlsx_chunks(header, rows, title='Dados'):
+    """Monta a planilha em modo write-only (em disco) e envia o arquivo fechado em blocos"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_xlsx_cell(sheet, value) for value in row])
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+def export_response(name, export_format, header, query, title='Dados'):
+    """
+    Resposta em streaming com o resultado de `query` (consulta só de
+    colunas, na mesma ordem de `header`) no formato pedido.
+    """
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+
+    rows = stream_rows(query)
+    if export_format == 'xlsx':
+        chunks = xlsx_chunks(header, rows, title)
+    else:
+        chunks = csv_chunks(header, rows)
+
+    filename = f'{name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
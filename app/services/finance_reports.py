@@ -0,0 +1,125 @@
+"""
+Relatório financeiro agregado no banco.
+
+Os totais saem de um único GROUP BY por tipo, status, conta e categoria;
+as transações individuais só são carregadas quando o usuário abre o
+detalhamento de um grupo, e mesmo assim página por página.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.finance import Transaction, Account
+
+DETAIL_PER_PAGE = 50
+
+# Valor usado na URL para o grupo de transações sem categoria
+NO_CATEGORY = '-'
+
+DETAIL_KEYS = [(Transaction.transaction_date, True), (Transaction.id, True)]
+
+def filter_transactions(query, start_date=None, end_date=None, account_id=None, transaction_type=None):
+    """Aplica os filtros do formulário de relatórios"""
+    if start_date and end_date:
+        query = query.filter(
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date <= end_date
+        )
+
+    if account_id:
+        query = query.filter(Transaction.account_id == account_id)
+
+    if transaction_type:
+        query = query.filter(Transaction.transaction_type == transaction_type)
+    return query
+
+def report_groups(**filters):
+    """
+    Quantidade e soma das transações agrupadas por tipo, status, conta e
+    categoria, já com o nome da conta.
+    """
+    category = func.nullif(Transaction.category, '')
+    query = db.session.query(
+        Transaction.transaction_type,
+        Transaction.status,
+        Transaction.account_id,
+        Account.name.label('account_name'),
+        category.label('category'),
+        func.count(Transaction.id).label('count'),
+        func.coalesce(func.sum(Transaction.amount), 0).label('amount'),
+    ).join(Account, Account.id == Transaction.account_id)
+
+    query = filter_transactions(query, **filters).group_by(
+        Transaction.transaction_type,
+        Transaction.status,
+        Transaction.account_id,
+        Account.name,
+        category,
+    ).order_by(
+        Transaction.transaction_type,
+        func.sum(Transaction.amount).desc(),
+    )
+    return query.all()
+
+def report_totals(groups):
+    """Totais do resumo a partir dos grupos (receitas e despesas concluídas)"""
+    total_income = Decimal('0')
+    total_expenses = Decimal('0')
+    total_transactions = 0
+    for group in groups:
+        total_transactions += group.count
+        if group.status != 'completed':
+            continue
+        if group.transaction_type == 'receita':
+            total_income += Decimal(str(group.amount))
+        elif group.transaction_type == 'despesa':
+            total_expenses += Decimal(str(group.amount))
+
+    return {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_income': total_income - total_expenses,
+        'total_transactions': total_transactions,
+    }
+
+def cash_flow():
+    """Soma diária das transações concluídas"""
+    return db.session.query(
+        Transaction.transaction_date.label('date'),
+        func.sum(Transaction.amount).label('amount')
+    ).filter(
+        Transaction.status == 'completed'
+    ).group_by(
+        Transaction.transaction_date
+    ).order_by(
+        Transaction.transaction_date
+    ).all()
+
+def detail_query(detail_type=None, detail_status=None, detail_account=None, detail_category=None, **filters):
+    """
+    Transações de um grupo do relatório, para paginar com DETAIL_KEYS.
+
+    Parâmetros de detalhamento vazios não restringem a consulta;
+    `detail_category` igual a NO_CATEGORY seleciona as transações sem categoria.
+    """
+    query = filter_transactions(
+        Transaction.query.options(joinedload(Transaction.account)), **filters
+    )
+
+    if detail_type:
+        query = query.filter(Transaction.transaction_type == detail_type)
+
+    if detail_status:
+        query = query.filter(Transaction.status == detail_status)
+
+    if detail_account:
+        query = query.filter(Transaction.account_id == detail_account)
+
+    if detail_category == NO_CATEGORY:
+        query = query.filter(Transaction.category.is_(None) | (Transaction.category == ''))
+    elif detail_category:
+        query = query.filter(Transaction.category == detail_category)
+    return query
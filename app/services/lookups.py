@@ -0,0 +1,160 @@
+"""
+Opções dos campos de seleção remota dos formulários (clientes e produtos).
+
+Em vez de renderizar a tabela inteira em um <select>, o formulário usa a
+macro remote_select (templates/macros/remote_select.html), que busca as
+opções sob demanda em GET /lookups/<fonte>:
+
+    ?q=texto        busca textual (FTS5) nas colunas da fonte
+    ?after=<cursor> próxima página (keyset pelo nome e id)
+    ?per_page=20    tamanho da página (até MAX_PER_PAGE)
+    ?active=1       filtros da fonte (ex.: só clientes ativos)
+
+A resposta é {"items": [{"id", "label", "data"}], "next_cursor": cursor ou null};
+`data` vira atributos data-* da <option> (preço, estoque, e-mail...).
+
+As páginas ficam em cache (por aplicação, no processo) por LOOKUP_CACHE_TTL
+segundos; um commit deste processo que altere o modelo da fonte descarta as
+páginas dela, e gravações de outros processos aparecem depois do TTL.
+Escritas fora do ORM (o UPDATE do estoque em app/services/stock.py) avisam
+com mark_lookups_changed().
+"""
+
+from decimal import Decimal
+
+from flask import current_app, has_app_context
+
+from app import db
+from app.models.crm import Customer
+from app.models.inventory import Product
+from app.services.cache import TTLCache, mark_changed, watch_changes
+from app.services.pagination import decode_cursor, encode_cursor, order_by_keys, seek_condition
+from app.services.search import search_filter
+
+LOOKUP_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+LOOKUP_CACHE_TTL = 60
+LOOKUP_CACHE_SIZE = 512
+
+_CACHE = 'lookup'
+_EXTENSION = 'lookup_cache'
+
+def _json_value(value):
+    # Numeric vem como Decimal
+    return float(value) if isinstance(value, Decimal) else value
+
+class LookupSource:
+    """Modelo, colunas e filtros de uma fonte de opções"""
+
+    def __init__(self, model, columns, keys, label, search, search_columns=None,
+                 condition=None, filters=None):
+        self.model = model
+        self.columns = columns
+        self.keys = keys
+        self.label = label
+        self.search = search
+        self.search_columns = search_columns
+        self.condition = condition
+        self.filters = filters or {}
+
+    def item(self, row):
+        data = {name: _json_value(getattr(row, name)) for name in self.columns}
+        return {'id': row.id, 'label': self.label(row), 'data': data}
+
+    def query(self, filters=()):
+        model = self.model
+        query = db.session.query(model.id, *[getattr(model, name) for name in self.columns])
+        if self.condition is not None:
+            query = query.filter(self.condition)
+        for name in filters:
+            query = query.filter(self.filters[name])
+        return query
+
+def _customer_label(row):
+    return f'{row.name} - {row.company or row.email or ""}'.rstrip(' -')
+
+def _product_label(row):
+    return f'{row.name} (Estoque: {row.current_stock or 0} {(row.unit or "").upper()})'
+
+LOOKUP_SOURCES = {
+    'customers': LookupSource(
+        Customer, ('name', 'email', 'company', 'phone'),
+        keys=[(Customer.name_key, False), (Customer.id, False)],
+        label=_customer_label,
+        search='customers', search_columns=('name', 'email', 'company'),
+        filters={'active': Customer.status == 'active'},
+    ),
+    'products': LookupSource(
+        Product, ('name', 'sku', 'unit', 'current_stock', 'min_stock', 'sale_price'),
+        keys=[(Product.name, False), (Product.id, False)],
+        label=_product_label,
+        search='products', search_columns=('name', 'sku', 'barcode'),
+        condition=Product.is_active.is_(True),
+    ),
+}
+
+def _fetch(source, q, filters, after, per_page):
+    query = source.query(filters)
+    condition = search_filter(source.search, source.model.id, q, source.search_columns)
+    if condition is not None:
+        query = query.filter(condition)
+    keys = source.keys
+    query = query.add_columns(*[column for column, _ in keys])
+    if after:
+        query = query.filter(seek_condition(keys, decode_cursor(after, len(keys))))
+    rows = query.order_by(*order_by_keys(keys)).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    items = [source.item(row) for row in rows]
+    next_cursor = encode_cursor(list(rows[-1])[-len(keys):]) if rows and has_more else None
+    return {'items': items, 'next_cursor': next_cursor}
+
+def lookup_page(name, q='', filters=(), after=None, per_page=LOOKUP_PER_PAGE):
+    """
+    Página de opções da fonte `name`, do cache quando possível.
+    Levanta InvalidCursor se `after` não for um cursor válido.
+    """
+    source = LOOKUP_SOURCES[name]
+    q = (q or '').strip()
+    filters = tuple(sorted(filters))
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    # Um cache por fonte: páginas por (busca, filtros, cursor, tamanho)
+    cache = current_app.extensions[_EXTENSION][name]
+    return cache.get((q, filters, after, per_page), lambda: _fetch(source, q, filters, after, per_page))
+
+def lookup_option(name, record_id):
+    """Opção de um registro (o já selecionado no formulário), ou None"""
+    if not record_id:
+        return None
+    source = LOOKUP_SOURCES[name]
+    row = source.query().filter(source.model.id == record_id).first()
+    return source.item(row) if row is not None else None
+
+def invalidate_lookups(*names):
+    """Descarta as páginas em cache das fontes (todas, sem argumentos)"""
+    caches = current_app.extensions[_EXTENSION]
+    for name in names or LOOKUP_SOURCES:
+        caches[name].invalidate()
+
+def mark_lookups_changed(*names):
+    """Descarta as páginas das fontes no próximo commit (para escritas fora do ORM)"""
+    mark_changed(_CACHE, *(names or LOOKUP_SOURCES))
+
+def _collect(session):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        for name, source in LOOKUP_SOURCES.items():
+            if isinstance(obj, source.model):
+                changed.add(name)
+    return changed
+
+def _invalidate(changed):
+    if has_app_context() and _EXTENSION in current_app.extensions:
+        invalidate_lookups(*changed)
+
+def register_lookups(app):
+    """Cache por aplicação, descartado quando clientes ou produtos são gravados"""
+    app.extensions[_EXTENSION] = {name: TTLCache(_CACHE, LOOKUP_CACHE_TTL, LOOKUP_CACHE_SIZE)
+                                  for name in LOOKUP_SOURCES}
+    watch_changes(_CACHE, _collect, _invalidate)
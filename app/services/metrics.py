@@ -0,0 +1,169 @@
+"""
+Métricas no formato do Prometheus (opcional, METRICS_ENABLED).
+
+GET /metrics exporta:
+    erp_http_request_duration_seconds  histograma por blueprint/endpoint/método
+    erp_http_requests_total            requisições por blueprint/endpoint/método/status
+    erp_http_requests_in_flight        requisições em andamento
+    erp_db_pool_connections_in_use     conexões do pool em uso (no limite = fila)
+    erp_db_pool_checkouts_total        conexões obtidas do pool
+    erp_db_pool_connect_seconds        abertura de conexões novas pelo pool
+    erp_sql_statements_total           comandos SQL por blueprint/endpoint
+    erp_sql_duration_seconds_total     tempo de SQL por blueprint/endpoint
+    erp_cache_requests_total           leituras dos caches por resultado (hit/miss)
+
+A taxa de acerto dos caches é calculada na consulta, por exemplo:
+    sum by (cache) (rate(erp_cache_requests_total{result="hit"}[5m]))
+      / sum by (cache) (rate(erp_cache_requests_total[5m]))
+
+Com vários workers do gunicorn, cada processo grava seus valores em arquivos
+mmap no diretório PROMETHEUS_MULTIPROC_DIR (modo multiprocess do
+prometheus_client) e o /metrics de qualquer worker soma todos eles. A
+variável precisa estar definida antes de a aplicação ser importada; o
+gunicorn.conf.py da raiz cuida disso e limpa os arquivos dos workers que
+terminam. Sem a variável, cada processo exporta apenas os seus números.
+
+Se METRICS_TOKEN estiver definido, /metrics exige
+`Authorization: Bearer <token>`.
+"""
+
+import hmac
+import os
+import time
+
+from flask import (abort, g, has_request_context, request, request_finished,
+                   request_started, request_tearing_down, Response)
+from prometheus_client import (CollectorRegistry, CONTENT_TYPE_LATEST, Counter, Gauge,
+                               generate_latest, Histogram, REGISTRY)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+from app.services.cache_stats import add_cache_observer
+from app.services.sql_timing import add_statement_observer
+
+POOL_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    'erp_http_request_duration_seconds', 'Duração das requisições HTTP',
+    ['blueprint', 'endpoint', 'method'],
+)
+REQUESTS = Counter(
+    'erp_http_requests_total', 'Requisições HTTP atendidas',
+    ['blueprint', 'endpoint', 'method', 'status'],
+)
+IN_FLIGHT = Gauge(
+    'erp_http_requests_in_flight', 'Requisições HTTP em andamento',
+    multiprocess_mode='livesum',
+)
+POOL_IN_USE = Gauge(
+    'erp_db_pool_connections_in_use', 'Conexões do pool do SQLAlchemy em uso',
+    multiprocess_mode='livesum',
+)
+POOL_CHECKOUTS = Counter(
+    'erp_db_pool_checkouts_total', 'Conexões obtidas do pool do SQLAlchemy',
+)
+POOL_CONNECT = Histogram(
+    'erp_db_pool_connect_seconds', 'Tempo para abrir uma conexão nova do pool',
+    buckets=POOL_BUCKETS,
+)
+SQL_STATEMENTS = Counter(
+    'erp_sql_statements_total', 'Comandos SQL executados',
+    ['blueprint', 'endpoint'],
+)
+SQL_DURATION = Counter(
+    'erp_sql_duration_seconds_total', 'Tempo gasto no cursor pelos comandos SQL',
+    ['blueprint', 'endpoint'],
+)
+CACHE_REQUESTS = Counter(
+    'erp_cache_requests_total', 'Leituras dos caches em memória',
+    ['cache', 'result'],
+)
+
+_G_KEY = '_metrics_started'
+_CONNECT_KEY = '_metrics_connect_started'
+_NO_ENDPOINT = 'none'
+
+def _labels():
+    if not has_request_context():
+        return _NO_ENDPOINT, _NO_ENDPOINT
+    return request.blueprint or _NO_ENDPOINT, request.endpoint or _NO_ENDPOINT
+
+def _request_started(sender, **extra):
+    g.setdefault(_G_KEY, time.perf_counter())
+    IN_FLIGHT.inc()
+
+def _request_finished(sender, response, **extra):
+    g._metrics_status = response.status_code
+
+def _request_tearing_down(sender, exc=None, **extra):
+    started = g.pop(_G_KEY, None)
+    if started is None:
+        return
+    IN_FLIGHT.dec()
+    blueprint, endpoint = _labels()
+    status = g.pop('_metrics_status', 500)
+    REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(blueprint, endpoint, request.method, str(status)).inc()
+
+def _observe_statement(conn, cursor, statement, parameters, context, executemany, elapsed_ms):
+    labels = _labels()
+    SQL_STATEMENTS.labels(*labels).inc()
+    SQL_DURATION.labels(*labels).inc(elapsed_ms / 1000)
+
+def _observe_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+def _do_connect(dialect, connection_record, cargs, cparams):
+    connection_record.info[_CONNECT_KEY] = time.perf_counter()
+
+def _pool_connect(dbapi_connection, connection_record):
+    started = connection_record.info.pop(_CONNECT_KEY, None)
+    if started is not None:
+        POOL_CONNECT.observe(time.perf_counter() - started)
+
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKOUTS.inc()
+    POOL_IN_USE.inc()
+
+def _pool_checkin(dbapi_connection, connection_record):
+    POOL_IN_USE.dec()
+
+def _instrument_pool(engine):
+    """Conexões em uso, retiradas e abertura de conexões pelos eventos do pool"""
+    if event.contains(engine, 'checkout', _pool_checkout):
+        return
+    event.listen(engine, 'do_connect', _do_connect)
+    event.listen(engine, 'connect', _pool_connect)
+    event.listen(engine, 'checkout', _pool_checkout)
+    event.listen(engine, 'checkin', _pool_checkin)
+
+def collect_metrics():
+    """Texto no formato do Prometheus, somando os workers no modo multiprocess"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+def register_metrics(app, db):
+    """Instrumenta requisições, engine e caches e publica /metrics"""
+    with app.app_context():
+        engine = db.engine
+    add_statement_observer(engine, _observe_statement)
+    _instrument_pool(engine)
+
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+    request_tearing_down.connect(_request_tearing_down, app)
+    add_cache_observer(_observe_cache)
+
+    token = app.config.get('METRICS_TOKEN')
+
+    def metrics():
+        header = request.headers.get('Authorization', '')
+        if token and not hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            abort(401)
+        return Response(collect_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
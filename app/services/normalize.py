@@ -0,0 +1,32 @@
+"""
+Normalização de textos para buscas exatas (chaves de lookup).
+
+Funções puras, sem dependências da aplicação, usadas tanto pelos modelos
+(para gravar as chaves) quanto pelas consultas (para normalizar o valor
+procurado da mesma forma).
+"""
+
+import re
+import unicodedata
+
+_SPACES = re.compile(r'\s+')
+_NON_DIGITS = re.compile(r'\D')
+
+def normalize_name(value):
+    """Sem acentos, casefold e espaços simples: 'José  da SILVA' -> 'jose da silva'"""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _SPACES.sub(' ', stripped.casefold()).strip()
+
+def normalize_email(value):
+    return value.strip().lower() if value else value
+
+def normalize_instagram(value):
+    """Sem o @ inicial e em minúsculas"""
+    return value.strip().lstrip('@').lower() if value else value
+
+def normalize_digits(value):
+    """Só os dígitos (telefone, CPF/CNPJ)"""
+    return _NON_DIGITS.sub('', value) if value else value
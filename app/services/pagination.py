@@ -0,0 +1,203 @@
+"""
+Paginação por keyset (seek): em vez de OFFSET, cada página continua a partir
+da chave de ordenação do último item da página anterior, que é transportada
+em um cursor opaco. O custo de qualquer página é o mesmo da primeira.
+
+Pode ser usada por qualquer listagem: basta informar a consulta filtrada e
+as chaves de ordenação, terminando em uma coluna única (normalmente o id).
+
+Convenção das listagens:
+    ?after=<cursor>  / ?before=<cursor>   próxima / página anterior
+    páginas HTML      macro keyset_pagination (templates/macros/pagination.html)
+    respostas JSON    {"items": [...], "next_cursor": cursor ou null}, com o
+                      cursor também no cabeçalho X-Next-Cursor (cursor_json);
+                      a API de clientes mantém o corpo em lista e usa só o
+                      cabeçalho
+"""
+
+import base64
+import json
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask import request, flash, jsonify
+from sqlalchemy import and_, or_, inspect
+from sqlalchemy.sql.util import find_tables
+
+from app.services.cache import TTLCache, mark_changed, watch_changes
+
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 256
+
+_CACHE = 'pagination_count'
+
+_count_cache = TTLCache(_CACHE, COUNT_CACHE_TTL, COUNT_CACHE_SIZE)
+# Tabelas lidas pelas contagens em cache: alterar uma linha delas pode movê-la
+# para dentro ou para fora de um filtro
+_counted_tables = set()
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou incompatível com a ordenação"""
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+def encode_cursor(values):
+    """Serializa os valores da chave de ordenação em um token seguro para URL"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Reconstrói os valores da chave a partir do token de `encode_cursor`"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor('Cursor de paginação inválido')
+
+def seek_condition(keys, values):
+    """
+    Condição "depois de `values`" para a ordenação `keys`.
+
+    `keys` é uma lista de (expressão, descendente). A última chave deve ser
+    única (normalmente o id) para que a ordem seja total.
+    """
+    clauses = []
+    for index, ((column, descending), value) in enumerate(zip(keys, values)):
+        equal_prefix = [c == v for (c, _), v in zip(keys[:index], values[:index])]
+        clauses.append(and_(*equal_prefix, column < value if descending else column > value))
+    return or_(*clauses)
+
+def order_by_keys(keys):
+    return [column.desc() if descending else column.asc() for column, descending in keys]
+
+def _flip(keys):
+    return [(column, not descending) for column, descending in keys]
+
+class KeysetPagination:
+    """Página de resultados com cursores para a próxima e a anterior"""
+
+    def __init__(self, items, per_page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+def paginate_keyset(query, keys, after=None, before=None, per_page=20, with_total=True):
+    """
+    Busca uma página de `query` (consulta de uma entidade) ordenada por `keys`.
+
+    `after` continua depois do último item de uma página; `before` volta para
+    a página anterior ao primeiro item. O total, quando pedido, vem de
+    `cached_count` e não é recalculado a cada página.
+    Levanta InvalidCursor se o cursor não puder ser decodificado.
+    """
+    backwards = bool(before) and not after
+    cursor = before if backwards else after
+    walk_keys = _flip(keys) if backwards else keys
+
+    total = cached_count(query) if with_total else None
+
+    key_columns = [column for column, _ in keys]
+    page_query = query.add_columns(*key_columns)
+    if cursor:
+        page_query = page_query.filter(seek_condition(walk_keys, decode_cursor(cursor, len(keys))))
+
+    rows = page_query.order_by(None).order_by(*order_by_keys(walk_keys)).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if backwards:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor)
+
+    next_cursor = encode_cursor(list(rows[-1])[1:]) if rows and has_next else None
+    prev_cursor = encode_cursor(list(rows[0])[1:]) if rows and has_prev else None
+    return KeysetPagination([row[0] for row in rows], per_page, total, next_cursor, prev_cursor)
+
+def paginate_request(query, keys, per_page=20):
+    """`paginate_keyset` com os cursores `after`/`before` da requisição atual"""
+    try:
+        return paginate_keyset(query, keys,
+                               after=request.args.get('after'),
+                               before=request.args.get('before'),
+                               per_page=per_page)
+    except InvalidCursor:
+        flash('Link de paginação inválido, exibindo a primeira página.', 'warning')
+        return paginate_keyset(query, keys, per_page=per_page)
+
+def cursor_json(items, next_cursor):
+    """Resposta JSON de uma página: itens, próximo cursor e X-Next-Cursor"""
+    response = jsonify({'items': items, 'next_cursor': next_cursor})
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def pagination_args(args):
+    """Parâmetros da URL atual sem os cursores de paginação"""
+    return {key: value for key, value in args.items() if key not in ('page', 'after', 'before')}
+
+def _count_key(query):
+    statement = query.order_by(None).statement
+    compiled = statement.compile(dialect=query.session.get_bind().dialect)
+    params = sorted((name, repr(value)) for name, value in compiled.params.items())
+    return str(compiled), tuple(params)
+
+def cached_count(query):
+    """
+    Total de linhas de `query`, reaproveitado por COUNT_CACHE_TTL segundos.
+
+    O cache é descartado quando este processo insere ou remove registros,
+    altera uma linha de uma tabela contada ou move estoque; mudanças de
+    outros processos aparecem após o TTL.
+    """
+    def count():
+        _counted_tables.update(table.name for table in find_tables(query.statement, check_columns=True))
+        return query.order_by(None).count()
+
+    return _count_cache.get(_count_key(query), count)
+
+def invalidate_counts():
+    _count_cache.invalidate()
+
+def mark_counts_dirty():
+    """Descarta os totais no próximo commit (para escritas feitas fora do ORM)"""
+    mark_changed(_CACHE)
+
+def _touches_counted(session):
+    for obj in session.dirty:
+        if inspect(obj).mapper.persist_selectable.name in _counted_tables and session.is_modified(obj):
+            return True
+    return False
+
+def _collect(session):
+    return {True} if session.new or session.deleted or _touches_counted(session) else ()
+
+def register_pagination_listeners():
+    """Descarta os totais em cache quando registros são criados, alterados ou removidos"""
+    watch_changes(_CACHE, _collect, lambda marks: invalidate_counts())
@@ -0,0 +1,344 @@
+"""
+Agregados diários (rollups) para o dashboard.
+
+As tabelas daily_kpi e daily_customer_sales são atualizadas de forma
+incremental a cada flush da sessão: as alterações em Sale, Customer, Product
+e Transaction viram deltas somados ao dia correspondente, na mesma transação
+da escrita. Assim o dashboard responde qualquer período somando poucas
+linhas, sem varrer as tabelas de origem.
+"""
+
+from datetime import datetime, date
+from decimal import Decimal
+
+from sqlalchemy import event, inspect, select, func, case, delete, and_, literal
+from sqlalchemy.dialects import sqlite, postgresql
+
+from app import db
+from app.models.rollup import DailyKPI, DailyCustomerSales
+from app.models.crm import Customer, Sale
+from app.models.inventory import Product
+from app.models.finance import Transaction
+
+_PENDING_KEY = 'rollup_pending'
+
+def _day(value):
+    """Converte datetime/date/str para date (None = hoje, como os defaults utcnow)"""
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def _money(value):
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+def _previous_values(session, obj, attrs):
+    """Valores de `attrs` antes das alterações pendentes do objeto"""
+    state = inspect(obj)
+    values = {}
+    missing = []
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            missing.append(attr)
+
+    if missing:
+        # Atributo alterado sem ter sido carregado: buscar o valor gravado
+        mapper = state.mapper
+        columns = [mapper.columns[attr] for attr in missing]
+        pk_filter = [col == value for col, value in zip(mapper.primary_key, state.identity)]
+        row = session.connection().execute(select(*columns).where(*pk_filter)).first()
+        for attr, value in zip(missing, row or [None] * len(missing)):
+            values[attr] = value
+    return values
+
+def _current_values(obj, attrs):
+    return {attr: getattr(obj, attr) for attr in attrs}
+
+class _Pending:
+    """Deltas acumulados durante um flush"""
+
+    def __init__(self):
+        self.kpi = {}
+        self.customer_sales = {}
+
+    @staticmethod
+    def _add(bucket, key, column, value):
+        if not value:
+            return
+        row = bucket.setdefault(key, {})
+        row[column] = row.get(column, 0) + value
+
+    def kpi_add(self, day, column, value):
+        self._add(self.kpi, day, column, value)
+
+    def customer_sales_add(self, day, customer_id, column, value):
+        self._add(self.customer_sales, (day, customer_id), column, value)
+
+    def __bool__(self):
+        return bool(self.kpi or self.customer_sales)
+
+# Cada função de contribuição recebe um dicionário de valores (antigos ou
+# novos) e um sinal (+1 para somar, -1 para desfazer) e registra os deltas.
+
+_SALE_ATTRS = ('sale_date', 'customer_id', 'total_amount')
+_CUSTOMER_ATTRS = ('created_at',)
+_PRODUCT_ATTRS = ('created_at', 'current_stock', 'cost_price')
+_TRANSACTION_ATTRS = ('transaction_date', 'transaction_type', 'status', 'amount')
+
+def _sale_contribution(pending, values, sign):
+    day = _day(values['sale_date'])
+    amount = _money(values['total_amount']) * sign
+    pending.kpi_add(day, 'sales_count', sign)
+    pending.kpi_add(day, 'sales_total', amount)
+    if values['customer_id'] is not None:
+        customer_id = int(values['customer_id'])
+        pending.customer_sales_add(day, customer_id, 'sales_count', sign)
+        pending.customer_sales_add(day, customer_id, 'sales_total', amount)
+
+def _customer_contribution(pending, values, sign):
+    pending.kpi_add(_day(values['created_at']), 'new_customers', sign)
+
+def _product_contribution(pending, values, sign, include_count=True):
+    if include_count:
+        pending.kpi_add(_day(values['created_at']), 'new_products', sign)
+    stock_value = (values['current_stock'] or 0) * _money(values['cost_price'])
+    # O valor do estoque é uma série temporal: a variação entra no dia da alteração
+    pending.kpi_add(datetime.utcnow().date(), 'stock_value_change', stock_value * sign)
+
+def _transaction_contribution(pending, values, sign):
+    if values['status'] != 'completed':
+        return
+    column = {'receita': 'income_total', 'despesa': 'expense_total'}.get(values['transaction_type'])
+    if column:
+        pending.kpi_add(_day(values['transaction_date']), column, _money(values['amount']) * sign)
+
+_TRACKED = (
+    (Sale, _SALE_ATTRS, _sale_contribution),
+    (Customer, _CUSTOMER_ATTRS, _customer_contribution),
+    (Product, _PRODUCT_ATTRS, _product_contribution),
+    (Transaction, _TRANSACTION_ATTRS, _transaction_contribution),
+)
+
+def _collect(session, pending):
+    for obj in session.new:
+        for model, attrs, contribute in _TRACKED:
+            if isinstance(obj, model):
+                contribute(pending, _current_values(obj, attrs), 1)
+
+    for obj in session.deleted:
+        for model, attrs, contribute in _TRACKED:
+            if isinstance(obj, model):
+                contribute(pending, _previous_values(session, obj, attrs), -1)
+
+    for obj in session.dirty:
+        for model, attrs, contribute in _TRACKED:
+            if not isinstance(obj, model) or not session.is_modified(obj):
+                continue
+            state = inspect(obj)
+            if not any(state.attrs[attr].history.has_changes() for attr in attrs):
+                continue
+            previous = _previous_values(session, obj, attrs)
+            current = _current_values(obj, attrs)
+            if model is Product:
+                # Alteração de produto não muda a contagem, só o valor do estoque
+                contribute(pending, previous, -1, include_count=False)
+                contribute(pending, current, 1, include_count=False)
+            else:
+                contribute(pending, previous, -1)
+                contribute(pending, current, 1)
+
+def _upsert(connection, table, key, deltas):
+    """Soma `deltas` na linha identificada por `key`, criando-a se necessário"""
+    extra = {}
+    if 'updated_at' in table.c:
+        extra['updated_at'] = datetime.utcnow()
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(table).values(**key, **deltas, **extra)
+        update_set = {column: table.c[column] + stmt.excluded[column] for column in deltas}
+        update_set.update(extra)
+        connection.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=update_set))
+        return
+
+    where = [table.c[column] == value for column, value in key.items()]
+    values = {column: table.c[column] + value for column, value in deltas.items()}
+    values.update(extra)
+    result = connection.execute(table.update().where(*where).values(**values))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**key, **deltas, **extra))
+
+def apply_deltas(connection, kpi=None, customer_sales=None):
+    """Aplica deltas já calculados (usado também por escritas em massa via Core)"""
+    for day, deltas in (kpi or {}).items():
+        deltas = {column: value for column, value in deltas.items() if value}
+        if deltas:
+            _upsert(connection, DailyKPI.__table__, {'day': day}, deltas)
+    for (day, customer_id), deltas in (customer_sales or {}).items():
+        deltas = {column: value for column, value in deltas.items() if value}
+        if deltas:
+            _upsert(connection, DailyCustomerSales.__table__,
+                    {'day': day, 'customer_id': customer_id}, deltas)
+
+def record_stock_value_change(connection, value_change, day=None):
+    """Registra variação do valor do estoque feita fora do ORM"""
+    if value_change:
+        apply_deltas(connection, kpi={day or datetime.utcnow().date(): {'stock_value_change': _money(value_change)}})
+
+def _before_flush(session, flush_context, instances):
+    pending = _Pending()
+    _collect(session, pending)
+    session.info[_PENDING_KEY] = pending
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        apply_deltas(session.connection(), pending.kpi, pending.customer_sales)
+
+def register_rollup_listeners():
+    """Conecta a manutenção incremental dos rollups à sessão do Flask-SQLAlchemy"""
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+
+def _insert_rows(connection, table, key_columns, bucket):
+    columns = [column.name for column in table.c
+               if column.name not in key_columns and column.name != 'updated_at']
+    now = datetime.utcnow()
+    rows = []
+    for key, deltas in bucket.items():
+        row = dict(zip(key_columns, key if isinstance(key, tuple) else (key,)))
+        row.update({column: deltas.get(column, 0) for column in columns})
+        if 'updated_at' in table.c:
+            row['updated_at'] = now
+        rows.append(row)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+def rebuild_rollups():
+    """Recalcula todos os rollups a partir das tabelas de origem"""
+    kpi = {}
+    customer_sales = {}
+
+    def add(bucket, key, column, value):
+        if value:
+            bucket.setdefault(key, {})[column] = value
+
+    sales_day = func.date(Sale.sale_date)
+    for day, count, total in db.session.query(
+        sales_day, func.count(Sale.id), func.sum(Sale.total_amount)
+    ).group_by(sales_day):
+        add(kpi, _day(day), 'sales_count', count)
+        add(kpi, _day(day), 'sales_total', _money(total))
+
+    for day, customer_id, count, total in db.session.query(
+        sales_day, Sale.customer_id, func.count(Sale.id), func.sum(Sale.total_amount)
+    ).group_by(sales_day, Sale.customer_id):
+        add(customer_sales, (_day(day), customer_id), 'sales_count', count)
+        add(customer_sales, (_day(day), customer_id), 'sales_total', _money(total))
+
+    customer_day = func.date(Customer.created_at)
+    for day, count in db.session.query(customer_day, func.count(Customer.id)).group_by(customer_day):
+        add(kpi, _day(day), 'new_customers', count)
+
+    product_day = func.date(Product.created_at)
+    for day, count in db.session.query(product_day, func.count(Product.id)).group_by(product_day):
+        add(kpi, _day(day), 'new_products', count)
+
+    for day, transaction_type, total in db.session.query(
+        Transaction.transaction_date, Transaction.transaction_type, func.sum(Transaction.amount)
+    ).filter(
+        Transaction.status == 'completed',
+        Transaction.transaction_type.in_(('receita', 'despesa'))
+    ).group_by(Transaction.transaction_date, Transaction.transaction_type):
+        column = 'income_total' if transaction_type == 'receita' else 'expense_total'
+        add(kpi, _day(day), column, _money(total))
+
+    # Sem histórico disponível: o valor atual do estoque vira o ponto de partida
+    stock_value = db.session.query(
+        func.sum(Product.current_stock * Product.cost_price)
+    ).scalar()
+    add(kpi, datetime.utcnow().date(), 'stock_value_change', _money(stock_value))
+
+    connection = db.session.connection()
+    connection.execute(delete(DailyKPI.__table__))
+    connection.execute(delete(DailyCustomerSales.__table__))
+    # Tabelas vazias: inserção em lote (executemany) em vez de upsert por linha
+    _insert_rows(connection, DailyKPI.__table__, ('day',), kpi)
+    _insert_rows(connection, DailyCustomerSales.__table__, ('day', 'customer_id'), customer_sales)
+    db.session.commit()
+
+def kpi_summary(start_day=None, end_day=None):
+    """
+    Totais gerais e do período [start_day, end_day] em uma única consulta.
+    O valor do estoque (custo) é o acumulado das variações diárias: antes do
+    início do período (stock_value_start) e ao final dele (stock_value_end).
+    """
+    conditions = []
+    if start_day is not None:
+        conditions.append(DailyKPI.day >= start_day)
+    if end_day is not None:
+        conditions.append(DailyKPI.day <= end_day)
+
+    def period_sum(column):
+        if conditions:
+            column = case((and_(*conditions), column), else_=0)
+        return func.coalesce(func.sum(column), 0)
+
+    def stock_value(condition=None):
+        column = DailyKPI.stock_value_change
+        if condition is not None:
+            column = case((condition, column), else_=0)
+        return func.coalesce(func.sum(column), 0)
+
+    row = db.session.query(
+        func.coalesce(func.sum(DailyKPI.sales_count), 0).label('total_sales'),
+        func.coalesce(func.sum(DailyKPI.new_customers), 0).label('total_customers'),
+        func.coalesce(func.sum(DailyKPI.new_products), 0).label('total_products'),
+        period_sum(DailyKPI.sales_count).label('sales_count'),
+        period_sum(DailyKPI.sales_total).label('sales_total'),
+        period_sum(DailyKPI.new_customers).label('new_customers'),
+        period_sum(DailyKPI.income_total).label('income_total'),
+        period_sum(DailyKPI.expense_total).label('expense_total'),
+        (stock_value(DailyKPI.day < start_day) if start_day is not None
+         else literal(0)).label('stock_value_start'),
+        (stock_value(DailyKPI.day <= end_day) if end_day is not None
+         else stock_value()).label('stock_value_end'),
+    ).one()
+
+    summary = dict(row._mapping)
+    for key in ('total_sales', 'total_customers', 'total_products', 'sales_count', 'new_customers'):
+        summary[key] = int(summary[key])
+    for key in ('sales_total', 'income_total', 'expense_total', 'stock_value_start', 'stock_value_end'):
+        summary[key] = _money(summary[key])
+    return summary
+
+def top_customers(start_day=None, end_day=None, limit=5):
+    """Clientes com maior valor de compra no período"""
+    total_spent = func.sum(DailyCustomerSales.sales_total).label('total_spent')
+    query = db.session.query(
+        Customer.name,
+        total_spent
+    ).join(Customer, Customer.id == DailyCustomerSales.customer_id)
+
+    if start_day is not None:
+        query = query.filter(DailyCustomerSales.day >= start_day)
+    if end_day is not None:
+        query = query.filter(DailyCustomerSales.day <= end_day)
+
+    return query.group_by(Customer.id, Customer.name).having(
+        func.sum(DailyCustomerSales.sales_count) > 0
+    ).order_by(total_spent.desc()).limit(limit).all()
@@ -0,0 +1,213 @@
+"""
+Busca textual em produtos, clientes e transações com o FTS5 do SQLite.
+
+Cada modelo de SEARCH_INDEXES tem uma tabela virtual `<tabela>_fts` de
+conteúdo externo: o índice guarda só os termos e aponta para o id da
+linha original, sem duplicar o texto. Triggers na tabela original mantêm o
+índice em dia em toda inserção, remoção e alteração das colunas indexadas
+(inclusive gravações fora do ORM); alterações em outras colunas, como o
+estoque, não tocam o índice.
+
+O texto digitado vira uma consulta por prefixo sem acentos: "cafe pil"
+encontra "Café Pilão". Os resultados são ordenados pelo bm25, com pesos
+por coluna (o nome pesa mais que a descrição).
+
+As tabelas e triggers são criados junto com a tabela original (create_all)
+ou pela migração scripts/migrations/migrate_search.py. Em outros bancos a
+busca volta a ser um ILIKE nas mesmas colunas.
+"""
+
+import re
+
+from flask import url_for
+from sqlalchemy import column, event, or_, select, table
+
+from app import db
+from app.models.crm import Customer
+from app.models.finance import Transaction
+from app.models.inventory import Product
+
+SEARCH_LIMIT = 10
+
+# Tokenizador: sem acentos e sem diferenciar maiúsculas; índices de prefixo
+# de 2 e 3 caracteres deixam rápidas as buscas por termos curtos
+_TOKENIZE = 'unicode61 remove_diacritics 2'
+_PREFIX = '2 3'
+
+_WORD = re.compile(r'\w+')
+
+class SearchIndex:
+    """Tabela FTS5 de conteúdo externo de um modelo e seus triggers"""
+
+    def __init__(self, model, columns, weights):
+        self.model = model
+        self.columns = columns
+        self.weights = weights
+        self.source = model.__table__.name
+        self.name = f'{self.source}_fts'
+        # Colunas ocultas do FTS5: rowid, rank e a de mesmo nome da tabela (MATCH)
+        self.table = table(self.name, column('rowid'), column('rank'), column(self.name),
+                           *[column(name) for name in columns])
+
+    def _values(self, prefix):
+        return ', '.join(f'{prefix}."{name}"' for name in self.columns)
+
+    def create_statements(self):
+        names = ', '.join(f'"{name}"' for name in self.columns)
+        remove = (f"INSERT INTO {self.name}({self.name}, rowid, {names}) "
+                  f"VALUES ('delete', old.id, {self._values('old')});")
+        add = f"INSERT INTO {self.name}(rowid, {names}) VALUES (new.id, {self._values('new')});"
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5({names}, "
+            f"content='{self.source}', content_rowid='id', "
+            f"tokenize='{_TOKENIZE}', prefix='{_PREFIX}')",
+            f"INSERT INTO {self.name}({self.name}, rank) VALUES ('rank', 'bm25({weights})')",
+            f'CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON "{self.source}" BEGIN {add} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON "{self.source}" BEGIN {remove} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {names} ON "{self.source}" '
+            f'BEGIN {remove} {add} END',
+        ]
+
+    def drop_statements(self):
+        return [f'DROP TRIGGER IF EXISTS {self.name}_{suffix}' for suffix in ('ai', 'ad', 'au')] + \
+               [f'DROP TABLE IF EXISTS {self.name}']
+
+    def rebuild_statement(self):
+        """Reconstrói o índice a partir da tabela original (dados já existentes)"""
+        return f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')"
+
+SEARCH_INDEXES = {
+    'products': SearchIndex(Product, ('name', 'sku', 'barcode', 'description'), (10.0, 8.0, 8.0, 1.0)),
+    'customers': SearchIndex(Customer, ('name', 'email', 'company', 'instagram'), (10.0, 5.0, 3.0, 5.0)),
+    'transactions': SearchIndex(Transaction, ('description', 'reference'), (5.0, 8.0)),
+}
+
+def match_query(text, columns=None):
+    """
+    Consulta FTS5 para o texto digitado, ou None se não houver termos.
+
+    Cada palavra separada por espaço vira uma frase com prefixo no último
+    termo ("SKU-0001" -> "sku 0001"*), e todas precisam aparecer. Só letras
+    e dígitos passam, então o texto nunca é interpretado como sintaxe do FTS5.
+    """
+    phrases = []
+    for word in (text or '').split():
+        tokens = _WORD.findall(word)
+        if tokens:
+            phrases.append('"%s"*' % ' '.join(tokens))
+    if not phrases:
+        return None
+    query = ' '.join(phrases)
+    if columns:
+        query = '{%s} : (%s)' % (' '.join(columns), query)
+    return query
+
+def fts_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+def _fallback(index, text, columns):
+    """ILIKE nas colunas indexadas (bancos sem FTS5)"""
+    model = index.model
+    return or_(*[getattr(model, name).ilike(f'%{text}%') for name in (columns or index.columns)])
+
+def search_hits(name, text, columns=None):
+    """Subconsulta (id, rank) dos registros encontrados, ou None se não houver termos"""
+    index = SEARCH_INDEXES[name]
+    query = match_query(text, columns)
+    if query is None:
+        return None
+    fts = index.table
+    return (select(fts.c.rowid.label('id'), fts.c.rank.label('rank'))
+            .where(fts.c[index.name].match(query))
+            .subquery(f'{index.name}_hits'))
+
+def search_filter(name, id_column, text, columns=None):
+    """
+    Condição "`id_column` está entre os encontrados" para filtrar listagens,
+    ou None quando o texto não tem termos pesquisáveis.
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+    index = SEARCH_INDEXES[name]
+    if not fts_enabled():
+        # O id_column pode ser de outra tabela (ex.: Appointment.customer_id)
+        return id_column.in_(select(index.model.id).where(_fallback(index, text, columns)))
+    hits = search_hits(name, text, columns)
+    if hits is None:
+        return None
+    return id_column.in_(select(hits.c.id))
+
+def ranked_search(query, name, text, columns=None):
+    """
+    Filtra `query` (que tem o modelo do índice) pelo texto e devolve
+    (query, rank): `rank` é a expressão de relevância (menor = melhor) para
+    ordenar ou usar como chave do keyset, ou None sem o FTS5.
+    """
+    index = SEARCH_INDEXES[name]
+    if not fts_enabled():
+        return query.filter(_fallback(index, text, columns)), None
+    hits = search_hits(name, text, columns)
+    if hits is None:
+        return query, None
+    return query.join(hits, hits.c.id == index.model.id), hits.c.rank
+
+def _ranked_rows(name, text, fields, limit):
+    index = SEARCH_INDEXES[name]
+    model = index.model
+    query = db.session.query(model.id, *[getattr(model, field) for field in fields])
+    query, rank = ranked_search(query, name, text)
+    order = [rank, model.id] if rank is not None else [model.id]
+    return query.order_by(*order).limit(limit).all()
+
+def global_search(text, limit=SEARCH_LIMIT):
+    """Melhores resultados de cada tipo, com o link para o detalhe"""
+    if match_query(text) is None:
+        return {name: [] for name in SEARCH_INDEXES}
+    return {
+        'products': [
+            {'id': row.id, 'title': row.name, 'subtitle': row.sku,
+             'url': url_for('inventory.product_detail', id=row.id)}
+            for row in _ranked_rows('products', text, ('name', 'sku'), limit)
+        ],
+        'customers': [
+            {'id': row.id, 'title': row.name, 'subtitle': row.email or row.company,
+             'url': url_for('crm.customer_detail', id=row.id)}
+            for row in _ranked_rows('customers', text, ('name', 'email', 'company'), limit)
+        ],
+        'transactions': [
+            {'id': row.id, 'title': row.description, 'subtitle': row.reference,
+             'url': url_for('finance.transaction_detail', id=row.id)}
+            for row in _ranked_rows('transactions', text, ('description', 'reference'), limit)
+        ],
+    }
+
+def create_search_indexes(connection, rebuild=False):
+    """Cria as tabelas FTS5 e os triggers que faltam (e reindexa, se pedido)"""
+    for index in SEARCH_INDEXES.values():
+        for statement in index.create_statements():
+            connection.exec_driver_sql(statement)
+        if rebuild:
+            connection.exec_driver_sql(index.rebuild_statement())
+
+def _index_of(target):
+    return next(index for index in SEARCH_INDEXES.values() if index.model.__table__ is target)
+
+def _after_create(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in _index_of(target).create_statements():
+            connection.exec_driver_sql(statement)
+
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in _index_of(target).drop_statements():
+            connection.exec_driver_sql(statement)
+
+def register_search_indexes():
+    """Cria/remove o índice FTS5 de cada modelo junto com a tabela original"""
+    for index in SEARCH_INDEXES.values():
+        source = index.model.__table__
+        if not event.contains(source, 'after_create', _after_create):
+            event.listen(source, 'after_create', _after_create)
+            event.listen(source, 'before_drop', _before_drop)
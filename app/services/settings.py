@@ -0,0 +1,172 @@
+"""
+Configurações do sistema (SystemSettings, EmailSettings e BackupSettings)
+em cache por processo.
+
+get_settings() devolve um SettingsSnapshot imutável com as três linhas
+(cada seção é um mapeamento somente leitura dos valores das colunas, ou
+None quando a linha ainda não existe). O snapshot é carregado uma vez e
+reaproveitado enquanto o contador settings_version do banco não mudar.
+
+Toda gravação das configurações pela sessão incrementa o contador na mesma
+transação; o processo que gravou descarta o snapshot no commit e os demais
+workers percebem a nova versão na próxima verificação, feita no máximo a
+cada SETTINGS_VERSION_CHECK segundos (uma consulta pela chave primária).
+
+Segredos (SECRET_COLUMNS, como a senha SMTP) ficam fora do snapshot, que
+é visível nos templates; quem precisar deles lê a linha do banco.
+
+Nos templates o snapshot fica em `app_settings`, avaliado só quando usado:
+    {{ app_settings.currency }}  {{ app_settings.system.company_name }}
+e o filtro `money` formata valores na moeda configurada:
+    {{ sale.total_amount|money }}  ->  R$ 12.50
+
+Consumidores: a moeda nos valores dos templates, o fuso horário nas datas
+padrão dos formulários do financeiro (local_today), o limite de estoque
+baixo como estoque mínimo padrão dos produtos novos e os dias para
+vencimento na data padrão das faturas.
+"""
+
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from flask import current_app, has_app_context
+from sqlalchemy import inspect, select, update
+from werkzeug.local import LocalProxy
+
+from app import db
+from app.models.settings import SystemSettings, EmailSettings, BackupSettings, SettingsVersion
+from app.services.cache import TTLCache, watch_changes
+
+SETTINGS_VERSION_CHECK = 5
+
+# Seção do snapshot de cada modelo
+SECTIONS = {
+    'system': SystemSettings,
+    'email': EmailSettings,
+    'backup': BackupSettings,
+}
+
+# Colunas que nunca entram no snapshot
+SECRET_COLUMNS = {
+    'email': ('smtp_password',),
+}
+
+CURRENCY_SYMBOLS = {
+    'BRL': 'R$',
+    'USD': 'US$',
+    'EUR': '€',
+}
+
+_VERSION_ID = 1
+_CACHE = 'settings'
+_EXTENSION = 'settings_cache'
+
+class SettingsSnapshot(NamedTuple):
+    version: int
+    system: Optional[Mapping]
+    email: Optional[Mapping]
+    backup: Optional[Mapping]
+
+    def value(self, section, key):
+        """Valor da coluna, ou o padrão do modelo quando a linha não existe ou está vazia"""
+        row = getattr(self, section)
+        if row is not None and row.get(key) is not None:
+            return row[key]
+        default = SECTIONS[section].__table__.c[key].default
+        return default.arg if default is not None and default.is_scalar else None
+
+    @property
+    def currency(self):
+        return self.value('system', 'currency')
+
+    @property
+    def timezone(self):
+        return self.value('system', 'timezone')
+
+    @property
+    def low_stock_threshold(self):
+        return self.value('system', 'low_stock_threshold')
+
+    @property
+    def invoice_due_days(self):
+        return self.value('system', 'invoice_due_days')
+
+    @property
+    def currency_symbol(self):
+        return CURRENCY_SYMBOLS.get(self.currency, self.currency)
+
+def _current_version():
+    version = db.session.execute(
+        select(SettingsVersion.version).where(SettingsVersion.id == _VERSION_ID)
+    ).scalar()
+    return version or 0
+
+def _row(section, model):
+    obj = db.session.execute(select(model).order_by(model.id).limit(1)).scalar()
+    if obj is None:
+        return None
+    secrets = SECRET_COLUMNS.get(section, ())
+    return MappingProxyType({attr.key: getattr(obj, attr.key) for attr in inspect(model).column_attrs
+                             if attr.key not in secrets})
+
+def load_settings():
+    """Lê a versão e as três linhas do banco (sem cache)"""
+    # A versão é lida antes: uma gravação concorrente leva a uma nova leitura
+    version = _current_version()
+    return SettingsSnapshot(version, **{section: _row(section, model) for section, model in SECTIONS.items()})
+
+def _cache():
+    return current_app.extensions[_EXTENSION]
+
+def get_settings():
+    """Snapshot atual das configurações, consultando o banco só quando a versão muda"""
+    # Vencido o intervalo, o snapshot vale enquanto o contador do banco não mudar
+    return _cache().get(_CACHE, load_settings, ttl=SETTINGS_VERSION_CHECK,
+                        revalidate=lambda snapshot: _current_version() == snapshot.version)
+
+def local_today():
+    """Data de hoje no fuso horário configurado (no do servidor se o fuso for inválido)"""
+    try:
+        return datetime.now(ZoneInfo(get_settings().timezone)).date()
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return date.today()
+
+def format_money(value):
+    """Valor com o símbolo da moeda configurada e duas casas decimais"""
+    return f'{get_settings().currency_symbol} {value or 0:.2f}'
+
+def invalidate_settings():
+    """Descarta o snapshot da aplicação atual"""
+    if has_app_context() and _EXTENSION in current_app.extensions:
+        _cache().invalidate()
+
+def bump_settings_version(connection):
+    """Incrementa o contador (criando a linha na primeira gravação)"""
+    result = connection.execute(
+        update(SettingsVersion.__table__)
+        .where(SettingsVersion.__table__.c.id == _VERSION_ID)
+        .values(version=SettingsVersion.__table__.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(SettingsVersion.__table__.insert().values(id=_VERSION_ID, version=1))
+
+def _collect(session):
+    models = tuple(SECTIONS.values())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models) and (obj in session.new or obj in session.deleted
+                                        or session.is_modified(obj)):
+            return {True}
+    return ()
+
+def _bump(session, marks):
+    # Na mesma transação da gravação: ou as duas valem, ou nenhuma
+    bump_settings_version(session.connection())
+
+def register_settings(app):
+    """Cache por aplicação, `app_settings` e `money` nos templates e invalidação nas gravações"""
+    app.extensions[_EXTENSION] = TTLCache(_CACHE, SETTINGS_VERSION_CHECK, 1)
+    app.jinja_env.globals['app_settings'] = LocalProxy(get_settings)
+    app.jinja_env.filters['money'] = format_money
+    watch_changes(_CACHE, _collect, lambda marks: invalidate_settings(), on_flush=_bump)
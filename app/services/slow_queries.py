@@ -0,0 +1,137 @@
+"""
+Log de consultas lentas com EXPLAIN QUERY PLAN.
+
+Todo comando que passar de SLOW_QUERY_MS milissegundos no cursor é gravado
+em SLOW_QUERY_LOG (JSON Lines, com rotação por tamanho) com:
+
+    duration_ms, statement    tempo e SQL normalizado
+    params                    parâmetros mascarados (apenas tipo e tamanho)
+    endpoint, blueprint, ...  requisição que executou o comando
+    caller                    linha de app/routes que disparou a consulta
+    plan                      EXPLAIN QUERY PLAN (SQLite, apenas SELECTs)
+
+O EXPLAIN roda em um cursor DBAPI separado da mesma conexão, sem passar
+pelos eventos do SQLAlchemy. Com vários workers do gunicorn, use `{pid}`
+no caminho do arquivo para que cada processo tenha o seu (a rotação do
+logging não coordena processos).
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+from app.services.sql_timing import add_statement_observer, remove_statement_observer
+from app.services.sql_workload import normalize_statement
+
+LOGGER_NAME = 'erp.slow_queries'
+
+_ROUTES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'routes')
+_PROJECT_DIR = os.path.dirname(os.path.dirname(_ROUTES_DIR))
+
+_handlers = {}
+
+class SlowQueryLog:
+    """Observador do tempo dos comandos (sql_timing) que grava os acima do limite"""
+
+    def __init__(self, engine, threshold_ms, logger, explain=True):
+        self.engine = engine
+        self.threshold_ms = threshold_ms
+        self.logger = logger
+        self.explain = explain
+
+    def _observe(self, conn, cursor, statement, parameters, context, executemany, elapsed):
+        if elapsed < self.threshold_ms:
+            return
+
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'duration_ms': round(elapsed, 3),
+            'statement': normalize_statement(statement),
+            'params': redact_params(parameters, executemany),
+            'caller': route_caller(),
+        }
+        if has_request_context():
+            entry.update(endpoint=request.endpoint, blueprint=request.blueprint,
+                         method=request.method, path=request.path)
+        if self.explain and not executemany:
+            entry['plan'] = explain_plan(conn, statement, parameters)
+        self.logger.warning(json.dumps(entry, default=str, ensure_ascii=False))
+
+    def start(self):
+        add_statement_observer(self.engine, self._observe)
+        return self
+
+    def stop(self):
+        remove_statement_observer(self.engine, self._observe)
+
+def _redact(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return f'<{type(value).__name__}>'
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+def redact_params(parameters, executemany=False):
+    """Parâmetros sem os valores: só o tipo (e o tamanho de textos)"""
+    if executemany:
+        return {'executemany': len(parameters)}
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    return [_redact(value) for value in parameters or ()]
+
+def route_caller():
+    """Frame mais interno de app/routes na pilha atual ("arquivo:linha função")"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_ROUTES_DIR):
+            relative = os.path.relpath(filename, _PROJECT_DIR)
+            return f'{relative}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+def explain_plan(conn, statement, parameters):
+    """Linhas do EXPLAIN QUERY PLAN (None fora do SQLite ou para escrita)"""
+    if conn.dialect.name != 'sqlite' or not statement.lstrip()[:6].upper() == 'SELECT':
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return [row[3] for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'erro: {e}']
+    finally:
+        cursor.close()
+
+def _logger(path, max_bytes, backup_count):
+    path = path.format(pid=os.getpid())
+    logger = logging.getLogger(f'{LOGGER_NAME}.{path}')
+    if path not in _handlers:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+        _handlers[path] = handler
+    return logger
+
+def register_slow_query_log(app, db):
+    """Liga o log quando app.config['SLOW_QUERY_MS'] estiver definido"""
+    threshold = app.config.get('SLOW_QUERY_MS')
+    if threshold is None:
+        return None
+    logger = _logger(app.config['SLOW_QUERY_LOG'], app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+                     app.config['SLOW_QUERY_LOG_BACKUPS'])
+    with app.app_context():
+        return SlowQueryLog(db.engine, float(threshold), logger,
+                            explain=app.config.get('SLOW_QUERY_EXPLAIN', True)).start()
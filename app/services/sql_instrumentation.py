@@ -0,0 +1,130 @@
+"""
+Instrumentação do SQL por requisição (opcional, SQL_INSTRUMENTATION).
+
+A partir do tempo de cada comando (app/services/sql_timing.py) são
+contados, para a requisição corrente, os comandos executados, o tempo
+gasto no cursor e o comando mais lento. Os sinais request_started/request_finished do Flask iniciam a
+contagem e, ao final, devolvem os números no cabeçalho `Server-Timing`
+(visível na aba de rede do navegador) e os acumulam por endpoint.
+
+O agregado do processo fica em GET /stats/sql (administradores); com
+?reset=1 os contadores são zerados depois da leitura. Cada worker do
+gunicorn tem o seu próprio agregado.
+"""
+
+import threading
+import time
+
+from flask import abort, g, has_request_context, jsonify, request, request_finished, request_started
+from flask_login import current_user, login_required
+
+from app.services.sql_timing import add_statement_observer
+from app.services.sql_workload import normalize_statement
+
+# Tamanho máximo do comando mais lento guardado nas estatísticas
+SLOWEST_STATEMENT_SIZE = 500
+
+_G_KEY = '_sql_instrumentation'
+
+def _current():
+    return g.get(_G_KEY) if has_request_context() else None
+
+def _observe(conn, cursor, statement, parameters, context, executemany, elapsed):
+    current = _current()
+    if current is None:
+        return
+    current['queries'] += 1
+    current['sql_ms'] += elapsed
+    if elapsed > current['slowest_ms']:
+        current['slowest_ms'] = elapsed
+        current['slowest'] = statement
+
+class SQLStats:
+    """Agregado por endpoint das requisições instrumentadas do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, endpoint, current, total_ms):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'sql_ms': 0.0, 'max_sql_ms': 0.0,
+                'total_ms': 0.0, 'slowest_ms': 0.0, 'slowest': None,
+            })
+            stats['requests'] += 1
+            stats['queries'] += current['queries']
+            stats['max_queries'] = max(stats['max_queries'], current['queries'])
+            stats['sql_ms'] += current['sql_ms']
+            stats['max_sql_ms'] = max(stats['max_sql_ms'], current['sql_ms'])
+            stats['total_ms'] += total_ms
+            if current['slowest_ms'] > stats['slowest_ms']:
+                stats['slowest_ms'] = current['slowest_ms']
+                stats['slowest'] = normalize_statement(current['slowest'])[:SLOWEST_STATEMENT_SIZE]
+
+    def snapshot(self):
+        """Estatísticas por endpoint, ordenadas pelo tempo total de SQL"""
+        with self._lock:
+            items = [(endpoint, dict(stats)) for endpoint, stats in self.endpoints.items()]
+        result = []
+        for endpoint, stats in sorted(items, key=lambda item: item[1]['sql_ms'], reverse=True):
+            requests = stats['requests']
+            result.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'avg_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'avg_sql_ms': round(stats['sql_ms'] / requests, 3),
+                'max_sql_ms': round(stats['max_sql_ms'], 3),
+                'avg_total_ms': round(stats['total_ms'] / requests, 3),
+                'slowest_ms': round(stats['slowest_ms'], 3),
+                'slowest': stats['slowest'],
+            })
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+def server_timing(current, total_ms):
+    """Valor do cabeçalho Server-Timing de uma requisição"""
+    return (f'sql;dur={current["sql_ms"]:.2f};desc="{current["queries"]} queries", '
+            f'sql-slowest;dur={current["slowest_ms"]:.2f}, '
+            f'app;dur={total_ms:.2f}')
+
+def _request_started(sender, **extra):
+    g.setdefault(_G_KEY, {'queries': 0, 'sql_ms': 0.0, 'slowest_ms': 0.0, 'slowest': None,
+                          'started': time.perf_counter()})
+
+def _request_finished(sender, response, **extra):
+    current = g.pop(_G_KEY, None)
+    if current is None:
+        return
+    total_ms = (time.perf_counter() - current['started']) * 1000
+    response.headers['Server-Timing'] = server_timing(current, total_ms)
+    sender.extensions['sql_instrumentation'].add(request.endpoint or 'desconhecido', current, total_ms)
+
+def register_sql_instrumentation(app, db):
+    """Liga a instrumentação quando app.config['SQL_INSTRUMENTATION'] for verdadeiro"""
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return None
+
+    stats = app.extensions['sql_instrumentation'] = SQLStats()
+
+    with app.app_context():
+        add_statement_observer(db.engine, _observe)
+
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+
+    @login_required
+    def sql_stats():
+        if current_user.role != 'admin':
+            abort(403)
+        endpoints = stats.snapshot()
+        if request.args.get('reset'):
+            stats.reset()
+        return jsonify({'endpoints': endpoints})
+
+    app.add_url_rule('/stats/sql', 'sql_stats', sql_stats)
+    return stats
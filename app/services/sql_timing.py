@@ -0,0 +1,64 @@
+"""
+Tempo de cada comando SQL no cursor, medido uma única vez por engine.
+
+O log de consultas lentas, a gravação do workload, a instrumentação por
+requisição e as métricas assinam o mesmo par de eventos do engine
+(`before_cursor_execute`/`after_cursor_execute`) com add_statement_observer:
+
+    def observer(conn, cursor, statement, parameters, context, executemany, elapsed_ms): ...
+
+O início de cada comando fica em conn.info junto com o contexto de
+execução; o `handle_error` descarta o início de um comando que falhou,
+para que as medições seguintes da conexão não fiquem desencontradas.
+"""
+
+import time
+import weakref
+
+from sqlalchemy import event
+
+_INFO_KEY = '_sql_timing_started'
+
+# Observadores de cada engine
+_observers = weakref.WeakKeyDictionary()
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_INFO_KEY, []).append((context, time.perf_counter()))
+
+def _pop(conn, context):
+    """Início do comando `context` (None se não estiver na pilha)"""
+    started = conn.info.get(_INFO_KEY) or []
+    for index in range(len(started) - 1, -1, -1):
+        entry_context, moment = started[index]
+        if entry_context is context:
+            del started[index:]
+            return moment
+    return None
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    started = _pop(conn, context)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for observer in list(_observers.get(conn.engine, ())):
+        observer(conn, cursor, statement, parameters, context, executemany, elapsed_ms)
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None:
+        _pop(conn, exception_context.execution_context)
+
+def add_statement_observer(engine, observer):
+    """Passa a chamar `observer` ao final de cada comando do engine (uma vez por observador)"""
+    observers = _observers.setdefault(engine, [])
+    if observer not in observers:
+        observers.append(observer)
+    if not event.contains(engine, 'before_cursor_execute', _before):
+        event.listen(engine, 'before_cursor_execute', _before)
+        event.listen(engine, 'after_cursor_execute', _after)
+        event.listen(engine, 'handle_error', _handle_error)
+
+def remove_statement_observer(engine, observer):
+    observers = _observers.get(engine, [])
+    if observer in observers:
+        observers.remove(observer)
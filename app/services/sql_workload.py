@@ -0,0 +1,119 @@
+"""
+Gravação do SQL executado pela aplicação (workload) para análise de índices.
+
+Um recorder, observador do tempo dos comandos (app/services/sql_timing.py),
+grava em JSON Lines cada comando com os parâmetros da primeira ocorrência e
+o tempo gasto no cursor. Dos parâmetros só ficam números, datas, booleanos
+e nulos; textos (nomes, e-mails, CPF...) viram "<str:N>", que ainda servem
+para o EXPLAIN e a medição. O arquivo é lido por
+tools/maintenance/check_indexes.py, que roda EXPLAIN QUERY PLAN em cada
+comando distinto e propõe índices.
+
+Na aplicação, a gravação é ligada por SQL_WORKLOAD_FILE (ver config.py):
+
+    SQL_WORKLOAD_FILE=instance/workload.jsonl python run.py
+    SQL_WORKLOAD_FILE=/tmp/workload.jsonl python -m pytest scripts/tests
+"""
+
+import json
+import os
+import re
+import threading
+
+from app.services.sql_timing import add_statement_observer, remove_statement_observer
+
+_lock = threading.Lock()
+_files = {}
+
+# Datas e instantes como o SQLite recebe ("2024-12-31", "2024-12-31 10:00:00.000000")
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?')
+
+def _output(path):
+    # Um arquivo por caminho, compartilhado por todos os engines do processo
+    handle = _files.get(path)
+    if handle is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = _files[path] = open(path, 'a', encoding='utf-8')
+    return handle
+
+def normalize_statement(statement):
+    """Comando com espaços colapsados: a chave de agrupamento do workload"""
+    return ' '.join(statement.split())
+
+def _sample_value(value):
+    if isinstance(value, str):
+        return value if _DATE.fullmatch(value) else f'<str:{len(value)}>'
+    if isinstance(value, bytes):
+        return f'<bytes:{len(value)}>'
+    return value
+
+def sample_params(parameters):
+    """Parâmetros gravados no workload, sem os valores de texto"""
+    if isinstance(parameters, dict):
+        return {key: _sample_value(value) for key, value in parameters.items()}
+    return [_sample_value(value) for value in parameters or ()]
+
+class WorkloadRecorder:
+    """Grava os comandos de um engine em `path` enquanto estiver ativo"""
+
+    def __init__(self, engine, path):
+        self.engine = engine
+        self.path = path
+
+    def _observe(self, conn, cursor, statement, parameters, context, executemany, elapsed):
+        if executemany:
+            # Lotes (executemany) não passam por EXPLAIN
+            return
+        line = json.dumps({
+            'statement': normalize_statement(statement),
+            'params': sample_params(parameters),
+            'ms': round(elapsed, 3),
+        }, default=str, ensure_ascii=False)
+        with _lock:
+            handle = _output(self.path)
+            handle.write(line + '\n')
+            handle.flush()
+
+    def start(self):
+        add_statement_observer(self.engine, self._observe)
+        return self
+
+    def stop(self):
+        remove_statement_observer(self.engine, self._observe)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def load_workload(paths):
+    """
+    Agrupa os comandos gravados em `paths` pelo texto normalizado:
+    {statement: {'count', 'total_ms', 'params'}}, com os parâmetros da
+    primeira ocorrência como amostra para o EXPLAIN
+    """
+    workload = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                entry = workload.setdefault(record['statement'], {
+                    'count': 0, 'total_ms': 0.0, 'params': record.get('params') or [],
+                })
+                entry['count'] += 1
+                entry['total_ms'] += record.get('ms') or 0.0
+    return workload
+
+def register_sql_workload(app, db):
+    """Liga a gravação quando app.config['SQL_WORKLOAD_FILE'] estiver definido"""
+    path = app.config.get('SQL_WORKLOAD_FILE')
+    if not path:
+        return None
+    with app.app_context():
+        return WorkloadRecorder(db.engine, path).start()
@@ -0,0 +1,53 @@
+"""
+Ajuste das conexões SQLite por PRAGMA.
+
+Os PRAGMAs de SQLITE_PRAGMAS (ver config.py) são executados em toda conexão
+nova do pool, pelo evento `connect` do engine. Bancos em memória e outros
+dialetos são ignorados.
+"""
+
+from sqlalchemy import event
+
+# Ordem de aplicação: o busy_timeout vem primeiro para que a troca do
+# journal_mode espere um eventual lock de outro processo
+_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+def _ordered(pragmas):
+    return sorted(pragmas.items(), key=lambda item: (
+        _ORDER.index(item[0]) if item[0] in _ORDER else len(_ORDER), item[0]
+    ))
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Registra o hook que aplica `pragmas` em cada conexão de `engine`"""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return False
+    if engine.url.database in (None, '', ':memory:'):
+        return False
+
+    statements = [f'PRAGMA {name}={value}' for name, value in _ordered(pragmas)]
+
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', _on_connect)
+    return True
+
+def read_sqlite_pragmas(connection, names):
+    """Valores atuais dos PRAGMAs em uma conexão (para diagnóstico)"""
+    return {
+        name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        for name in names
+    }
+
+def register_sqlite_pragmas(app, db):
+    """Aplica app.config['SQLITE_PRAGMAS'] ao engine do Flask-SQLAlchemy"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, pragmas)
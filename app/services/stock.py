@@ -0,0 +1,358 @@
+"""
+Totais do estoque (quantidade, valor de custo e potencial de venda)
+calculados em uma única consulta e mantidos em cache por processo, e
+movimentações de estoque aplicadas direto no banco (individuais ou em lote).
+
+O cache é invalidado no commit de qualquer transação que altere produtos
+(estoque, preços ou campos usados nos filtros). Alterações feitas por
+outros processos são percebidas no máximo após STOCK_CACHE_TTL segundos.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func, inspect, or_, update, select, insert, bindparam
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models.inventory import Product, StockMovement
+from app.services.rollup import record_stock_value_change
+from app.services.cache import TTLCache, mark_changed, watch_changes
+from app.services.lookups import mark_lookups_changed
+from app.services.pagination import mark_counts_dirty
+from app.services.search import search_filter
+
+STOCK_CACHE_TTL = 30
+STOCK_CACHE_SIZE = 128
+
+_CACHE = 'stock_totals'
+
+# Tentativas do ajuste (valor absoluto) antes de desistir por concorrência
+ADJUST_RETRIES = 5
+
+# Movimentação em lote
+BULK_MAX_LINES = 10000
+BULK_RETRIES = 5
+_FETCH_CHUNK = 500
+
+MOVEMENT_TYPES = ('entrada', 'saida', 'ajuste')
+
+# Colunas que mudam os totais ou o conjunto de produtos filtrado
+_INVALIDATING_ATTRS = (
+    'current_stock', 'cost_price', 'sale_price', 'min_stock',
+    'category_id', 'is_active', 'name', 'sku', 'barcode',
+)
+
+_cache = TTLCache(_CACHE, STOCK_CACHE_TTL, STOCK_CACHE_SIZE)
+
+def filter_products(query, search='', category_id=None, stock_status=''):
+    """Aplica os filtros de produto do dashboard"""
+    condition = search_filter('products', Product.id, search, columns=('name', 'sku', 'barcode'))
+    if condition is not None:
+        query = query.filter(condition)
+
+    if category_id:
+        query = query.filter(Product.category_id == category_id)
+
+    if stock_status == 'in_stock':
+        query = query.filter(
+            Product.current_stock > func.coalesce(Product.min_stock, 0)
+        )
+    elif stock_status == 'low_stock':
+        query = query.filter(
+            Product.current_stock > 0,
+            Product.current_stock <= func.coalesce(Product.min_stock, 0)
+        )
+    elif stock_status == 'out_of_stock':
+        query = query.filter(
+            or_(
+                Product.current_stock == 0,
+                Product.current_stock.is_(None)
+            )
+        )
+    return query
+
+def _compute(search, category_id, stock_status):
+    query = db.session.query(
+        func.count(Product.id),
+        func.coalesce(func.sum(Product.current_stock), 0),
+        func.coalesce(func.sum(Product.current_stock * Product.cost_price), 0),
+        func.coalesce(func.sum(Product.current_stock * Product.sale_price), 0),
+    )
+    product_count, quantity, value, potential = filter_products(
+        query, search, category_id, stock_status
+    ).one()
+    return {
+        'product_count': int(product_count),
+        'total_quantity': int(quantity),
+        'total_value': float(value),
+        'total_potential_sales_value': float(potential),
+    }
+
+def stock_totals(search='', category_id=None, stock_status=''):
+    """Totais do estoque para os filtros informados (cacheado)"""
+    key = (search or '', category_id or None, stock_status or '')
+    return dict(_cache.get(key, lambda: _compute(*key)))
+
+def invalidate_stock_totals():
+    """Descarta os totais em cache (chamar após escritas fora do ORM)"""
+    _cache.invalidate()
+
+class StockError(ValueError):
+    """Movimentação de estoque recusada (produto inexistente ou saldo insuficiente)"""
+
+class BulkStockError(StockError):
+    """Lote recusado; `errors` lista {'line', 'error'} de cada linha inválida"""
+
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors
+
+class _StaleStock(Exception):
+    """Outro processo alterou um produto do lote entre a leitura e o UPDATE"""
+
+def _update_returning(statement, product_id):
+    """
+    Executa o UPDATE e devolve (current_stock, cost_price) da linha alterada,
+    ou None se nenhuma linha satisfez a condição.
+    """
+    session = db.session
+    if session.get_bind().dialect.update_returning:
+        row = session.execute(
+            statement.returning(Product.current_stock, Product.cost_price)
+        ).first()
+        return tuple(row) if row else None
+
+    # Sem RETURNING: a linha já está bloqueada por esta transação
+    if session.execute(statement).rowcount == 0:
+        return None
+    row = session.execute(
+        select(Product.current_stock, Product.cost_price).where(Product.id == product_id)
+    ).first()
+    return tuple(row)
+
+def move_stock(product_id, movement_type, quantity):
+    """
+    Aplica uma movimentação ao estoque com um único UPDATE condicional, sem
+    ler o saldo antes. Devolve (estoque anterior, estoque novo).
+
+    - entrada: current_stock + quantity
+    - saida: current_stock - quantity, só se houver saldo suficiente
+    - ajuste: current_stock = quantity (troca condicionada ao saldo lido,
+      repetida se outra transação alterar o produto no meio)
+
+    Não faz commit. Os agregados diários e o cache de totais, que só
+    acompanham alterações feitas pelo ORM, são atualizados aqui.
+    Levanta StockError se o produto não existir ou o saldo for insuficiente.
+    """
+    current = func.coalesce(Product.current_stock, 0)
+    base = update(Product).where(Product.id == product_id).execution_options(synchronize_session=False)
+
+    if movement_type == 'entrada':
+        row = _update_returning(base.values(current_stock=current + quantity), product_id)
+        previous_stock = row and row[0] - quantity
+    elif movement_type == 'saida':
+        row = _update_returning(
+            base.where(current >= quantity).values(current_stock=current - quantity), product_id
+        )
+        if row is None and db.session.get(Product, product_id) is not None:
+            raise StockError('Estoque insuficiente!')
+        previous_stock = row and row[0] + quantity
+    elif movement_type == 'ajuste':
+        row = None
+        for _ in range(ADJUST_RETRIES):
+            previous_stock = db.session.execute(
+                select(current).where(Product.id == product_id)
+            ).scalar()
+            if previous_stock is None:
+                break
+            row = _update_returning(
+                base.where(current == previous_stock).values(current_stock=quantity), product_id
+            )
+            if row is not None:
+                break
+        else:
+            raise StockError('O estoque foi alterado por outra operação, tente novamente.')
+    else:
+        raise StockError('Tipo de movimentação inválido!')
+
+    if row is None:
+        raise StockError('Produto não encontrado!')
+
+    new_stock, cost_price = row
+    if new_stock != previous_stock:
+        record_stock_value_change(db.session.connection(), (new_stock - previous_stock) * (cost_price or 0))
+        mark_changed(_CACHE)
+        # As opções de produto dos formulários mostram o estoque, e o filtro
+        # de situação do estoque muda as contagens das listagens
+        mark_lookups_changed('products')
+        mark_counts_dirty()
+
+    # Uma instância já carregada na sessão ficaria com o saldo antigo
+    product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+    if product is not None:
+        db.session.expire(product, ['current_stock'])
+    return previous_stock, new_stock
+
+def _parse_lines(lines):
+    parsed, errors = [], []
+    for index, line in enumerate(lines, start=1):
+        try:
+            product_id = int(line['product_id'])
+            movement_type = line.get('movement_type')
+            quantity = int(line['quantity'])
+            unit_cost = float(line.get('unit_cost') or 0)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors.append({'line': index, 'error': 'Produto, quantidade ou custo inválido'})
+            continue
+        if movement_type not in MOVEMENT_TYPES:
+            errors.append({'line': index, 'error': 'Tipo de movimentação inválido'})
+        elif quantity <= 0:
+            errors.append({'line': index, 'error': 'A quantidade deve ser maior que zero'})
+        elif unit_cost < 0:
+            errors.append({'line': index, 'error': 'O custo unitário não pode ser negativo'})
+        else:
+            parsed.append((index, product_id, movement_type, quantity, unit_cost,
+                           line.get('reference'), line.get('notes')))
+    return parsed, errors
+
+def _fetch_stock(product_ids):
+    """Saldo e custo de todos os produtos do lote, em poucas consultas"""
+    stock = {}
+    ids = sorted(product_ids)
+    for start in range(0, len(ids), _FETCH_CHUNK):
+        rows = db.session.execute(
+            select(Product.id, func.coalesce(Product.current_stock, 0), Product.cost_price)
+            .where(Product.id.in_(ids[start:start + _FETCH_CHUNK]))
+        )
+        for product_id, current_stock, cost_price in rows:
+            stock[product_id] = (current_stock, cost_price or 0)
+    return stock
+
+def _apply_batch(parsed, user_id):
+    initial = _fetch_stock({line[1] for line in parsed})
+
+    # Reproduz as linhas em ordem para obter o saldo antes/depois de cada uma
+    current = {product_id: values[0] for product_id, values in initial.items()}
+    movements, errors = [], []
+    now = datetime.utcnow()
+    for index, product_id, movement_type, quantity, unit_cost, reference, notes in parsed:
+        if product_id not in current:
+            errors.append({'line': index, 'error': 'Produto não encontrado'})
+            continue
+        previous_stock = current[product_id]
+        if movement_type == 'entrada':
+            new_stock = previous_stock + quantity
+        elif movement_type == 'saida':
+            if previous_stock < quantity:
+                errors.append({'line': index, 'error': 'Estoque insuficiente'})
+                continue
+            new_stock = previous_stock - quantity
+        else:
+            new_stock = quantity
+        current[product_id] = new_stock
+        movements.append({
+            'product_id': product_id,
+            'movement_type': movement_type,
+            'quantity': quantity,
+            'previous_stock': previous_stock,
+            'new_stock': new_stock,
+            'unit_cost': unit_cost,
+            'total_cost': quantity * unit_cost,
+            'reference': reference,
+            'notes': notes,
+            'user_id': user_id,
+            'movement_date': now,
+        })
+    if errors:
+        raise BulkStockError('Lote de movimentações recusado', errors)
+
+    # Um UPDATE por produto (executemany), condicionado ao saldo lido:
+    # se outro processo alterou algum produto, o lote inteiro é refeito
+    changed = [
+        {'b_id': product_id, 'b_expected': initial[product_id][0], 'b_stock': stock}
+        for product_id, stock in current.items() if stock != initial[product_id][0]
+    ]
+    if changed:
+        table = Product.__table__
+        result = db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('b_id'),
+                   func.coalesce(table.c.current_stock, 0) == bindparam('b_expected'))
+            .values(current_stock=bindparam('b_stock')),
+            changed
+        )
+        if result.rowcount != len(changed):
+            raise _StaleStock()
+
+    db.session.execute(insert(StockMovement.__table__), movements)
+
+    value_change = sum(
+        (current[product_id] - initial[product_id][0]) * initial[product_id][1]
+        for product_id in current
+    )
+    record_stock_value_change(db.session.connection(), value_change)
+    if changed:
+        mark_changed(_CACHE)
+        mark_lookups_changed('products')
+    mark_counts_dirty()
+    return movements
+
+def bulk_move_stock(lines, user_id):
+    """
+    Aplica um lote de movimentações (product_id, movement_type, quantity,
+    unit_cost, reference, notes) em uma única transação.
+
+    Os produtos são lidos de uma vez, os saldos de cada linha são
+    calculados em memória, os produtos alterados recebem um UPDATE
+    condicional cada (executemany) e as movimentações são inseridas com
+    executemany. Faz o commit. O lote é tudo-ou-nada: se alguma linha for
+    inválida levanta BulkStockError sem gravar nada.
+    """
+    if not lines:
+        raise BulkStockError('Nenhuma movimentação informada', [])
+    if len(lines) > BULK_MAX_LINES:
+        raise BulkStockError(f'O lote aceita no máximo {BULK_MAX_LINES} linhas', [])
+
+    parsed, errors = _parse_lines(lines)
+    if errors:
+        raise BulkStockError('Lote de movimentações recusado', errors)
+
+    for attempt in range(BULK_RETRIES):
+        try:
+            movements = _apply_batch(parsed, user_id)
+            db.session.commit()
+            break
+        except _StaleStock:
+            db.session.rollback()
+        except OperationalError as e:
+            # WAL: o snapshot lido ficou velho antes da escrita
+            db.session.rollback()
+            if 'locked' not in str(e) or attempt == BULK_RETRIES - 1:
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+    else:
+        raise StockError('O estoque foi alterado por outra operação, tente novamente.')
+    return movements
+
+def _touches_products(session):
+    for obj in session.new:
+        if isinstance(obj, Product):
+            return True
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in _INVALIDATING_ATTRS):
+                return True
+    return False
+
+def _collect(session):
+    return {True} if _touches_products(session) else ()
+
+def register_stock_listeners():
+    """Invalida o cache de totais quando produtos são alterados"""
+    watch_changes(_CACHE, _collect, lambda marks: invalidate_stock_totals())
@@ -0,0 +1,387 @@
+"""
+Busca de produtos para o ponto de venda (typeahead) com índice de
+trigramas em memória sobre o SKU, o código de barras e o nome.
+
+Cada chave é normalizada para letras e dígitos sem acentos ("SKU-0001"
+-> "sku0001") e quebrada em trigramas, com um marcador de início e de fim.
+A consulta digitada passa pela mesma normalização e, por ordem de
+relevância, encontra:
+
+    1. a chave exata (código de barras lido no leitor, SKU completo);
+    2. chaves que começam com o texto (busca binária na lista ordenada);
+    3. chaves parecidas: as que mais compartilham trigramas com o texto,
+       o que tolera dígitos trocados, faltando ou a mais.
+
+Os trigramas muito comuns (presentes em quase todas as chaves, como "sku")
+não geram candidatos, só entram na nota final; assim o custo da consulta
+depende das ocorrências dos trigramas raros e não do tamanho do catálogo.
+
+O índice é por processo e carregado na primeira consulta. Depois, a cada
+TYPEAHEAD_REFRESH segundos no máximo, relê só os produtos com updated_at a
+partir da última leitura; um commit deste processo que altere produtos
+antecipa a verificação. Produtos removidos saem do índice quando a
+quantidade de produtos no banco diminui ou quando aparecem em um resultado.
+"""
+
+import itertools
+import math
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+
+from app import db
+from app.models.inventory import Product
+from app.services.cache import watch_changes
+from app.services.cache_stats import record_cache
+
+TYPEAHEAD_REFRESH = 5
+TYPEAHEAD_LIMIT = 10
+
+# Campos indexados, na ordem de preferência quando a nota empata; nos
+# códigos a posição de cada trigrama também é indexada
+FIELDS = ('sku', 'barcode', 'name')
+CODE_FIELDS = ('sku', 'barcode')
+
+# Notas: chave exata, começo da chave e final de um código; as chaves
+# parecidas ficam com a fração dos trigramas da consulta encontrados (0 a 1)
+EXACT, PREFIX, SUFFIX = 3.0, 2.0, 1.5
+MIN_SIMILARITY = 0.4
+
+# Máximo de ocorrências somadas dos trigramas usados para gerar candidatos,
+# de candidatos conferidos com a nota completa e de listas contadas por
+# candidato
+POSTINGS_BUDGET = 8000
+CANDIDATES = 200
+MIN_HITS = 3
+
+_CACHE = 'product_typeahead'
+_EXTENSION = 'product_typeahead'
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]')
+
+def normalize_key(value):
+    """Só letras minúsculas sem acentos e dígitos: 'SKU-0001 Café' -> 'sku0001cafe'"""
+    if not value:
+        return ''
+    if not value.isascii():
+        decomposed = unicodedata.normalize('NFKD', value)
+        value = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub('', value.casefold())
+
+def _padded(key, complete):
+    return f'^{key}$' if complete else f'^{key}'
+
+def trigrams(key, complete=True):
+    """Trigramas da chave com '^' no início e, se completa, '$' no fim"""
+    padded = _padded(key, complete)
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+def positional_trigrams(key, complete=True):
+    """Pares (posição, trigrama) da chave"""
+    padded = _padded(key, complete)
+    return [(index, padded[index:index + 3]) for index in range(len(padded) - 2)]
+
+class ProductTypeahead:
+    """Índice de trigramas das chaves (SKU, código de barras e nome) dos produtos ativos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.loaded = False
+        self.checked = 0.0
+        self.watermark = None
+        self.product_count = 0
+        self._reset()
+
+    def _reset(self):
+        # Entrada i: (product_id, campo, chave); entradas removidas viram None
+        self.entries = []
+        # Ocorrências por trigrama (nomes) e por (posição, trigrama) (códigos)
+        self.postings = {}
+        # (chave, entrada) em ordem, para começos; códigos invertidos, para finais
+        self.sorted_keys = []
+        self.reversed_codes = []
+        self.by_product = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.by_product)
+
+    def _add(self, product_id, values, keep_sorted=True):
+        slots = []
+        for field in FIELDS:
+            key = normalize_key(values.get(field))
+            if not key:
+                continue
+            slot = len(self.entries)
+            self.entries.append((product_id, field, key))
+            code = field in CODE_FIELDS
+            for gram in (positional_trigrams(key) if code else trigrams(key)):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(slot)
+            lists = [(self.sorted_keys, key)]
+            if code:
+                lists.append((self.reversed_codes, key[::-1]))
+            for items, item_key in lists:
+                if keep_sorted:
+                    insort(items, (item_key, slot))
+                else:
+                    items.append((item_key, slot))
+            slots.append(slot)
+        if slots:
+            self.by_product[product_id] = slots
+
+    @staticmethod
+    def _discard(items, item):
+        position = bisect_left(items, item)
+        if position < len(items) and items[position] == item:
+            del items[position]
+
+    def _remove(self, product_id):
+        for slot in self.by_product.pop(product_id, ()):
+            _, field, key = self.entries[slot]
+            self._discard(self.sorted_keys, (key, slot))
+            if field in CODE_FIELDS:
+                self._discard(self.reversed_codes, (key[::-1], slot))
+            # As ocorrências ficam nas listas e são ignoradas até a próxima compactação
+            self.entries[slot] = None
+            self.dead += 1
+
+    def _load(self, products):
+        # Carga completa: as listas ordenadas são ordenadas uma vez só no final
+        self._reset()
+        for product_id, values in products:
+            self._add(product_id, values, keep_sorted=False)
+        self.sorted_keys.sort()
+        self.reversed_codes.sort()
+
+    def load(self, rows):
+        """Substitui o conteúdo pelos produtos ativos das linhas (dicionários com id e os campos)"""
+        with self.lock:
+            self._load((row['id'], row) for row in rows if row.get('is_active', True))
+
+    def upsert(self, product_id, values):
+        """Indexa (ou reindexa) um produto; inativos só são removidos"""
+        with self.lock:
+            self._remove(product_id)
+            if values.get('is_active', True):
+                self._add(product_id, values)
+            self._compact_if_needed()
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+            self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        if self.dead > 1000 and self.dead > len(self.entries) // 4:
+            products = {}
+            for entry in filter(None, self.entries):
+                product_id, field, key = entry
+                products.setdefault(product_id, {})[field] = key
+            self._load(products.items())
+
+    @staticmethod
+    def _starting_with(items, query, limit):
+        matches = []
+        position = bisect_left(items, (query, -1))
+        while position < len(items) and len(matches) < limit:
+            key, slot = items[position]
+            if not key.startswith(query):
+                break
+            matches.append(slot)
+            position += 1
+        return matches
+
+    def _candidates(self, groups, required):
+        """
+        Entradas das listas de ocorrências mais curtas, agrupadas pela
+        quantidade de listas em que aparecem (de min(required, 3) até 2,
+        ou 1 se basta um trigrama), da maior para a menor. A contagem é
+        feita por operações de conjunto, sem um contador por entrada.
+        """
+        groups = sorted(groups, key=lambda group: sum(len(posting) for posting in group))
+        # levels[n]: entradas vistas em mais de n listas
+        levels = [set() for _ in range(min(required, MIN_HITS))]
+        budget = POSTINGS_BUDGET
+        for group in groups:
+            size = sum(len(posting) for posting in group)
+            if size > budget:
+                break
+            budget -= size
+            slots = set().union(*group)
+            for level in range(len(levels) - 1, 0, -1):
+                levels[level] |= levels[level - 1] & slots
+            levels[0] |= slots
+        lowest = 1 if len(levels) > 1 else 0
+        for level in range(len(levels) - 1, lowest - 1, -1):
+            above = levels[level + 1] if level + 1 < len(levels) else ()
+            yield levels[level].difference(above)
+
+    def _similar(self, query, limit):
+        grams = trigrams(query, complete=False)
+        required = max(1, math.ceil(MIN_SIMILARITY * len(grams)))
+
+        # Nos códigos, cada trigrama vale na mesma posição ou em uma vizinha
+        # (um caractere a mais ou a menos antes dele)
+        groups = []
+        for position, gram in positional_trigrams(query, complete=False):
+            group = [self.postings[key] for key in ((position - 1, gram), (position, gram), (position + 1, gram))
+                     if key in self.postings]
+            if group:
+                groups.append(group)
+        # Consulta só de dígitos é código de barras ou SKU: os nomes ficam de fora
+        if not query.isdigit():
+            groups += [[self.postings[gram]] for gram in grams if gram in self.postings]
+
+        results = []
+        checked = 0
+        for candidates in self._candidates(groups, required):
+            # Os mais prováveis já bastam: não desce para quem aparece em menos listas
+            if len(results) >= limit or checked >= CANDIDATES:
+                break
+            for slot in itertools.islice(candidates, CANDIDATES - checked):
+                checked += 1
+                entry = self.entries[slot]
+                if entry is None:
+                    continue
+                shared = len(grams & trigrams(entry[2]))
+                if shared >= required:
+                    results.append((shared / len(grams), slot))
+        return results
+
+    def search(self, text, limit=TYPEAHEAD_LIMIT):
+        """
+        Melhores produtos para o texto: lista de (product_id, campo, nota),
+        com as notas EXACT, PREFIX e SUFFIX ou a similaridade (0 a 1).
+        """
+        query = normalize_key(text)
+        if not query:
+            return []
+        with self.lock:
+            scored = {}
+
+            def offer(slot, score):
+                product_id, field, key = self.entries[slot]
+                # Mesma nota: chave mais curta, depois a ordem de FIELDS
+                rank = (-score, len(key), FIELDS.index(field), product_id)
+                if product_id not in scored or rank < scored[product_id]:
+                    scored[product_id] = rank
+
+            for slot in self._starting_with(self.sorted_keys, query, limit * 4):
+                offer(slot, EXACT if self.entries[slot][2] == query else PREFIX)
+            if len(query) >= 3:
+                for slot in self._starting_with(self.reversed_codes, query[::-1], limit * 4):
+                    offer(slot, SUFFIX)
+            # Chave exata ou começos/finais suficientes dispensam a busca aproximada
+            exact = any(rank[0] == -EXACT for rank in scored.values())
+            if len(query) >= 2 and not exact and len(scored) < limit:
+                for similarity, slot in self._similar(query, limit):
+                    offer(slot, similarity)
+
+            best = sorted(scored.items(), key=lambda item: item[1])[:limit]
+            return [(product_id, FIELDS[rank[2]], -rank[0]) for product_id, rank in best]
+
+def _product_values(row):
+    return {'id': row.id, 'sku': row.sku, 'barcode': row.barcode, 'name': row.name, 'is_active': row.is_active}
+
+def _product_rows(*conditions):
+    return db.session.execute(
+        select(Product.id, Product.sku, Product.barcode, Product.name, Product.is_active,
+               Product.updated_at).where(*conditions)
+    ).all()
+
+def _state():
+    return db.session.execute(select(func.count(Product.id), func.max(Product.updated_at))).one()
+
+def _refresh(index):
+    """Relê os produtos alterados desde a última leitura (ou todos, se necessário)"""
+    count, latest = _state()
+    if not index.loaded or count < index.product_count:
+        index.load([_product_values(row) for row in _product_rows()])
+        index.loaded = True
+    elif latest != index.watermark and index.watermark is not None:
+        # >=: produtos gravados no mesmo instante da última leitura são relidos
+        for row in _product_rows(Product.updated_at >= index.watermark):
+            index.upsert(row.id, _product_values(row))
+    elif count != index.product_count or latest != index.watermark:
+        # Inseridos sem updated_at mais recente (importações): relê tudo
+        index.load([_product_values(row) for row in _product_rows()])
+    index.watermark = latest
+    index.product_count = count
+
+def get_typeahead():
+    """Índice da aplicação atual, carregado/atualizado quando necessário"""
+    index = current_app.extensions[_EXTENSION]
+    if index.loaded and time.monotonic() - index.checked < TYPEAHEAD_REFRESH:
+        record_cache(_CACHE, True)
+        return index
+    with index.refresh_lock:
+        # Outra thread pode ter acabado de atualizar
+        now = time.monotonic()
+        if index.loaded and now - index.checked < TYPEAHEAD_REFRESH:
+            record_cache(_CACHE, True)
+            return index
+        record_cache(_CACHE, False)
+        _refresh(index)
+        index.checked = now
+    return index
+
+def search_products(text, limit=TYPEAHEAD_LIMIT):
+    """Produtos ativos mais parecidos com o texto, com preço e estoque atuais"""
+    index = get_typeahead()
+    matches = index.search(text, limit)
+    if not matches:
+        return []
+    rows = {
+        row.id: row for row in db.session.execute(
+            select(Product.id, Product.name, Product.sku, Product.barcode, Product.sale_price,
+                   Product.current_stock, Product.unit, Product.is_active)
+            .where(Product.id.in_([product_id for product_id, _, _ in matches]))
+        )
+    }
+    items = []
+    for product_id, field, score in matches:
+        row = rows.get(product_id)
+        if row is None or not row.is_active:
+            # Removido ou desativado por outro processo
+            index.remove(product_id)
+            continue
+        items.append({
+            'id': row.id,
+            'name': row.name,
+            'sku': row.sku,
+            'barcode': row.barcode,
+            'sale_price': float(row.sale_price or 0),
+            'current_stock': row.current_stock or 0,
+            'unit': row.unit,
+            'match': field,
+            'score': round(score, 3),
+        })
+    return items
+
+def _collect(session):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            return {True}
+    return ()
+
+def _invalidate(marks):
+    if has_app_context():
+        index = current_app.extensions.get(_EXTENSION)
+        if index is not None:
+            # Próxima consulta relê os produtos alterados
+            index.checked = 0.0
+
+def register_typeahead(app):
+    """Índice por aplicação e verificação antecipada após commits que alteram produtos"""
+    app.extensions[_EXTENSION] = ProductTypeahead()
+    watch_changes(_CACHE, _collect, _invalidate)
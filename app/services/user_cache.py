@@ -0,0 +1,84 @@
+"""
+Cache do usuário autenticado usado pelo `load_user` do Flask-Login.
+
+Cada requisição autenticada carregava o usuário com um SELECT. Aqui os
+valores das colunas ficam guardados por processo (LRU + TTL) e, em um
+acerto, o usuário é reconstruído e anexado à sessão sem consultar o banco.
+Como a instância fica na sessão, alterações feitas em `current_user`
+(perfil, troca de senha) continuam sendo gravadas normalmente.
+
+O cache de um usuário é descartado no commit de qualquer transação que o
+altere ou remova; a criação de usuários descarta o cache inteiro.
+Alterações feitas por outros processos aparecem após USER_CACHE_TTL segundos.
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.models.user import User
+from app.services.cache import TTLCache, watch_changes
+
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 1024
+
+_CACHE = 'user'
+
+_cache = TTLCache(_CACHE, USER_CACHE_TTL, USER_CACHE_SIZE)
+
+def _columns():
+    return [attr.key for attr in inspect(User).column_attrs]
+
+def _record(user):
+    return {key: getattr(user, key) for key in _columns()}
+
+def _attach(record):
+    """Reconstrói o usuário a partir do registro e o anexa à sessão sem SELECT"""
+    user = User()
+    for key, value in record.items():
+        setattr(user, key, value)
+    # Zera o histórico dos atributos, como se viesse de uma consulta
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def cached_user(user_id):
+    """Usuário com o id informado (ou None), usando o cache quando possível"""
+    found, record, generation = _cache.lookup(user_id)
+    if found:
+        return _attach(record)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    _cache.store(user_id, _record(user), generation)
+    return user
+
+def invalidate_user(user_id=None):
+    """Descarta o cache de um usuário (ou de todos, sem argumento)"""
+    if user_id is None:
+        _cache.invalidate()
+    else:
+        _cache.invalidate(user_id)
+
+def _collect(session):
+    changed = set()
+    for obj in session.new:
+        if isinstance(obj, User):
+            changed.add(None)
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            identity = inspect(obj).identity
+            if identity:
+                changed.add(identity[0])
+    return changed
+
+def _invalidate(changed):
+    if None in changed:
+        invalidate_user()
+        return
+    for user_id in changed:
+        invalidate_user(user_id)
+
+def register_user_cache_listeners():
+    """Invalida o cache quando usuários são criados, alterados ou removidos"""
+    watch_changes(_CACHE, _collect, _invalidate)
@@ -10,6 +10,35 @@ class Config:
         'sqlite:///' + os.path.join(basedir, 'instance', 'erp.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # PRAGMAs aplicados a cada conexão SQLite (None = padrão do SQLite)
+    SQLITE_PRAGMAS = None
+    
+    # Arquivo JSON Lines onde o SQL executado é gravado para o
+    # tools/maintenance/check_indexes.py (None = gravação desligada)
+    SQL_WORKLOAD_FILE = os.environ.get('SQL_WORKLOAD_FILE')
+    
+    # Contagem e tempo de SQL por requisição (cabeçalho Server-Timing e /stats/sql)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'False').lower() == 'true'
+    
+    # Endpoint /metrics no formato do Prometheus (requer prometheus-client);
+    # com METRICS_TOKEN, o acesso exige "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # A API de clientes (/crm/api/customers) exige um usuário logado ou
+    # "Authorization: Bearer <CRM_API_TOKEN>" (sem o token, só usuários logados)
+    CRM_API_TOKEN = os.environ.get('CRM_API_TOKEN')
+    # Clientes por resposta no ?format=ndjson (a continuação vem em X-Next-Cursor)
+    CRM_API_NDJSON_MAX_ROWS = int(os.environ.get('CRM_API_NDJSON_MAX_ROWS') or 50000)
+    
+    # Log de consultas lentas (None = desligado); {pid} no caminho gera um
+    # arquivo por worker, já que a rotação não coordena processos
+    SLOW_QUERY_MS = float(os.environ['SLOW_QUERY_MS']) if os.environ.get('SLOW_QUERY_MS') else None
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or os.path.join(basedir, 'logs', 'slow_queries-{pid}.log')
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+    SLOW_QUERY_EXPLAIN = True
+    
     # Configurações de produção
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     TESTING = False
@@ -42,6 +71,20 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Strict'
+    
+    # SQLite com vários workers do gunicorn: WAL permite leituras durante
+    # escritas e o busy_timeout faz a conexão esperar o lock em vez de falhar
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 15000),  # ms
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,  # bytes
+        'cache_size': -64 * 1024,  # negativo = KiB (64 MB por conexão)
+        'temp_store': 'MEMORY',
+    }
+    
+    # Consultas lentas sempre registradas em produção
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 250)
 
 class TestingConfig(Config):
     TESTING = True
@@ -0,0 +1,38 @@
+"""
+Configuração do gunicorn (carregada automaticamente de ./gunicorn.conf.py)
+
+Com METRICS_ENABLED=True, prepara o modo multiprocess do prometheus_client:
+cada worker grava suas métricas em PROMETHEUS_MULTIPROC_DIR e o /metrics de
+qualquer worker soma todos (ver app/services/metrics.py). Workers, bind e
+logs continuam vindo da linha de comando. O .env é lido aqui (como no
+config.py) para que METRICS_ENABLED definido nele valha também no master.
+"""
+
+import os
+import shutil
+
+from dotenv import load_dotenv
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+load_dotenv(os.path.join(basedir, '.env'))
+
+_metrics = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+
+if _metrics:
+    # Definido antes de os workers importarem a aplicação
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(basedir, 'instance', 'metrics'))
+
+def on_starting(server):
+    """Descarta os arquivos de métricas de uma execução anterior"""
+    if not _metrics:
+        return
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    """Remove os valores "live" (requisições em andamento) do worker encerrado"""
+    if not _metrics:
+        return
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o nome normalizado (name_key) aos clientes e criar os
+índices das buscas exatas da API (nome, email, telefone, Instagram e CPF/CNPJ)
+"""
+
+from sqlalchemy import select, update
+
+from app import create_app, db
+from app.models.crm import Customer
+from app.services.normalize import normalize_name
+
+BATCH_SIZE = 1000
+
+def existing_indexes(table_name):
+    """Nomes dos índices da tabela, incluindo os de expressão (que a reflexão ignora)"""
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as connection:
+            return {row[1] for row in connection.exec_driver_sql(f'PRAGMA index_list("{table_name}")')}
+    return {item['name'] for item in db.inspect(db.engine).get_indexes(table_name)}
+
+def migrate_customer_lookup():
+    """Cria a coluna, preenche name_key em lotes e cria os índices que faltam"""
+    app = create_app()
+
+    with app.app_context():
+        print("🔄 Iniciando migração das buscas de clientes...")
+
+        try:
+            columns = {column['name'] for column in db.inspect(db.engine).get_columns('customer')}
+            if 'name_key' in columns:
+                print("   - coluna name_key já existe")
+            else:
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql("ALTER TABLE customer ADD COLUMN name_key VARCHAR(100)")
+                print("✅ Coluna name_key adicionada")
+
+            # Recalcula todos: a regra de normalização pode ter mudado
+            table = Customer.__table__
+            updated, last_id = 0, 0
+            while True:
+                with db.engine.begin() as connection:
+                    rows = connection.execute(
+                        select(table.c.id, table.c.name, table.c.name_key)
+                        .where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+                    ).all()
+                    if not rows:
+                        break
+                    last_id = rows[-1].id
+                    for row in rows:
+                        key = normalize_name(row.name)
+                        if key != row.name_key:
+                            # Sem updated_at: não é uma alteração do cliente
+                            connection.execute(update(table).where(table.c.id == row.id).values(name_key=key))
+                            updated += 1
+            print(f"✅ name_key preenchido em {updated} cliente(s)")
+
+            existing = existing_indexes('customer')
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name in existing:
+                    print(f"   - {index.name} já existe")
+                    continue
+                index.create(bind=db.engine)
+                print(f"✅ {index.name} criado")
+
+            if db.engine.dialect.name == 'sqlite':
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql('ANALYZE customer')
+                print("✅ ANALYZE executado")
+
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {e}")
+            return False
+
+if __name__ == "__main__":
+    success = migrate_customer_lookup()
+    if success:
+        print("\n🎉 Migração concluída! As buscas de clientes da API agora usam índices.")
+    else:
+        print("\n💥 Falha na migração. Verifique os erros acima.")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para criar as tabelas de agregados diários do dashboard e preenchê-las
+a partir dos dados existentes
+"""
+
+from app import create_app, db
+from app.models.rollup import DailyKPI, DailyCustomerSales
+from app.services.rollup import rebuild_rollups
+
+def migrate_daily_kpi():
+    """Cria daily_kpi/daily_customer_sales e recalcula os agregados"""
+    app = create_app()
+    
+    with app.app_context():
+        print("🔄 Iniciando migração dos agregados diários...")
+        
+        try:
+            # Criar apenas as tabelas que ainda não existem
+            db.create_all()
+            print("✅ Tabelas daily_kpi e daily_customer_sales verificadas")
+            
+            print("🔄 Recalculando agregados a partir das vendas, clientes, produtos e transações...")
+            rebuild_rollups()
+            
+            days = DailyKPI.query.count()
+            customer_days = DailyCustomerSales.query.count()
+            print(f"✅ {days} dia(s) agregados, {customer_days} linha(s) de vendas por cliente")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {e}")
+            db.session.rollback()
+            return False
+
+if __name__ == "__main__":
+    success = migrate_daily_kpi()
+    if success:
+        print("\n🎉 Migração concluída! O dashboard agora usa os agregados diários.")
+    else:
+        print("\n💥 Falha na migração. Verifique os erros acima.")
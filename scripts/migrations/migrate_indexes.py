@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script para criar os índices compostos declarados nos modelos
+(filtros e ordenações das listagens e relatórios) em um banco existente
+"""
+
+from app import create_app, db
+
+def existing_indexes(table_name):
+    """Nomes dos índices da tabela, incluindo os de expressão (que a reflexão ignora)"""
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as connection:
+            return {row[1] for row in connection.exec_driver_sql(f'PRAGMA index_list("{table_name}")')}
+    return {item['name'] for item in db.inspect(db.engine).get_indexes(table_name)}
+
+def migrate_indexes():
+    """Cria os índices que ainda não existem e atualiza as estatísticas do planner"""
+    app = create_app()
+
+    with app.app_context():
+        print("🔄 Iniciando migração dos índices...")
+
+        try:
+            created = 0
+            for table in db.metadata.sorted_tables:
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    existing = existing_indexes(table.name)
+                    if index.name in existing:
+                        print(f"   - {index.name} já existe")
+                        continue
+                    index.create(bind=db.engine)
+                    created += 1
+                    print(f"✅ {index.name} criado em {table.name}")
+
+            # Estatísticas para o planner escolher entre os índices
+            if db.engine.dialect.name == 'sqlite':
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql('ANALYZE')
+                print("✅ ANALYZE executado")
+
+            print(f"✅ {created} índice(s) criado(s)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {e}")
+            return False
+
+if __name__ == "__main__":
+    success = migrate_indexes()
+    if success:
+        print("\n🎉 Migração concluída! As listagens agora usam os novos índices.")
+    else:
+        print("\n💥 Falha na migração. Verifique os erros acima.")
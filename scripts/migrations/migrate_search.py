@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script para criar os índices de busca textual (FTS5) de produtos, clientes e
+transações, com os triggers de sincronização, e indexar os dados existentes
+"""
+
+from app import create_app, db
+from app.services.search import SEARCH_INDEXES, create_search_indexes
+
+def migrate_search():
+    """Cria as tabelas FTS5 e triggers que faltam e reconstrói os índices"""
+    app = create_app()
+
+    with app.app_context():
+        print("🔄 Iniciando migração da busca textual...")
+
+        if db.engine.dialect.name != 'sqlite':
+            print("   - banco não é SQLite: a busca continua por ILIKE")
+            return True
+
+        try:
+            # Tudo na mesma transação: os triggers passam a valer junto com o índice completo
+            with db.engine.begin() as connection:
+                create_search_indexes(connection, rebuild=True)
+                for index in SEARCH_INDEXES.values():
+                    total = connection.exec_driver_sql(f'SELECT count(*) FROM "{index.source}"').scalar()
+                    print(f"✅ {index.name}: {total} registro(s) indexado(s)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {e}")
+            return False
+
+if __name__ == "__main__":
+    success = migrate_search()
+    if success:
+        print("\n🎉 Migração concluída! As buscas agora usam o índice FTS5.")
+    else:
+        print("\n💥 Falha na migração. Verifique os erros acima.")
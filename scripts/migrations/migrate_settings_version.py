@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script para criar a tabela settings_version, usada para invalidar o cache
+das configurações em todos os workers
+"""
+
+from app import create_app, db
+from app.models.settings import SettingsVersion
+
+def migrate_settings_version():
+    """Cria settings_version com a linha do contador"""
+    app = create_app()
+    
+    with app.app_context():
+        print("🔄 Iniciando migração do contador de versão das configurações...")
+        
+        try:
+            # Criar apenas as tabelas que ainda não existem
+            db.create_all()
+            print("✅ Tabela settings_version verificada")
+            
+            if db.session.get(SettingsVersion, 1) is None:
+                db.session.add(SettingsVersion(id=1, version=0))
+                db.session.commit()
+                print("✅ Contador criado")
+            else:
+                print("ℹ️  Contador já existe")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Erro durante a migração: {e}")
+            db.session.rollback()
+            return False
+
+if __name__ == "__main__":
+    success = migrate_settings_version()
+    if success:
+        print("\n🎉 Migração concluída! As configurações agora ficam em cache nos workers.")
+    else:
+        print("\n💥 Falha na migração. Verifique os erros acima.")
@@ -0,0 +1,39 @@
+"""
+Fixtures compartilhadas pelos testes que usam a aplicação diretamente
+(banco SQLite em memória, sem servidor rodando)
+"""
+
+import pytest
+
+from app import create_app, db
+from app.models.user import User
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def admin(app):
+    user = User(
+        username='admin',
+        email='admin@erp.com',
+        first_name='Administrador',
+        last_name='Sistema',
+        role='admin'
+    )
+    user.set_password('admin123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, admin):
+    """Cliente de teste já autenticado como administrador"""
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Testes da movimentação de estoque em lote
+"""
+
+from datetime import date
+
+from sqlalchemy import event
+
+from app import db
+from app.models.inventory import Product, StockMovement
+from app.models.rollup import DailyKPI
+from app.services.stock import bulk_move_stock, stock_totals
+
+def _products(count, stock=10):
+    products = [Product(name=f'Produto {index}', current_stock=stock, cost_price=2) for index in range(count)]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+def test_lote_em_poucas_consultas_e_um_commit(app, admin):
+    ids = _products(50)
+    lines = [{'product_id': product_id, 'movement_type': 'entrada', 'quantity': 3, 'unit_cost': 2}
+             for product_id in ids for _ in range(10)]
+    lines.append({'product_id': ids[0], 'movement_type': 'saida', 'quantity': 40})
+    lines.append({'product_id': ids[1], 'movement_type': 'ajuste', 'quantity': 7})
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    commits = []
+    event.listen(db.session, 'after_commit', lambda session: commits.append(session))
+
+    movements = bulk_move_stock(lines, admin.id)
+
+    # Leitura dos produtos, UPDATE e INSERT em executemany, agregado diário
+    assert len(statements) <= 5
+    assert len(commits) == 1
+    assert len(movements) == len(lines) == 502
+
+    assert movements[0]['previous_stock'] == 10 and movements[0]['new_stock'] == 13
+    assert movements[9]['new_stock'] == 40
+    assert movements[-2] == {**movements[-2], 'previous_stock': 40, 'new_stock': 0}
+    assert movements[-1] == {**movements[-1], 'previous_stock': 40, 'new_stock': 7}
+
+    db.session.expire_all()
+    assert StockMovement.query.count() == 502
+    assert db.session.get(Product, ids[0]).current_stock == 0
+    assert db.session.get(Product, ids[1]).current_stock == 7
+    assert db.session.get(Product, ids[2]).current_stock == 40
+
+    # Agregado diário e cache de totais acompanham o UPDATE feito fora do ORM
+    expected_quantity = 0 + 7 + 48 * 40
+    assert stock_totals()['total_quantity'] == expected_quantity
+    assert db.session.get(DailyKPI, date.today()).stock_value_change == expected_quantity * 2
+
+def test_lote_invalido_nao_grava_nada(client, admin):
+    ids = _products(2, stock=5)
+
+    response = client.post('/inventory/api/movements/bulk', json={'lines': [
+        {'product_id': ids[0], 'movement_type': 'saida', 'quantity': 5},
+        {'product_id': ids[0], 'movement_type': 'saida', 'quantity': 1},
+        {'product_id': 999, 'movement_type': 'entrada', 'quantity': 1},
+        {'product_id': ids[1], 'movement_type': 'transferencia', 'quantity': 1},
+    ]})
+    data = response.get_json()
+    assert response.status_code == 400
+    assert not data['success']
+    assert [error['line'] for error in data['errors']] == [4]
+
+    response = client.post('/inventory/api/movements/bulk', json={'lines': [
+        {'product_id': ids[0], 'movement_type': 'saida', 'quantity': 5},
+        {'product_id': ids[0], 'movement_type': 'saida', 'quantity': 1},
+        {'product_id': 999, 'movement_type': 'entrada', 'quantity': 1},
+    ]})
+    data = response.get_json()
+    assert response.status_code == 400
+    assert data['errors'] == [{'line': 2, 'error': 'Estoque insuficiente'},
+                              {'line': 3, 'error': 'Produto não encontrado'}]
+
+    db.session.expire_all()
+    assert StockMovement.query.count() == 0
+    assert db.session.get(Product, ids[0]).current_stock == 5
+
+    response = client.post('/inventory/api/movements/bulk', json={'lines': [
+        {'product_id': ids[0], 'movement_type': 'saida', 'quantity': 2, 'reference': 'NF-1'},
+    ]})
+    assert response.get_json()['movements'][0]['new_stock'] == 3
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Testes do cache com TTL e da invalidação pelos commits (app/services/cache.py)
+"""
+
+from app import db
+from app.models.inventory import Product
+from app.services import cache as cache_service
+from app.services.cache import TTLCache, mark_changed, watch_changes
+
+def test_lru_ttl_e_geracao(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(cache_service.time, 'monotonic', lambda: clock[0])
+    cache = TTLCache('teste', ttl=10, size=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get('a', lambda: compute(1)) == 1
+    assert cache.get('a', lambda: compute(2)) == 1
+    cache.get('b', lambda: compute(3))
+    cache.get('c', lambda: compute(4))
+    # 'a' era o menos usado e saiu
+    assert list(cache.entries) == ['b', 'c']
+
+    clock[0] += 10
+    assert cache.get('b', lambda: compute(5)) == 5
+    # Vencido, mas ainda válido segundo a conferência
+    assert cache.get('c', lambda: compute(6), revalidate=lambda value: value == 4) == 4
+    assert calls == [1, 3, 4, 5]
+
+    # Valor lido antes de uma invalidação não é guardado
+    found, _, generation = cache.lookup('d')
+    assert not found
+    cache.invalidate('c')
+    assert not cache.store('d', 7, generation)
+    assert 'd' not in cache.entries
+
+def test_invalidacao_no_commit_e_descartada_no_rollback(app):
+    seen = []
+    watch_changes('teste', lambda session: {obj.name for obj in session.new if isinstance(obj, Product)},
+                  seen.append)
+    try:
+        db.session.add(Product(name='Caneta'))
+        db.session.flush()
+        db.session.rollback()
+        assert seen == []
+
+        db.session.add(Product(name='Lápis'))
+        mark_changed('teste', 'manual')
+        db.session.commit()
+        assert seen == [{'Lápis', 'manual'}]
+    finally:
+        cache_service._watchers.pop('teste', None)
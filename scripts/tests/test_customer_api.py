@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes da listagem de clientes da API (GET /crm/api/customers): cursor,
+?fields=, ?updated_since=, NDJSON e autenticação
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.crm import Customer
+
+BASE = datetime(2024, 1, 1, 12, 0)
+
+@pytest.fixture
+def customers(app):
+    db.session.add_all([
+        Customer(name=f'Cliente {index:03d}', email=f'cliente{index}@exemplo.com', status='active',
+                 created_at=BASE, updated_at=BASE + timedelta(minutes=index))
+        for index in range(1, 251)
+    ])
+    db.session.commit()
+
+@pytest.fixture
+def api(app):
+    """Cliente de uma integração: token configurado e enviado em toda requisição"""
+    app.config['CRM_API_TOKEN'] = 'segredo'
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer segredo'
+    return client
+
+def test_paginas_por_cursor(api, customers):
+    client = api
+    response = client.get('/crm/api/customers')
+    assert response.status_code == 200
+    first = response.get_json()
+    assert len(first) == 100
+    assert set(first[0]) == {'id', 'name', 'email', 'phone', 'instagram', 'address', 'city', 'state',
+                             'zip_code', 'company', 'cpf_cnpj', 'status', 'created_at', 'updated_at'}
+    assert 'rel="next"' in response.headers['Link']
+
+    ids = [item['id'] for item in first]
+    cursor = response.headers['X-Next-Cursor']
+    while cursor:
+        response = client.get(f'/crm/api/customers?per_page=100&after={cursor}')
+        ids += [item['id'] for item in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+    assert ids == sorted(ids) and len(ids) == 250 == len(set(ids))
+    assert 'Link' not in response.headers
+
+    assert len(client.get('/crm/api/customers?per_page=5000').get_json()) == 250
+
+def test_projecao_de_campos(api, customers):
+    client = api
+    items = client.get('/crm/api/customers?fields=email,name&per_page=3').get_json()
+    assert items[0] == {'id': 1, 'email': 'cliente1@exemplo.com', 'name': 'Cliente 001'}
+
+    response = client.get('/crm/api/customers?fields=name,password_hash')
+    assert response.status_code == 400
+    assert 'password_hash' in response.get_json()['error']
+
+def test_sincronizacao_incremental(api, customers):
+    client = api
+    since = (BASE + timedelta(minutes=240)).isoformat()
+    items = client.get(f'/crm/api/customers?updated_since={since}&fields=updated_at').get_json()
+    assert [item['id'] for item in items] == list(range(240, 251))
+
+    # Alterado depois: sai da posição original e aparece no final
+    customer = db.session.get(Customer, 3)
+    customer.updated_at = BASE + timedelta(days=1)
+    db.session.commit()
+    items = client.get(f'/crm/api/customers?updated_since={since}Z&per_page=5').get_json()
+    assert [item['id'] for item in items] == [240, 241, 242, 243, 244]
+    response = client.get(f'/crm/api/customers?updated_since={since}&per_page=11')
+    cursor = response.headers['X-Next-Cursor']
+    rest = client.get(f'/crm/api/customers?updated_since={since}&after={cursor}').get_json()
+    assert [item['id'] for item in rest] == [3]
+
+    # Fuso explícito é convertido para UTC
+    items = client.get('/crm/api/customers?updated_since=2024-01-01T13:09:00-03:00').get_json()
+    assert [item['id'] for item in items] == [249, 250, 3]
+
+    assert client.get('/crm/api/customers?updated_since=ontem').status_code == 400
+    assert client.get(f'/crm/api/customers?after={cursor}').status_code == 400
+
+def test_ndjson_em_streaming(api, customers):
+    response = api.get('/crm/api/customers?format=ndjson&fields=name')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    assert 'X-Next-Cursor' not in response.headers
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 250
+    assert json.loads(lines[-1]) == {'id': 250, 'name': 'Cliente 250'}
+
+def test_ndjson_limitado_por_resposta(app, api, customers):
+    app.config['CRM_API_NDJSON_MAX_ROWS'] = 100
+    ids, url = [], '/crm/api/customers?format=ndjson&fields=id'
+    while url:
+        response = api.get(url)
+        lines = response.get_data(as_text=True).splitlines()
+        assert len(lines) <= 100
+        ids += [json.loads(line)['id'] for line in lines]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/crm/api/customers?format=ndjson&fields=id&after={cursor}' if cursor else None
+    assert ids == list(range(1, 251))
+
+def test_autenticacao(app, admin, customers):
+    client = app.test_client()
+    # Sem CRM_API_TOKEN a API não fica aberta: só usuários logados
+    assert client.get('/crm/api/customers').status_code == 401
+    assert client.get('/crm/api/customers?format=ndjson').status_code == 401
+
+    app.config['CRM_API_TOKEN'] = 'segredo'
+    assert client.get('/crm/api/customers').status_code == 401
+    assert client.get('/crm/api/customers', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    response = client.get('/crm/api/customers', headers={'Authorization': 'Bearer segredo'})
+    assert response.status_code == 200
+    # Usuário logado na aplicação também acessa
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert client.get('/crm/api/customers').status_code == 200
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Testes das buscas exatas de clientes (GET /crm/api/customers/lookup e
+/crm/api/customers/<name>): normalização e uso dos índices
+"""
+
+import pytest
+from sqlalchemy import insert
+
+from app import db
+from app.models.crm import Customer
+from app.services.customer_api import LOOKUP_NORMALIZERS, lookup_query
+from app.services.normalize import normalize_name
+
+@pytest.fixture
+def customers(app):
+    db.session.add_all([
+        Customer(name='José  da Silva', email='Jose.Silva@Exemplo.com', phone='(11) 98765-4321',
+                 instagram='@JoseSilva', cpf_cnpj='123.456.789-09'),
+        Customer(name='Maria Souza', email='maria@exemplo.com', phone='+55 21 99999-0000',
+                 cpf_cnpj='12.345.678/0001-99'),
+    ])
+    db.session.commit()
+
+@pytest.fixture
+def api(app):
+    """Cliente de uma integração: token configurado e enviado em toda requisição"""
+    app.config['CRM_API_TOKEN'] = 'segredo'
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer segredo'
+    return client
+
+def test_normalizacao_do_nome():
+    assert normalize_name('  JOSÉ   da Silva ') == 'jose da silva'
+    assert normalize_name('Conceição Straße') == 'conceicao strasse'
+
+def test_busca_por_nome_sem_acentos_e_maiusculas(api, customers):
+    client = api
+    response = client.get('/crm/api/customers/jose da silva')
+    assert response.status_code == 200
+    assert response.get_json()['email'] == 'Jose.Silva@Exemplo.com'
+    assert client.get('/crm/api/customers/JOSÉ DA SILVA').get_json()['id'] == 1
+    assert client.get('/crm/api/customers/José').status_code == 404
+
+    items = client.get('/crm/api/customers/lookup?name=maria  SOUZA&fields=name').get_json()
+    assert items == [{'id': 2, 'name': 'Maria Souza'}]
+
+def test_busca_por_contato_com_outra_formatacao(api, customers):
+    client = api
+    lookups = {
+        'email': ' JOSE.SILVA@exemplo.com',
+        'phone': '11987654321',
+        'instagram': 'josesilva',
+        'cpf_cnpj': '12345678909',
+    }
+    for field, value in lookups.items():
+        items = client.get('/crm/api/customers/lookup', query_string={field: value, 'fields': 'id'}).get_json()
+        assert items == [{'id': 1}], field
+    items = client.get('/crm/api/customers/lookup?cpf_cnpj=12345678000199&fields=id').get_json()
+    assert items == [{'id': 2}]
+    assert client.get('/crm/api/customers/lookup?phone=000').get_json() == []
+
+def test_parametros_invalidos(app, api, customers):
+    assert api.get('/crm/api/customers/lookup').status_code == 400
+    assert api.get('/crm/api/customers/lookup?name=a&email=b').status_code == 400
+    assert api.get('/crm/api/customers/lookup?name=a&fields=senha').status_code == 400
+
+    # Sem o token (configurado ou não), as buscas também exigem autenticação
+    client = app.test_client()
+    assert client.get('/crm/api/customers/lookup?name=maria souza').status_code == 401
+    assert client.get('/crm/api/customers/maria souza').status_code == 401
+    app.config['CRM_API_TOKEN'] = None
+    assert client.get('/crm/api/customers/maria souza').status_code == 401
+    assert api.get('/crm/api/customers/maria souza').status_code == 401
+
+def test_name_key_acompanha_o_nome(app, customers):
+    customer = db.session.get(Customer, 2)
+    customer.name = 'Maria Ângela Souza'
+    db.session.commit()
+    assert customer.name_key == 'maria angela souza'
+
+    # Inserções em lote (Core) também recebem a chave
+    db.session.execute(insert(Customer.__table__), [{'name': 'Ana Lúcia'}, {'name': 'Édson'}])
+    db.session.commit()
+    keys = db.session.query(Customer.name_key).order_by(Customer.id).all()
+    assert [key for key, in keys][2:] == ['ana lucia', 'edson']
+
+def test_cada_busca_usa_o_indice(app, customers):
+    for field in LOOKUP_NORMALIZERS:
+        statement = lookup_query(field, 'x').statement.compile(
+            db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).all()
+        detail = ' '.join(row[-1] for row in plan)
+        assert f'USING INDEX ix_customer_{field}_key' in detail, (field, detail)
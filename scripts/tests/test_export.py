@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Testes das exportações CSV/XLSX em streaming
+"""
+
+import csv
+import io
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+
+from app import db
+from app.models.crm import Customer, Sale
+from app.models.finance import Account, Transaction
+from app.models.inventory import Product, StockMovement
+from app.services import export
+
+def _seed(admin):
+    account = Account(name='Banco', account_type='banco')
+    customer = Customer(name='Ana')
+    product = Product(name='Caneta', sku='CAN-1', current_stock=5)
+    db.session.add_all([account, customer, product])
+    db.session.flush()
+
+    for day in range(1, 6):
+        db.session.add(Transaction(
+            account_id=account.id, transaction_type='receita', description=f'Venda {day}',
+            amount=10 * day, transaction_date=date(2024, 1, day), status='completed', user_id=admin.id
+        ))
+    db.session.add(Sale(customer_id=customer.id, user_id=admin.id, total_amount=42,
+                        sale_date=datetime(2024, 1, 3), status='completed'))
+    db.session.add(StockMovement(product_id=product.id, movement_type='entrada', quantity=5,
+                                 previous_stock=0, new_stock=5, user_id=admin.id,
+                                 movement_date=datetime(2024, 1, 2)))
+    db.session.commit()
+
+def test_csv_em_blocos(client, admin, monkeypatch):
+    _seed(admin)
+    monkeypatch.setattr(export, 'EXPORT_BATCH_SIZE', 2)
+    monkeypatch.setattr(export, 'EXPORT_CHUNK_SIZE', 1)
+
+    response = client.get('/finance/transactions/export?format=csv&type=receita')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename=transacoes_' in response.headers['Content-Disposition']
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert rows[0][:3] == ['ID', 'Data', 'Tipo']
+    assert len(rows) == 6
+    # Mais recentes primeiro, com o nome da conta
+    assert rows[1][1] == '2024-01-05'
+    assert rows[1][5] == 'Banco'
+
+def test_xlsx_write_only(client, admin):
+    _seed(admin)
+
+    for url, expected in (('/crm/sales/export', 'Ana'),
+                          ('/crm/customers/export', 'Ana'),
+                          ('/inventory/movements/export?search=CAN', 'Caneta')):
+        response = client.get(f'{url}{"&" if "?" in url else "?"}format=xlsx')
+        assert response.status_code == 200
+        workbook = load_workbook(io.BytesIO(response.get_data()))
+        values = list(workbook.active.iter_rows(values_only=True))
+        assert len(values) == 2
+        assert expected in values[1]
+
+def test_formulas_neutralizadas(client, admin):
+    db.session.add_all([Customer(name='=HYPERLINK("http://x","y")', company='+55 11'),
+                        Customer(name='@SUM(A1)', company='-2+3')])
+    db.session.commit()
+
+    text = client.get('/crm/customers/export?format=csv').get_data(as_text=True)
+    rows = list(csv.reader(io.StringIO(text.lstrip('\ufeff'))))
+    assert [row[1] for row in rows[1:]] == ['\'=HYPERLINK("http://x","y")', "'@SUM(A1)"]
+    assert [row[5] for row in rows[1:]] == ["'+55 11", "'-2+3"]
+
+    response = client.get('/crm/customers/export?format=xlsx')
+    sheet = load_workbook(io.BytesIO(response.get_data())).active
+    cells = [row[1] for row in sheet.iter_rows(min_row=2)]
+    assert [cell.value for cell in cells] == ['=HYPERLINK("http://x","y")', '@SUM(A1)']
+    assert {cell.data_type for cell in cells} == {'s'}
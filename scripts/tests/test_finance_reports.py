@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Testes do relatório financeiro agregado no banco
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app import db
+from app.models.finance import Account, Transaction
+from app.services.finance_reports import report_groups, report_totals
+
+def _seed(admin):
+    account = Account(name='Banco', account_type='banco')
+    db.session.add(account)
+    db.session.flush()
+
+    def add(transaction_type, status, amount, category, day):
+        db.session.add(Transaction(
+            account_id=account.id, transaction_type=transaction_type, category=category,
+            description=f'{transaction_type} {amount}', amount=amount,
+            transaction_date=date(2024, 3, day), status=status, user_id=admin.id
+        ))
+
+    add('receita', 'completed', 100, 'Vendas', 1)
+    add('receita', 'completed', 50, 'Vendas', 2)
+    add('receita', 'pending', 70, 'Vendas', 3)
+    add('despesa', 'completed', 30, None, 4)
+    add('despesa', 'completed', 20, '', 5)
+    db.session.commit()
+    return account
+
+def test_totais_agrupados_no_banco(app, admin):
+    _seed(admin)
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    groups = report_groups()
+    assert len(statements) == 1
+    assert 'GROUP BY' in statements[0]
+
+    # Categoria vazia e nula formam um único grupo
+    by_key = {(g.transaction_type, g.status, g.category): g for g in groups}
+    assert len(groups) == 3
+    assert by_key[('receita', 'completed', 'Vendas')].count == 2
+    assert by_key[('despesa', 'completed', None)].count == 2
+
+    totals = report_totals(groups)
+    assert totals['total_income'] == Decimal('150')
+    assert totals['total_expenses'] == Decimal('50')
+    assert totals['net_income'] == Decimal('100')
+    assert totals['total_transactions'] == 5
+
+    filtered = report_totals(report_groups(start_date='2024-03-02', end_date='2024-03-04'))
+    assert filtered['total_income'] == Decimal('50')
+    assert filtered['total_transactions'] == 3
+
+def test_detalhamento_sob_demanda_e_paginado(client, admin):
+    account = _seed(admin)
+
+    response = client.get('/finance/reports')
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'R$ 150.00' in html
+    assert 'id="detailTable"' not in html
+
+    response = client.get(f'/finance/reports?detail=1&detail_type=despesa&detail_status=completed'
+                          f'&detail_account={account.id}&detail_category=-')
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'id="detailTable"' in html
+    assert 'despesa 30' in html and 'despesa 20' in html
+    assert 'receita 100' not in html
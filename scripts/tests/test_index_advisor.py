@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Testes da gravação do workload SQL e do assistente de índices
+(tools/maintenance/check_indexes.py)
+"""
+
+import importlib.util
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from app import db
+from app.models.crm import Customer
+from app.services.sql_workload import load_workload, WorkloadRecorder
+
+TOOL = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'maintenance', 'check_indexes.py')
+
+@pytest.fixture(scope='module')
+def advisor():
+    spec = importlib.util.spec_from_file_location('check_indexes', TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def customers_db(tmp_path):
+    path = str(tmp_path / 'advisor.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE customer (id INTEGER PRIMARY KEY, name VARCHAR, city VARCHAR, '
+                 'status VARCHAR, created_at DATETIME)')
+    conn.execute('CREATE INDEX ix_customer_status ON customer (status)')
+    conn.executemany('INSERT INTO customer (name, city, status, created_at) VALUES (?, ?, ?, ?)', [
+        (f'Cliente {index}', f'Cidade {index % 500}', 'active', f'2024-01-{index % 28 + 1:02d}')
+        for index in range(20000)
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+def _write(path, records):
+    with open(path, 'w', encoding='utf-8') as handle:
+        for record in records:
+            handle.write(json.dumps(record) + '\n')
+
+def test_recorder_grava_comandos_com_parametros(app, tmp_path):
+    path = str(tmp_path / 'workload.jsonl')
+    with WorkloadRecorder(db.engine, path):
+        Customer.query.filter_by(city='Recife').all()
+        Customer.query.filter_by(city='Natal').all()
+        Customer.query.filter(Customer.id > 5, Customer.created_at >= datetime(2024, 12, 1)).all()
+    Customer.query.filter_by(city='Fora').all()
+
+    workload = load_workload([path])
+    [(statement, entry)] = [item for item in workload.items() if 'customer.city = ' in item[0]]
+    assert statement.startswith('SELECT customer.id')
+    assert entry['count'] == 2
+    # Textos não são gravados; números e datas continuam para o EXPLAIN
+    assert entry['params'] == ['<str:6>']
+    [entry] = [entry for statement, entry in workload.items() if 'customer.created_at >=' in statement]
+    assert entry['params'] == [5, '2024-12-01 00:00:00.000000']
+    assert 'Recife' not in open(path, encoding='utf-8').read()
+
+def test_navegacao_do_record_ignora_exportacoes_e_apis(advisor, app):
+    urls = advisor._default_urls(app, today=date(2024, 12, 15))
+    assert '/crm/customers' in urls and '/dashboard' in urls
+    assert not [url for url in urls if 'export' in url or url.startswith(('/metrics', '/stats/'))]
+    assert [url for url in urls if '/api/' in url] == [
+        '/schedule/api/appointments?start=2024-12-01&end=2025-01-01',
+        '/schedule/api/events?start=2024-12-01&end=2025-01-01',
+    ]
+
+def test_propoe_indice_para_varredura_e_ordenacao(advisor, customers_db, tmp_path):
+    path = str(tmp_path / 'workload.jsonl')
+    _write(path, [
+        # Varredura + ordenação: índice (city, created_at)
+        {'statement': 'SELECT customer.id, customer.name FROM customer WHERE customer.city = ? '
+                      'ORDER BY customer.created_at DESC LIMIT ? OFFSET ?',
+         'params': ['Cidade 7', 20, 0], 'ms': 4.0},
+    ] * 5 + [
+        # Já atendido por ix_customer_status
+        {'statement': 'SELECT customer.id FROM customer WHERE customer.status = ?',
+         'params': ['active'], 'ms': 1.0},
+        # Varredura sem filtro: nenhum índice ajuda
+        {'statement': 'SELECT count(*) AS count_1 FROM customer', 'params': [], 'ms': 1.0},
+        # Filtro não indexável
+        {'statement': 'SELECT customer.id FROM customer WHERE lower(customer.name) LIKE lower(?)',
+         'params': ['%ana%'], 'ms': 1.0},
+    ])
+
+    findings, proposals = advisor.analyze_workload(load_workload([path]), customers_db)
+
+    assert [proposal['columns'] for proposal in proposals] == [['city', 'created_at']]
+    [proposal] = proposals
+    assert proposal['sql'] == 'CREATE INDEX ix_customer_city_created_at ON "customer" (city, created_at);'
+    assert proposal['count'] == 5
+    assert proposal['used'] and proposal['saved_ms'] > 0
+    assert proposal['before_ms'] > proposal['after_ms']
+
+    kinds = {issue['detail'] for finding in findings for issue in finding['issues']}
+    assert 'SCAN customer' in kinds
+    assert 'USE TEMP B-TREE FOR ORDER BY' in kinds
+
+    # A análise roda em uma cópia: o banco original fica intacto
+    conn = sqlite3.connect(customers_db)
+    names = [row[1] for row in conn.execute('PRAGMA index_list(customer)')]
+    conn.close()
+    assert names == ['ix_customer_status']
+
+def test_juncao_propoe_chave_estrangeira(advisor, tmp_path):
+    path = str(tmp_path / 'join.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE customer (id INTEGER PRIMARY KEY, name VARCHAR)')
+    conn.execute('CREATE TABLE sale (id INTEGER PRIMARY KEY, customer_id INTEGER, sale_date DATETIME)')
+    conn.commit()
+    conn.close()
+
+    workload = {
+        'SELECT customer.name, sale_1.sale_date FROM customer JOIN sale AS sale_1 '
+        'ON customer.id = sale_1.customer_id WHERE customer.id = ?':
+            {'count': 3, 'total_ms': 6.0, 'params': [1]},
+    }
+    _, proposals = advisor.analyze_workload(workload, path, measure=False)
+
+    assert [(proposal['table'], proposal['columns']) for proposal in proposals] == [('sale', ['customer_id'])]
+    assert proposals[0]['saved_ms'] == 6.0
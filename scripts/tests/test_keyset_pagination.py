@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Testes da paginação por keyset (cursor)
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from html import unescape
+
+from sqlalchemy import event
+
+from app import db
+from app.models.crm import Customer
+from app.models.finance import Account, Transaction
+from app.models.inventory import Product
+from app.models.schedule import Event
+from app.routes.inventory import PRODUCT_SORT_KEYS
+from app.services.pagination import paginate_keyset, order_by_keys, invalidate_counts
+from app.services.stock import move_stock
+
+def _create_products(total):
+    db.session.add_all([
+        Product(name=f'Produto {i:03d}', sku=f'SKU{i}', current_stock=i % 4, min_stock=1)
+        for i in range(total)
+    ])
+    # Nomes repetidos para garantir o desempate pelo id
+    db.session.add_all([Product(name='Produto 010', sku=f'DUP{i}') for i in range(3)])
+    db.session.commit()
+
+def test_dashboard_products_percorre_todas_as_paginas(client):
+    _create_products(25)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/dashboard/products?per_page=7' + (f'&after={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        assert len(data['items']) <= 7
+        seen.extend(item['id'] for item in data['items'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    expected = [p.id for p in Product.query.order_by(Product.name, Product.id)]
+    assert seen == expected
+
+def test_dashboard_products_filtros_e_cursor_invalido(client):
+    _create_products(8)
+
+    data = client.get('/dashboard/products?product_stock_status=out_of_stock').get_json()
+    assert data['items'] and all(item['stock_status'] == 'out_of_stock' for item in data['items'])
+
+    assert client.get('/dashboard/products?after=invalido').status_code == 400
+
+def test_dashboard_nao_renderiza_catalogo(client):
+    _create_products(30)
+    html = client.get('/dashboard').get_data(as_text=True)
+    assert 'dashboard-products-body' in html
+    assert 'Produto 029' not in html
+
+def _walk(query, keys, per_page):
+    """Percorre todas as páginas para frente e depois de volta"""
+    forward = []
+    pages = []
+    page = paginate_keyset(query, keys, per_page=per_page)
+    while True:
+        pages.append(page)
+        forward.extend(item.id for item in page.items)
+        if not page.has_next:
+            break
+        page = paginate_keyset(query, keys, after=page.next_cursor, per_page=per_page)
+
+    backward = []
+    while page.has_prev:
+        page = paginate_keyset(query, keys, before=page.prev_cursor, per_page=per_page)
+        backward = [item.id for item in page.items] + backward
+    return forward, backward, pages
+
+def test_todas_as_ordenacoes_de_produtos(app):
+    _create_products(23)
+    products = Product.query.all()
+    products[3].sale_price = None
+    products[5].current_stock = None
+    db.session.commit()
+
+    for sort, keys in PRODUCT_SORT_KEYS.items():
+        query = Product.query
+        forward, backward, pages = _walk(query, keys, per_page=5)
+        expected = [p.id for p in query.order_by(*order_by_keys(keys))]
+        assert forward == expected, sort
+        # Voltando a partir da última página chega-se ao início sem repetir itens
+        assert backward == expected[:len(backward)]
+        assert len(backward) == len(expected) - len(pages[-1].items)
+
+def test_total_e_cacheado_entre_paginas(app):
+    _create_products(12)
+    invalidate_counts()
+    keys = PRODUCT_SORT_KEYS['name']
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    first = paginate_keyset(Product.query, keys, per_page=5)
+    second = paginate_keyset(Product.query, keys, after=first.next_cursor, per_page=5)
+    counts = [sql for sql in statements if 'count(' in sql.lower()]
+    assert first.total == second.total == 15
+    assert len(counts) == 1
+
+    # Inserir um produto invalida o total em cache
+    db.session.add(Product(name='Novo'))
+    db.session.commit()
+    assert paginate_keyset(Product.query, keys, per_page=5).total == 16
+
+def test_total_filtrado_acompanha_alteracoes(app):
+    _create_products(12)
+    invalidate_counts()
+    keys = PRODUCT_SORT_KEYS['name']
+    active = Product.query.filter(Product.is_active.is_(True))
+    out_of_stock = Product.query.filter(Product.current_stock <= 0)
+    assert paginate_keyset(active, keys).total == 15
+    assert paginate_keyset(out_of_stock, keys).total == 6
+
+    # Alteração pelo ORM tira o produto do filtro
+    db.session.get(Product, 1).is_active = False
+    db.session.commit()
+    assert paginate_keyset(active, keys).total == 14
+
+    # Movimentação de estoque (UPDATE direto) também
+    move_stock(1, 'entrada', 5)
+    db.session.commit()
+    assert paginate_keyset(out_of_stock, keys).total == 5
+
+def test_listagens_do_estoque(client):
+    _create_products(25)
+    html = client.get('/inventory/products?sort=price').get_data(as_text=True)
+    assert 'after=' in html
+    assert client.get('/inventory/products?after=invalido').status_code == 200
+    assert client.get('/inventory/movements').status_code == 200
+
+def _follow(client, url):
+    """Segue os links "Próxima" (after=) de uma listagem HTML até o fim"""
+    pages = []
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(html)
+        link = re.search(r'href="([^"]*after=[^"]*)">\s*Próxima', html)
+        url = unescape(link.group(1)) if link else None
+    return pages
+
+def test_listagens_de_crm_financas_e_agenda(client, admin):
+    db.session.add_all([Customer(name=f'Cliente {i:03d}') for i in range(45)])
+    account = Account(name='Caixa', account_type='caixa')
+    db.session.add(account)
+    db.session.flush()
+    start = datetime(2024, 1, 1, 9)
+    db.session.add_all([
+        Transaction(account_id=account.id, transaction_type='receita', description=f'Venda {i}',
+                    amount=10, transaction_date=date(2024, 1, 1) + timedelta(days=i % 7),
+                    user_id=admin.id)
+        for i in range(30)
+    ])
+    db.session.add_all([
+        Event(title=f'Evento {i}', start_date=start + timedelta(hours=i),
+              end_date=start + timedelta(hours=i + 1), user_id=admin.id)
+        for i in range(25)
+    ])
+    db.session.commit()
+
+    pages = _follow(client, '/crm/customers')
+    assert len(pages) == 3
+    seen = [name for html in pages for name in re.findall(r'Cliente \d{3}', html)]
+    assert sorted(set(seen)) == [f'Cliente {i:03d}' for i in range(45)]
+    assert '45 clientes' in pages[0]
+
+    assert len(_follow(client, '/finance/transactions?status=&account=')) == 2
+    assert len(_follow(client, '/schedule/events')) == 2
+    assert client.get('/crm/sales').status_code == 200
+    assert client.get('/finance/invoices?after=invalido').status_code == 200
+
+def test_lookups_usam_a_mesma_convencao_de_cursor(client):
+    db.session.add_all([Customer(name=f'Cliente {i:03d}') for i in range(25)])
+    db.session.commit()
+    response = client.get('/lookups/customers?per_page=10')
+    data = response.get_json()
+    assert data['next_cursor'] and response.headers['X-Next-Cursor'] == data['next_cursor']
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Testes do teste de carga (tools/benchmarks/load_test.py) contra um servidor
+WSGI local em thread
+"""
+
+import importlib.util
+import os
+import threading
+from datetime import date
+
+import pytest
+from werkzeug.serving import make_server
+
+import config as config_module
+from app import create_app
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'benchmarks')
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BENCHMARKS, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Requisições de cada jornada e endpoints registrados por todas elas
+JOURNEY_STEPS = {'produtos': 4, 'agenda': 2, 'movimento': 4, 'venda': 4, 'dashboard': 1}
+ENDPOINTS = {
+    'inventory.products', 'inventory.products?search', 'inventory.products?page', 'inventory.product_detail',
+    'schedule.api_events', 'schedule.api_appointments',
+    'inventory.new_movement', 'main.lookup', 'inventory.new_movement POST', 'inventory.movements',
+    'crm.new_sale', 'inventory.product_typeahead', 'crm.new_sale POST',
+    'main.dashboard',
+}
+
+@pytest.fixture(scope='module')
+def load_test():
+    return _load('load_test')
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    path = str(tmp_path / 'load.db')
+    _load('synthetic_data').generate_database(
+        f'sqlite:///{path}', seed=1, end=date.today(), customers=40, products=30, categories=4,
+        sales=200, events=20, appointments=20, days=60, users=2)
+
+    class LoadConfig(config_module.TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    monkeypatch.setitem(config_module.config, 'load', LoadConfig)
+    app = create_app('load')
+    app.testing = False
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}', path
+    httpd.shutdown()
+
+def test_estagio_com_jornadas_e_sessoes(load_test, server):
+    url, path = server
+    context = dict(load_test.discover_context(path), username='admin', password='admin123',
+                   today=date.today())
+    assert context['products'] == 30 and context['customers'] == 40
+
+    # Número fixo de jornadas por usuário: o estágio não depende da máquina
+    stage = load_test.run_stage(url, users=3, duration=120, context=context, seed=1, max_journeys=8)
+    assert stage['users'] == 3
+    journeys = stage['journeys']
+    assert sum(journeys.values()) == 24
+    assert set(journeys) == {name for name, _, _ in load_test.JOURNEYS}
+
+    # Todas as jornadas sorteadas rodaram por inteiro
+    total = stage['total']
+    assert total['requests'] == sum(JOURNEY_STEPS[name] * count for name, count in journeys.items())
+    assert total['requests'] == sum(stats['requests'] for stats in stage['endpoints'].values())
+    assert set(stage['endpoints']) == ENDPOINTS
+    assert total['rps'] > 0
+    assert total['p50_ms'] <= total['p95_ms'] <= total['p99_ms']
+    # Sessões mantidas: as rotas protegidas responderam 200, sem voltar ao login
+    failing = {endpoint for endpoint, stats in stage['endpoints'].items() if stats['errors']}
+    assert failing == set()
+    assert total['errors'] == 0
+
+def test_login_invalido_interrompe(load_test, server):
+    url, path = server
+    context = dict(load_test.discover_context(path), username='admin', password='errada',
+                   today=date.today())
+    with pytest.raises(RuntimeError, match='Login falhou'):
+        load_test.run_stage(url, users=1, duration=0.5, context=context)
+
+def _stage(users, rps, p95):
+    return {'users': users, 'total': {'rps': rps, 'p95_ms': p95}}
+
+def test_ponto_de_saturacao(load_test):
+    stages = [_stage(1, 50, 20), _stage(5, 200, 25), _stage(10, 260, 40), _stage(20, 270, 90)]
+    assert load_test.find_saturation(stages) == 20
+    assert load_test.find_saturation(stages[:3]) is None
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Testes dos campos de seleção remota (app/services/lookups.py): páginas por
+cursor, busca, filtros, cache e os formulários que deixaram de carregar
+todos os clientes e produtos
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.crm import Customer
+from app.models.inventory import Product
+from app.models.schedule import Appointment
+from app.services.cache_stats import add_cache_observer, remove_cache_observer
+from app.services.stock import bulk_move_stock
+
+@pytest.fixture
+def records(app):
+    db.session.add_all([
+        Customer(name=f'Cliente {index:02d}', email=f'cliente{index}@exemplo.com',
+                 status='active' if index % 2 else 'inactive')
+        for index in range(1, 46)
+    ])
+    db.session.add_all([
+        Product(name='Caneta Azul', sku='CAN-0001', sale_price=2.5, current_stock=40, min_stock=5),
+        Product(name='Borracha', sku='BOR-0002', sale_price=1, current_stock=3, unit='cx'),
+        Product(name='Caneta Inativa', sku='CAN-0003', is_active=False),
+    ])
+    db.session.commit()
+
+@pytest.fixture
+def lookups(app):
+    reads = []
+    observer = lambda cache, hit: cache == 'lookup' and reads.append(hit)
+    add_cache_observer(observer)
+    yield reads
+    remove_cache_observer(observer)
+
+def test_paginas_por_cursor(app, client, records):
+    names, url = [], '/lookups/customers?per_page=20'
+    while url:
+        data = client.get(url).get_json()
+        names += [item['label'].split(' - ')[0] for item in data['items']]
+        url = f'/lookups/customers?per_page=20&after={data["next_cursor"]}' if data['next_cursor'] else None
+    assert names == [f'Cliente {index:02d}' for index in range(1, 46)]
+
+    item = client.get('/lookups/customers?per_page=1').get_json()['items'][0]
+    assert item == {'id': 1, 'label': 'Cliente 01 - cliente1@exemplo.com',
+                    'data': {'name': 'Cliente 01', 'email': 'cliente1@exemplo.com', 'company': None, 'phone': None}}
+
+    assert client.get('/lookups/customers?after=xyz').status_code == 400
+    assert client.get('/lookups/users').status_code == 404
+
+def test_busca_e_filtros(app, client, records):
+    data = client.get('/lookups/customers?q=cliente4&active=1').get_json()
+    assert [item['id'] for item in data['items']] == [41, 43, 45]
+    data = client.get('/lookups/customers?q=cliente4').get_json()
+    assert len(data['items']) == 7
+
+    items = client.get('/lookups/products').get_json()['items']
+    assert [item['label'] for item in items] == ['Borracha (Estoque: 3 CX)', 'Caneta Azul (Estoque: 40 UN)']
+    assert items[1]['data']['sale_price'] == 2.5
+    items = client.get('/lookups/products?q=CAN-000').get_json()['items']
+    assert [item['id'] for item in items] == [1]
+
+def test_cache_descartado_ao_gravar(app, client, records, lookups):
+    url = '/lookups/customers?q=cliente 01'
+    assert client.get(url).get_json()['items'][0]['data']['name'] == 'Cliente 01'
+    client.get(url)
+    assert lookups == [False, True]
+
+    customer = db.session.get(Customer, 1)
+    customer.name = 'Cliente 01 Renomeado'
+    db.session.commit()
+    assert client.get(url).get_json()['items'][0]['data']['name'] == 'Cliente 01 Renomeado'
+    assert lookups[-1] is False
+
+    # Gravação de produto não descarta as páginas de clientes
+    client.get(url)
+    db.session.get(Product, 1).current_stock = 0
+    db.session.commit()
+    client.get(url)
+    assert lookups[-2:] == [True, True]
+
+def test_formularios_sem_a_tabela_inteira(app, client, admin, records):
+    html = client.get('/crm/sales/new?customer_id=3').get_data(as_text=True)
+    assert '/lookups/customers?active=1' in html
+    assert 'Cliente 03 - cliente3@exemplo.com' in html
+    assert 'Cliente 05' not in html
+    assert 'remote-select-search' in html and "querySelectorAll('.remote-select')" in html
+
+    html = client.get('/inventory/movements/new?product_id=2').get_data(as_text=True)
+    assert 'Borracha (Estoque: 3 CX)' in html and 'data-current-stock="3"' in html
+    assert 'Caneta Azul' not in html
+
+    html = client.get('/schedule/appointments/new').get_data(as_text=True)
+    assert '/lookups/customers"' in html
+    assert 'Cliente 01' not in html
+
+    appointment = Appointment(customer_id=7, user_id=admin.id, title='Visita',
+                              appointment_date=datetime.now() + timedelta(days=1))
+    db.session.add(appointment)
+    db.session.commit()
+    html = client.get(f'/schedule/appointments/{appointment.id}/edit').get_data(as_text=True)
+    assert 'value="7" selected' in html
+    assert 'Cliente 09' not in html
+
+def test_erro_de_validacao_mantem_o_escolhido(app, client, records):
+    response = client.post('/schedule/appointments/new', data={'customer_id': '9', 'title': ''})
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'O título é obrigatório!' in html
+    assert 'value="9" selected' in html
+
+    response = client.post('/inventory/movements/new', data={
+        'product_id': '1', 'movement_type': 'entrada', 'quantity': '0'})
+    html = response.get_data(as_text=True)
+    assert 'A quantidade deve ser maior que zero!' in html
+    assert 'value="1" selected' in html and 'Borracha' not in html
+
+def test_movimentacao_de_estoque_descarta_as_paginas(app, client, admin, records):
+    def stock():
+        items = client.get('/lookups/products?q=caneta').get_json()['items']
+        return items[0]['data']['current_stock']
+
+    assert stock() == 40
+    # O saldo muda por UPDATE direto (sem objeto do ORM na sessão)
+    response = client.post('/inventory/movements/new', data={
+        'product_id': '1', 'movement_type': 'entrada', 'quantity': '7'})
+    assert response.status_code == 302
+    assert stock() == 47
+
+    bulk_move_stock([{'product_id': 1, 'movement_type': 'saida', 'quantity': 2}], admin.id)
+    assert stock() == 45
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes do endpoint /metrics (Prometheus), incluindo a soma dos workers no
+modo multiprocess
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('prometheus_client')
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+import config as config_module
+from app import create_app, db
+from app.models.user import User
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+class MetricsConfig(config_module.TestingConfig):
+    METRICS_ENABLED = True
+
+@pytest.fixture
+def metrics_client(monkeypatch):
+    monkeypatch.setitem(config_module.config, 'metrics', MetricsConfig)
+    app = create_app('metrics')
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', email='admin@erp.com', first_name='Administrador',
+                    last_name='Sistema', role='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.commit()
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def _samples(text, name):
+    return [sample for family in text_string_to_metric_families(text)
+            for sample in family.samples if sample.name == name]
+
+def test_metricas_de_requisicao_sql_e_cache(metrics_client):
+    labels = {'blueprint': 'inventory', 'endpoint': 'inventory.products', 'method': 'GET'}
+    requests_before = _value('erp_http_requests_total', status='200', **labels)
+    latency_before = _value('erp_http_request_duration_seconds_count', **labels)
+    sql_before = _value('erp_sql_statements_total', blueprint='inventory', endpoint='inventory.products')
+    hits_before = _value('erp_cache_requests_total', cache='stock_totals', result='hit')
+
+    for _ in range(3):
+        assert metrics_client.get('/inventory/products').status_code == 200
+    for _ in range(2):
+        assert metrics_client.get('/dashboard').status_code == 200
+
+    response = metrics_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    text = response.get_data(as_text=True)
+
+    assert _value('erp_http_requests_total', status='200', **labels) == requests_before + 3
+    assert _value('erp_http_request_duration_seconds_count', **labels) == latency_before + 3
+    assert _value('erp_sql_statements_total', blueprint='inventory',
+                  endpoint='inventory.products') >= sql_before + 3
+    # O segundo dashboard lê os totais do estoque do cache
+    assert _value('erp_cache_requests_total', cache='stock_totals', result='hit') >= hits_before + 1
+    # Durante a coleta, a única requisição em andamento é o próprio /metrics
+    assert [sample.value for sample in _samples(text, 'erp_http_requests_in_flight')] == [1]
+    assert _value('erp_http_requests_in_flight') == 0
+    assert _samples(text, 'erp_db_pool_checkouts_total')
+    assert _samples(text, 'erp_db_pool_connect_seconds_count')
+    assert _samples(text, 'erp_db_pool_connections_in_use')
+    assert 'erp_http_request_duration_seconds_bucket' in text
+
+def test_token_obrigatorio(metrics_client, monkeypatch):
+    monkeypatch.setattr(MetricsConfig, 'METRICS_TOKEN', 'segredo')
+    app = create_app('metrics')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+    assert response.status_code == 200
+
+WORKER = """
+from app import create_app, db
+app = create_app('testing')
+with app.app_context():
+    db.create_all()
+client = app.test_client()
+for _ in range(3):
+    assert client.get('/login').status_code == 200
+"""
+
+def test_modo_multiprocess_soma_os_workers(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'metrics')
+    os.makedirs(directory)
+    env = dict(os.environ, METRICS_ENABLED='true', PROMETHEUS_MULTIPROC_DIR=directory)
+    workers = [subprocess.Popen([sys.executable, '-c', WORKER], cwd=ROOT, env=env) for _ in range(2)]
+    for worker in workers:
+        assert worker.wait(timeout=60) == 0
+
+    from prometheus_client import multiprocess
+    from app.services.metrics import collect_metrics
+
+    for worker in workers:
+        multiprocess.mark_process_dead(worker.pid, directory)
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', directory)
+    text = collect_metrics().decode()
+
+    [requests] = [sample for sample in _samples(text, 'erp_http_requests_total')
+                  if sample.labels['endpoint'] == 'auth.login']
+    assert requests.value == 6
+    [count] = [sample for sample in _samples(text, 'erp_http_request_duration_seconds_count')
+               if sample.labels['endpoint'] == 'auth.login']
+    assert count.value == 6
+    # Os valores "live" dos workers encerrados são descartados
+    assert sum(sample.value for sample in _samples(text, 'erp_http_requests_in_flight')) == 0
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN QUERY PLAN das listagens e relatórios: cada rota é executada, os
+SELECTs emitidos são capturados e nenhum deles pode varrer por completo
+(SCAN sem índice) as tabelas filtradas/ordenadas por aquela rota
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.crm import Customer
+from app.models.finance import Account, Transaction
+from app.models.inventory import Category, Product, StockMovement
+from app.models.schedule import Appointment, Event
+
+# (rota, tabelas que devem ser acessadas por índice)
+ROUTES = [
+    ('/crm/sales', {'sale'}),
+    ('/crm/customers/{customer_id}', {'sale'}),
+    ('/finance/', {'transaction'}),
+    ('/finance/transactions', {'transaction'}),
+    ('/finance/transactions?status=completed&type=receita', {'transaction'}),
+    ('/finance/transactions?account={account_id}', {'transaction'}),
+    ('/finance/reports?start_date=2024-01-01&end_date=2024-12-31', {'transaction', 'invoice'}),
+    ('/finance/reports?start_date=2024-01-01&end_date=2024-12-31&detail=1', {'transaction'}),
+    ('/finance/invoices', {'invoice'}),
+    ('/inventory/products?category={category_id}&status=active', {'product'}),
+    ('/inventory/products', {'product'}),
+    ('/inventory/movements', {'stock_movement'}),
+    ('/inventory/products/{product_id}', {'stock_movement'}),
+    ('/schedule/', {'appointment', 'event'}),
+    ('/schedule/events', {'event'}),
+    ('/schedule/appointments', {'appointment'}),
+    ('/schedule/appointments?status=scheduled', {'appointment'}),
+    ('/schedule/api/appointments?start=2024-01-01&end=2024-02-01', {'appointment'}),
+    ('/schedule/api/events?start=2024-01-01&end=2024-02-01', {'event'}),
+    ('/dashboard', {'transaction', 'sale'}),
+]
+
+@pytest.fixture
+def seeded(app, admin):
+    category = Category(name='Papelaria')
+    account = Account(name='Banco', account_type='banco')
+    customer = Customer(name='Ana')
+    db.session.add_all([category, account, customer])
+    db.session.flush()
+
+    product = Product(name='Caneta', category_id=category.id, current_stock=10)
+    db.session.add(product)
+    db.session.flush()
+
+    # O plano do SQLite (sem ANALYZE) não depende do volume de dados;
+    # as linhas só garantem que as consultas de detalhe sejam executadas
+    when = datetime(2024, 1, 10, 9)
+    db.session.add_all([
+        Transaction(account_id=account.id, transaction_type='receita', description='Venda',
+                    amount=10, transaction_date=when.date(), status='completed', user_id=admin.id),
+        StockMovement(product_id=product.id, movement_type='entrada', quantity=10,
+                      previous_stock=0, new_stock=10, user_id=admin.id, movement_date=when),
+        Appointment(customer_id=customer.id, user_id=admin.id, title='Visita', appointment_date=when),
+        Event(title='Reunião', start_date=when, end_date=when + timedelta(hours=1), user_id=admin.id),
+    ])
+    db.session.commit()
+    return {'customer_id': customer.id, 'account_id': account.id,
+            'category_id': category.id, 'product_id': product.id}
+
+def _full_scans(statement, params, tables):
+    with db.engine.connect() as connection:
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', params).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[3]
+        if not detail.startswith('SCAN ') or 'INDEX' in detail:
+            continue
+        table = detail.split()[1].strip('"')
+        if table in tables:
+            scans.append(detail)
+    return scans
+
+@pytest.mark.parametrize('url, tables', ROUTES)
+def test_rotas_usam_indices(client, seeded, url, tables):
+    url = url.format(**seeded)
+    statements = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, params))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+
+    touched = [s for s in statements if any(table in s[0] for table in tables)]
+    assert touched, f'{url} não consultou {tables}'
+
+    problems = {}
+    for statement, params in touched:
+        scans = _full_scans(statement, params, tables)
+        if scans:
+            problems[' '.join(statement.split())[:200]] = scans
+    assert not problems, f'{url} faz varredura completa: {problems}'
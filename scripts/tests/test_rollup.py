@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Testes dos agregados diários usados pelo dashboard
+"""
+
+from datetime import datetime, date
+
+from sqlalchemy import func
+
+from app import db
+from app.models.crm import Customer, Sale
+from app.models.finance import Account, Transaction
+from app.services.rollup import kpi_summary, top_customers, rebuild_rollups, record_stock_value_change
+
+def _base_sales(start, end):
+    return db.session.query(func.count(Sale.id), func.sum(Sale.total_amount)).filter(
+        Sale.sale_date >= datetime.combine(start, datetime.min.time()),
+        Sale.sale_date <= datetime.combine(end, datetime.max.time())
+    ).one()
+
+def test_rollup_acompanha_escritas(app, admin):
+    customers = [Customer(name=f'Cliente {i}') for i in range(3)]
+    db.session.add_all(customers)
+    db.session.commit()
+
+    sales = [
+        Sale(customer_id=customers[i % 3].id, user_id=admin.id,
+             total_amount=10 + i, sale_date=datetime(2024, 1, 1 + i))
+        for i in range(6)
+    ]
+    db.session.add_all(sales)
+    db.session.commit()
+
+    # Alteração de valor/cliente, exclusão e venda fora do período
+    sales[0].total_amount = 100
+    sales[0].customer_id = customers[2].id
+    db.session.delete(sales[1])
+    db.session.commit()
+
+    summary = kpi_summary(date(2024, 1, 1), date(2024, 1, 3))
+    count, total = _base_sales(date(2024, 1, 1), date(2024, 1, 3))
+    assert summary['sales_count'] == count == 2
+    assert summary['sales_total'] == total
+    assert summary['total_sales'] == Sale.query.count()
+    assert summary['total_customers'] == Customer.query.count()
+
+    ranking = top_customers(date(2024, 1, 1), date(2024, 1, 3))
+    assert ranking[0].name == 'Cliente 2'
+    assert ranking[0].total_spent == 112
+
+def test_rollup_transacoes_concluidas(app, admin):
+    account = Account(name='Caixa', account_type='caixa')
+    db.session.add(account)
+    db.session.commit()
+
+    transaction = Transaction(
+        account_id=account.id, transaction_type='receita', description='Venda',
+        amount=30, transaction_date=date(2024, 2, 1), status='completed', user_id=admin.id
+    )
+    db.session.add(transaction)
+    db.session.commit()
+    assert kpi_summary(date(2024, 2, 1), date(2024, 2, 1))['income_total'] == 30
+
+    transaction.status = 'pending'
+    db.session.commit()
+    assert kpi_summary(date(2024, 2, 1), date(2024, 2, 1))['income_total'] == 0
+
+def test_rebuild_igual_ao_incremental(app, admin):
+    customer = Customer(name='Cliente')
+    db.session.add(customer)
+    db.session.commit()
+    db.session.add_all([
+        Sale(customer_id=customer.id, user_id=admin.id, total_amount=5, sale_date=datetime(2024, 3, d))
+        for d in range(1, 10)
+    ])
+    db.session.commit()
+
+    incremental = kpi_summary(date(2024, 3, 2), date(2024, 3, 5))
+    rebuild_rollups()
+    assert kpi_summary(date(2024, 3, 2), date(2024, 3, 5)) == incremental
+
+def test_valor_do_estoque_no_periodo(app):
+    connection = db.session.connection()
+    record_stock_value_change(connection, 100, day=date(2024, 4, 1))
+    record_stock_value_change(connection, 50, day=date(2024, 4, 10))
+    record_stock_value_change(connection, -30, day=date(2024, 4, 20))
+    db.session.commit()
+
+    summary = kpi_summary(date(2024, 4, 5), date(2024, 4, 15))
+    assert summary['stock_value_start'] == 100
+    assert summary['stock_value_end'] == 150
+
+    summary = kpi_summary(None, None)
+    assert summary['stock_value_start'] == 0
+    assert summary['stock_value_end'] == 120
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Testes do benchmark de rotas (tools/benchmarks/route_benchmark.py)
+"""
+
+import importlib.util
+import os
+from datetime import date
+
+import pytest
+
+TOOL = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'benchmarks', 'route_benchmark.py')
+
+@pytest.fixture(scope='module')
+def benchmark():
+    spec = importlib.util.spec_from_file_location('route_benchmark', TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _result(**routes):
+    return {'scales': {'10k': {'routes': {
+        endpoint: {'p95_ms': p95, 'status': status} for endpoint, (p95, status) in routes.items()
+    }}}}
+
+def test_compara_p95_com_a_baseline(benchmark):
+    baseline = _result(**{'main.dashboard': (10.0, 200), 'crm.reports': (10.0, 200),
+                          'inventory.products': (2.0, 200)})
+    current = _result(**{'main.dashboard': (11.0, 200), 'crm.reports': (20.0, 200),
+                         'inventory.products': (4.0, 200), 'finance.reports': (50.0, 200),
+                         'crm.api_get_customers': (1.0, 500)})
+    rows, failures = benchmark.compare(current, baseline, threshold=0.2, min_delta_ms=5)
+
+    assert {row['endpoint']: row['change'] for row in rows} == {
+        'main.dashboard': 0.1, 'crm.reports': 1.0, 'inventory.products': 1.0,
+        'finance.reports': None, 'crm.api_get_customers': None,
+    }
+    # +100% em 2 ms fica abaixo de min_delta_ms; rota nova não tem referência
+    assert {row['endpoint']: row['failure'] for row in failures} == {
+        'crm.reports': 'p95 +100%', 'crm.api_get_customers': 'status 500',
+    }
+    assert benchmark.compare(current, None)[1] == [failures[1]]
+
+def test_mede_todas_as_rotas_no_banco_sintetico(benchmark, tmp_path):
+    path = str(tmp_path / 'routes.db')
+    end = date(2024, 12, 31)
+    assert benchmark.prepare_database(path, 0.01, 42, end, days=90)
+    assert not benchmark.prepare_database(path, 0.01, 42, end, days=90)
+    assert benchmark.count_rows(path) > 500
+
+    results = benchmark.benchmark_routes(f'sqlite:///{path}', end, iterations=2, warmup=1)
+    assert set(results) == {endpoint for endpoint, _ in benchmark.ROUTES}
+    for endpoint, stats in results.items():
+        assert stats['status'] == 200, (endpoint, stats.get('error'))
+        assert stats['samples'] == 2
+        assert stats['queries'] >= 1
+        assert stats['p95_ms'] >= stats['p50_ms'] > 0
+    assert '2024-12-01' in results['schedule.api_events']['path']
+
+def test_banco_com_esquema_antigo_nao_e_reaproveitado(benchmark, monkeypatch):
+    end = date(2024, 12, 31)
+    path = benchmark.database_path('10k', 42, end)
+    assert path == benchmark.database_path('10k', 42, end)
+
+    # Um índice FTS5 a mais (ou coluna, tabela...) muda o arquivo do banco
+    index = benchmark.SEARCH_INDEXES['products']
+    monkeypatch.setattr(index, 'create_statements',
+                        lambda original=index.create_statements: original() + ['SELECT 1'])
+    assert benchmark.database_path('10k', 42, end) != path
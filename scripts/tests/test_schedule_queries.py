@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Regressão de N+1 na agenda: o número de consultas das listagens e dos
+feeds do calendário não pode crescer com o número de registros
+"""
+
+from datetime import datetime, timedelta
+
+from flask import g
+from sqlalchemy import event
+
+from app import db
+from app.models.crm import Customer
+from app.models.schedule import Appointment, Event
+
+URLS = (
+    '/schedule/api/appointments?start=2024-05-01&end=2024-06-01',
+    '/schedule/api/events?start=2024-05-01&end=2024-06-01',
+    '/schedule/appointments',
+)
+
+def _add_rows(user_id, count):
+    for index in range(count):
+        customer = Customer(name=f'Cliente {index}', phone='1199999')
+        db.session.add(customer)
+        db.session.flush()
+        start = datetime(2024, 5, 2, 9) + timedelta(hours=index)
+        db.session.add(Appointment(customer_id=customer.id, user_id=user_id,
+                                   title=f'Consulta {index}', appointment_date=start))
+        db.session.add(Event(title=f'Evento {index}', start_date=start,
+                             end_date=start + timedelta(hours=1), user_id=user_id))
+    db.session.commit()
+
+def _statements_per_url(client):
+    counts = {}
+    for url in URLS:
+        # Cada requisição começa como em produção: sessão vazia e usuário
+        # ainda não carregado (o contexto da aplicação é compartilhado no teste)
+        db.session.expunge_all()
+        g.pop('_login_user', None)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 200, url
+        counts[url] = len(statements)
+    return counts
+
+def test_consultas_constantes_com_mais_linhas(client, admin):
+    user_id = admin.id
+    _add_rows(user_id, 1)
+    # Aquece os caches por processo (usuário autenticado, totais)
+    _statements_per_url(client)
+    few = _statements_per_url(client)
+
+    _add_rows(user_id, 15)
+    many = _statements_per_url(client)
+
+    assert many == few
+
+    response = client.get(URLS[0])
+    titles = [item['title'] for item in response.get_json()]
+    assert 'Consulta 3 - Cliente 3' in titles
+    assert len(titles) == 16
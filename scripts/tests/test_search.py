@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Testes da busca textual com FTS5 (app/services/search.py): triggers de
+sincronização, consultas por prefixo, relevância nas listagens e busca global
+"""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.crm import Customer
+from app.models.finance import Account, Transaction
+from app.models.inventory import Product
+from app.models.schedule import Appointment
+from app.services.search import match_query, search_filter, SEARCH_INDEXES
+
+@pytest.fixture
+def catalog(app, admin):
+    db.session.add_all([
+        Product(name='Café Pilão 500g', sku='CAF-0001', barcode='7891234000011', description='Torrado e moído'),
+        Product(name='Cafeteira Elétrica', sku='ELE-0002', description='Para café coado'),
+        Product(name='Açúcar Refinado', sku='ACU-0003', description='Ideal para o café'),
+        Customer(name='João Conceição', email='joao@exemplo.com', company='Padaria Central'),
+        Customer(name='Maria Café', email='maria@exemplo.com'),
+    ])
+    account = Account(name='Caixa', account_type='caixa')
+    db.session.add(account)
+    db.session.flush()
+    db.session.add_all([
+        Transaction(account_id=account.id, transaction_type='despesa', description='Compra de café em grão',
+                    amount=120, transaction_date=date(2024, 5, 2), reference='NF-778', user_id=admin.id),
+        Transaction(account_id=account.id, transaction_type='receita', description='Venda balcão',
+                    amount=80, transaction_date=date(2024, 5, 3), reference='CX-001', user_id=admin.id),
+    ])
+    db.session.commit()
+
+def _ids(name, value, columns=None):
+    model = SEARCH_INDEXES[name].model
+    condition = search_filter(name, model.id, value, columns)
+    return sorted(row.id for row in db.session.query(model.id).filter(condition))
+
+def test_consulta_sem_sintaxe_do_fts():
+    assert match_query('café pil') == '"café"* "pil"*'
+    assert match_query('SKU-0001') == '"SKU 0001"*'
+    assert match_query('nome:"x" OR (y') == '"nome x"* "OR"* "y"*'
+    assert match_query(' -- ') is None
+    assert match_query('joao', columns=('name',)) == '{name} : ("joao"*)'
+
+def test_prefixo_sem_acentos(app, catalog):
+    assert _ids('products', 'cafe') == [1, 2, 3]
+    assert _ids('products', 'CAFÉ pil') == [1]
+    assert _ids('products', 'caf-00') == [1]
+    assert _ids('products', '789123') == [1]
+    assert _ids('customers', 'conceicao') == [1]
+    assert _ids('customers', 'padaria') == [1]
+    assert _ids('customers', 'padaria', columns=('name',)) == []
+    assert _ids('transactions', 'nf 778') == [1]
+    assert search_filter('products', Product.id, '') is None
+
+def test_triggers_acompanham_as_gravacoes(app, catalog):
+    product = db.session.get(Product, 3)
+    product.name = 'Adoçante Líquido'
+    db.session.commit()
+    assert _ids('products', 'acucar') == []
+    assert _ids('products', 'adocante') == [3]
+
+    # Alterações em colunas não indexadas não reescrevem o índice
+    db.session.execute(text('UPDATE product SET current_stock = 50'))
+    assert _ids('products', 'adocante') == [3]
+
+    db.session.delete(db.session.get(Customer, 2))
+    db.session.commit()
+    assert _ids('customers', 'maria') == []
+
+    # Gravação fora do ORM também é indexada
+    db.session.execute(text("INSERT INTO product (name, sku) VALUES ('Filtro de Papel', 'FIL-0004')"))
+    db.session.commit()
+    assert _ids('products', 'filtro') == [4]
+
+def test_listagem_de_produtos_por_relevancia(app, client, catalog):
+    html = client.get('/inventory/products?search=cafe').get_data(as_text=True)
+    assert 'value="relevance" selected' in html
+    # O nome pesa mais que a descrição: o açúcar (só na descrição) vem por último
+    assert html.index('Café Pilão 500g') < html.index('Açúcar Refinado')
+    assert html.index('Cafeteira Elétrica') < html.index('Açúcar Refinado')
+    assert 'Adoçante' not in client.get('/inventory/products?search=torrado').get_data(as_text=True)
+
+    html = client.get('/inventory/products?search=cafe&sort=name').get_data(as_text=True)
+    # Ordem binária do SQLite: "é" vem depois de "e"
+    assert html.index('Açúcar Refinado') < html.index('Cafeteira Elétrica') < html.index('Café Pilão 500g')
+
+def test_relevancia_com_paginacao_por_cursor(app, client):
+    db.session.add_all([Product(name=f'Caneca {index:02d}', sku=f'CAN-{index:04d}') for index in range(1, 46)])
+    db.session.commit()
+    seen, cursor = [], None
+    for _ in range(3):
+        url = '/inventory/products?search=caneca' + (f'&after={cursor}' if cursor else '')
+        html = client.get(url).get_data(as_text=True)
+        seen += [index for index in range(1, 46) if f'Caneca {index:02d}<' in html]
+        cursor = html.split('after=')[1].split('"')[0].split('&')[0] if 'after=' in html else None
+        if not cursor:
+            break
+    assert sorted(seen) == list(range(1, 46)) and len(seen) == len(set(seen))
+
+def test_outras_listagens(app, client, catalog, admin):
+    db.session.add(Appointment(customer_id=1, user_id=admin.id, title='Visita técnica',
+                               appointment_date=datetime(2024, 6, 1, 10)))
+    db.session.commit()
+    html = client.get('/schedule/appointments?search=joao').get_data(as_text=True)
+    assert 'Visita técnica' in html
+    html = client.get('/schedule/appointments?search=maria').get_data(as_text=True)
+    assert 'Visita técnica' not in html
+
+    html = client.get('/finance/transactions?search=grao').get_data(as_text=True)
+    assert 'Compra de café em grão' in html and 'Venda balcão' not in html
+
+    data = client.get('/dashboard/products?product_search=cafeteira').get_json()
+    assert [item['name'] for item in data['items']] == ['Cafeteira Elétrica']
+
+def test_busca_global(app, client, catalog):
+    data = client.get('/search?q=cafe').get_json()
+    results = data['results']
+    assert [item['title'] for item in results['products']][-1] == 'Açúcar Refinado'
+    assert len(results['products']) == 3
+    assert [item['title'] for item in results['customers']] == ['Maria Café']
+    assert [item['title'] for item in results['transactions']] == ['Compra de café em grão']
+    assert results['products'][-1]['url'] == '/inventory/products/3'
+    assert len(client.get('/search?q=cafe&limit=1').get_json()['results']['products']) == 1
+
+    assert client.get('/search?q=%22').get_json()['results'] == {
+        'products': [], 'customers': [], 'transactions': []}
+
+def test_consulta_usa_o_indice_fts(app, catalog):
+    condition = search_filter('products', Product.id, 'cafe')
+    statement = db.session.query(Product.id).filter(condition).statement.compile(
+        db.engine, compile_kwargs={'literal_binds': True})
+    plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')))
+    assert 'VIRTUAL TABLE' in plan
+    assert 'SCAN product ' not in plan + ' '
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Testes do cache das configurações do sistema (app/services/settings.py)
+"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from flask import render_template_string
+from sqlalchemy import text
+
+from app import db
+from app.models.inventory import Product
+from app.models.settings import SystemSettings, EmailSettings, SettingsVersion
+from app.services import settings as settings_service
+from app.services.cache_stats import add_cache_observer, remove_cache_observer
+from app.services.settings import get_settings, local_today
+
+@pytest.fixture
+def reads():
+    events = []
+
+    def observer(cache, hit):
+        if cache == 'settings':
+            events.append(hit)
+
+    add_cache_observer(observer)
+    yield events
+    remove_cache_observer(observer)
+
+def test_padroes_sem_linhas_e_snapshot_imutavel(app):
+    snapshot = get_settings()
+    assert snapshot.version == 0
+    assert snapshot.system is None and snapshot.email is None
+    assert snapshot.currency == 'BRL'
+    assert snapshot.timezone == 'America/Sao_Paulo'
+    assert snapshot.low_stock_threshold == 10
+
+    db.session.add(SystemSettings(company_name='Loja', currency='USD'))
+    db.session.commit()
+    snapshot = get_settings()
+    assert snapshot.system['company_name'] == 'Loja'
+    with pytest.raises(TypeError):
+        snapshot.system['currency'] = 'EUR'
+
+def test_carrega_uma_vez_e_recarrega_apos_gravacao(app, reads):
+    db.session.add(SystemSettings(company_name='Loja', currency='USD'))
+    db.session.commit()
+    assert db.session.get(SettingsVersion, 1).version == 1
+
+    first = get_settings()
+    assert get_settings() is first
+    assert reads == [False, True]
+
+    system = SystemSettings.query.first()
+    system.currency = 'EUR'
+    db.session.commit()
+    assert db.session.get(SettingsVersion, 1).version == 2
+    # O processo que gravou enxerga a mudança imediatamente
+    assert get_settings().currency == 'EUR'
+
+    # Sessão sem alterações reais não muda a versão
+    SystemSettings.query.first().currency = 'EUR'
+    db.session.commit()
+    assert db.session.get(SettingsVersion, 1).version == 2
+
+def test_rollback_nao_muda_a_versao(app):
+    db.session.add(SystemSettings(company_name='Loja'))
+    db.session.flush()
+    db.session.rollback()
+    assert db.session.get(SettingsVersion, 1) is None
+    assert get_settings().system is None
+
+def test_outro_worker_invalida_pelo_contador(app, monkeypatch):
+    db.session.add(SystemSettings(company_name='Loja', currency='USD'))
+    db.session.commit()
+    assert get_settings().currency == 'USD'
+
+    # Gravação de outro processo: SQL direto, sem os eventos desta sessão
+    db.session.execute(text("UPDATE system_settings SET currency = 'EUR'"))
+    db.session.execute(text('UPDATE settings_version SET version = version + 1'))
+    db.session.commit()
+    assert get_settings().currency == 'USD'
+
+    monkeypatch.setattr(settings_service, 'SETTINGS_VERSION_CHECK', 0)
+    assert get_settings().currency == 'EUR'
+
+def test_templates_e_pagina_de_configuracoes(app, client, reads):
+    assert render_template_string('{{ app_settings.currency }}') == 'BRL'
+    assert client.get('/settings').status_code == 200
+
+    response = client.post('/settings', data={
+        'company_name': 'Minha Loja', 'company_email': 'contato@loja.com', 'company_phone': '',
+        'company_address': '', 'currency': 'USD', 'timezone': 'America/Manaus',
+        'low_stock_threshold': '5', 'invoice_due_days': '15',
+    })
+    assert response.status_code == 302
+    assert render_template_string('{{ app_settings.currency }} {{ app_settings.low_stock_threshold }}') == 'USD 5'
+
+    html = client.get('/settings').get_data(as_text=True)
+    assert 'value="Minha Loja"' in html
+    client.post('/backup_settings', data={'backup_frequency': 'weekly', 'backup_retention': '7'})
+    assert get_settings().backup['frequency'] == 'weekly'
+    assert get_settings().version == 2
+
+    # Templates que não usam app_settings não consultam as configurações
+    reads.clear()
+    render_template_string('{{ 1 + 1 }}')
+    assert reads == []
+
+def test_senha_smtp_fora_do_snapshot(app, client):
+    client.post('/email_settings', data={'smtp_server': 'smtp.loja.com', 'smtp_port': '587',
+                                         'smtp_username': 'loja', 'smtp_password': 'segredo'})
+    assert 'smtp_password' not in get_settings().email
+    assert render_template_string('{{ app_settings.email.smtp_password }}') == ''
+    assert 'segredo' not in client.get('/settings').get_data(as_text=True)
+
+    # Em branco, a senha gravada é mantida
+    client.post('/email_settings', data={'smtp_server': 'smtp2.loja.com', 'smtp_port': '587',
+                                         'smtp_username': 'loja', 'smtp_password': ''})
+    assert EmailSettings.query.first().smtp_password == 'segredo'
+
+def test_consumidores_usam_o_snapshot(app, client):
+    assert render_template_string('{{ 12.5|money }}') == 'R$ 12.50'
+    db.session.add(SystemSettings(currency='EUR', low_stock_threshold=7, invoice_due_days=10,
+                                  timezone='America/Manaus'))
+    db.session.commit()
+    assert render_template_string('{{ 12.5|money }}') == '€ 12.50'
+    assert local_today() == datetime.now(ZoneInfo('America/Manaus')).date()
+
+    client.post('/inventory/products/new', data={'name': 'Caneta', 'sku': 'CAN-1'})
+    assert Product.query.filter_by(name='Caneta').one().min_stock == 7
+
+    html = client.get('/finance/invoices/new').get_data(as_text=True)
+    assert f'value="{local_today() + timedelta(days=10)}"' in html
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Testes do log de consultas lentas
+"""
+
+import json
+
+import pytest
+
+import config as config_module
+from app import create_app, db
+from app.models.crm import Customer
+from app.models.user import User
+from app.services.slow_queries import redact_params
+
+def _app(monkeypatch, tmp_path, threshold):
+    class SlowConfig(config_module.TestingConfig):
+        SLOW_QUERY_MS = threshold
+        SLOW_QUERY_LOG = str(tmp_path / 'slow.log')
+
+    monkeypatch.setitem(config_module.config, 'slow', SlowConfig)
+    return create_app('slow')
+
+def _login(app):
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', email='admin@erp.com', first_name='Administrador',
+                    last_name='Sistema', role='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.add(Customer(name='Ana Souza', email='ana@exemplo.com'))
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+def _entries(tmp_path):
+    path = tmp_path / 'slow.log'
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+def test_grava_rota_chamador_plano_e_mascara_parametros(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, 0)
+    client = _login(app)
+    assert client.get('/crm/customers?search=Souza').status_code == 200
+
+    entries = [entry for entry in _entries(tmp_path)
+               if entry.get('endpoint') == 'crm.customers' and 'FROM customer' in entry['statement']]
+    assert entries
+    entry = next(entry for entry in entries if entry['plan'])
+    assert entry['blueprint'] == 'crm'
+    assert entry['path'] == '/crm/customers'
+    assert entry['caller'].startswith('app/routes/crm.py:')
+    assert entry['caller'].endswith(' customers')
+    assert entry['duration_ms'] >= 0
+    assert any(step.startswith(('SCAN', 'SEARCH')) for step in entry['plan'])
+
+    # Nenhum valor de parâmetro chega ao arquivo
+    text = (tmp_path / 'slow.log').read_text(encoding='utf-8')
+    assert 'Souza' not in text
+    assert 'admin123' not in text
+    assert '<str:' in text
+
+def test_abaixo_do_limite_nao_grava(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, 60_000)
+    client = _login(app)
+    assert client.get('/crm/customers').status_code == 200
+    assert _entries(tmp_path) == []
+
+def test_desligado_por_padrao(app):
+    assert not app.config['SLOW_QUERY_MS']
+
+@pytest.mark.parametrize('parameters, executemany, expected', [
+    (('ana@exemplo.com', 3, 2.5, None, True), False, ['<str:15>', '<int>', '<float>', None, True]),
+    ({'email': 'x'}, False, {'email': '<str:1>'}),
+    ([(1,), (2,)], True, {'executemany': 2}),
+])
+def test_mascara_parametros(parameters, executemany, expected):
+    assert redact_params(parameters, executemany) == expected
+
+def test_arquivo_por_worker_por_padrao(app):
+    # Cada worker do gunicorn rotaciona o seu próprio arquivo
+    assert '{pid}' in app.config['SLOW_QUERY_LOG']
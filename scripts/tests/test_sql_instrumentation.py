@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Testes da instrumentação de SQL por requisição (Server-Timing e /stats/sql)
+"""
+
+import re
+
+import pytest
+from sqlalchemy import event
+
+import config as config_module
+from app import create_app, db
+from app.models.crm import Customer
+from app.models.user import User
+
+class InstrumentedConfig(config_module.TestingConfig):
+    SQL_INSTRUMENTATION = True
+
+@pytest.fixture
+def instrumented(monkeypatch):
+    monkeypatch.setitem(config_module.config, 'instrumented', InstrumentedConfig)
+    app = create_app('instrumented')
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', email='admin@erp.com', first_name='Administrador',
+                    last_name='Sistema', role='admin')
+        user.set_password('admin123')
+        db.session.add(user)
+        db.session.add_all([Customer(name=f'Cliente {index}') for index in range(5)])
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        app.extensions['sql_instrumentation'].reset()
+        yield app, client
+        db.session.remove()
+        db.drop_all()
+
+def _timing(response):
+    header = response.headers['Server-Timing']
+    match = re.match(r'sql;dur=([\d.]+);desc="(\d+) queries", '
+                     r'sql-slowest;dur=([\d.]+), app;dur=([\d.]+)$', header)
+    assert match, header
+    sql_ms, queries, slowest_ms, total_ms = match.groups()
+    return float(sql_ms), int(queries), float(slowest_ms), float(total_ms)
+
+def test_server_timing_conta_os_comandos(instrumented):
+    app, client = instrumented
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/crm/customers')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    sql_ms, queries, slowest_ms, total_ms = _timing(response)
+    assert queries == len(statements) > 0
+    assert 0 < slowest_ms <= sql_ms <= total_ms
+
+def test_estatisticas_agregadas_por_endpoint(instrumented):
+    app, client = instrumented
+    for _ in range(3):
+        client.get('/dashboard')
+    client.get('/crm/customers')
+
+    data = client.get('/stats/sql').get_json()
+    endpoints = {item['endpoint']: item for item in data['endpoints']}
+    dashboard = endpoints['main.dashboard']
+    assert dashboard['requests'] == 3
+    assert dashboard['avg_queries'] >= 1
+    assert dashboard['max_queries'] >= dashboard['avg_queries']
+    assert dashboard['slowest'].startswith(('SELECT', 'INSERT', 'UPDATE'))
+    assert endpoints['crm.customers']['requests'] == 1
+
+    client.get('/stats/sql?reset=1')
+    data = client.get('/stats/sql').get_json()
+    assert [item['endpoint'] for item in data['endpoints']] == ['sql_stats']
+
+def test_estatisticas_exigem_administrador(instrumented):
+    app, client = instrumented
+    user = User.query.filter_by(username='admin').first()
+    user.role = 'user'
+    db.session.commit()
+    assert client.get('/stats/sql').status_code == 403
+
+def test_desligada_por_padrao(client):
+    response = client.get('/dashboard')
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert client.get('/stats/sql').status_code == 404
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Testes do tempo dos comandos SQL compartilhado (app/services/sql_timing.py)
+"""
+
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app.services.sql_timing import add_statement_observer, remove_statement_observer
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+
+    # Cada execução de "SELECT lento" leva ~20 ms dentro do cursor
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, record):
+        dbapi_connection.create_function('dormir', 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+    yield engine
+    engine.dispose()
+
+def test_um_par_de_eventos_para_todos_os_observadores(engine):
+    first, second = [], []
+    observe_first = lambda *args: first.append(args[2])
+    add_statement_observer(engine, observe_first)
+    add_statement_observer(engine, observe_first)
+    add_statement_observer(engine, lambda *args: second.append(args[-1]))
+    assert len(engine.dispatch.before_cursor_execute) == 1
+
+    with engine.connect() as conn:
+        conn.execute(text('SELECT dormir(20)'))
+    assert first == ['SELECT dormir(20)']
+    assert second[0] >= 20
+
+    remove_statement_observer(engine, observe_first)
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    assert len(first) == 1 and len(second) == 2
+
+def test_comando_com_erro_nao_desencontra_as_medicoes(engine):
+    elapsed = []
+    add_statement_observer(engine, lambda *args: elapsed.append(args[-1]))
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM tabela_inexistente'))
+        assert conn.info['_sql_timing_started'] == []
+
+        # Sem o início do comando que falhou, a medição começa no próprio comando
+        time.sleep(0.05)
+        conn.execute(text('SELECT 1'))
+    assert len(elapsed) == 1 and elapsed[0] < 50
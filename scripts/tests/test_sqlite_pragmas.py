@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Testes dos PRAGMAs de conexão do SQLite (perfil de produção)
+"""
+
+from sqlalchemy import create_engine
+
+from config import ProductionConfig
+from app.services.sqlite_pragmas import apply_sqlite_pragmas, read_sqlite_pragmas
+
+def test_pragmas_de_producao_em_cada_conexao(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'erp.db'}")
+    assert apply_sqlite_pragmas(engine, ProductionConfig.SQLITE_PRAGMAS)
+
+    with engine.connect() as connection:
+        values = read_sqlite_pragmas(connection, ProductionConfig.SQLITE_PRAGMAS)
+
+    assert values['journal_mode'] == 'wal'
+    assert values['synchronous'] == 1  # NORMAL
+    assert values['busy_timeout'] == ProductionConfig.SQLITE_PRAGMAS['busy_timeout']
+    assert values['cache_size'] == ProductionConfig.SQLITE_PRAGMAS['cache_size']
+    assert values['temp_store'] == 2  # MEMORY
+    engine.dispose()
+
+def test_banco_em_memoria_e_sem_pragmas_sao_ignorados(tmp_path):
+    assert not apply_sqlite_pragmas(create_engine('sqlite:///:memory:'), ProductionConfig.SQLITE_PRAGMAS)
+    assert not apply_sqlite_pragmas(create_engine(f"sqlite:///{tmp_path / 'erp.db'}"), None)
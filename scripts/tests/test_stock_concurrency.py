@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse da movimentação atômica de estoque: várias threads,
+cada uma com sua conexão, disputando o mesmo produto em um banco em arquivo
+"""
+
+import threading
+from datetime import date
+
+import pytest
+
+import config as config_module
+from app import create_app, db
+from app.models.inventory import Product
+from app.models.rollup import DailyKPI
+from app.services.stock import move_stock, StockError, stock_totals
+
+THREADS = 16
+ATTEMPTS = 25
+
+class StressConfig(config_module.TestingConfig):
+    SQLITE_PRAGMAS = config_module.ProductionConfig.SQLITE_PRAGMAS
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    StressConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'stress.db'}"
+    monkeypatch.setitem(config_module.config, 'stress', StressConfig)
+    app = create_app('stress')
+    with app.app_context():
+        db.create_all()
+        product = Product(name='Caneta', current_stock=100, cost_price=2)
+        db.session.add(product)
+        db.session.commit()
+        app.product_id = product.id
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+def _run_threads(app, movement_type, quantity):
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def worker():
+        with app.app_context():
+            start.wait()
+            for _ in range(ATTEMPTS):
+                try:
+                    stocks = move_stock(app.product_id, movement_type, quantity)
+                    db.session.commit()
+                except StockError:
+                    db.session.rollback()
+                    continue
+                with lock:
+                    results.append(stocks)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_saidas_concorrentes_nao_vendem_alem_do_estoque(file_app):
+    # 400 tentativas de saída para 100 unidades
+    results = _run_threads(file_app, 'saida', 1)
+
+    assert len(results) == 100
+    # Cada saída viu um saldo diferente: nenhuma atualização perdida
+    assert sorted(previous for previous, _ in results) == list(range(1, 101))
+    assert all(new == previous - 1 for previous, new in results)
+
+    with file_app.app_context():
+        assert db.session.get(Product, file_app.product_id).current_stock == 0
+        # A variação de valor do estoque entrou nos agregados diários
+        kpi = db.session.get(DailyKPI, date.today())
+        assert kpi.stock_value_change == 0  # +200 na criação, -200 nas saídas
+        assert stock_totals()['total_quantity'] == 0
+
+        with pytest.raises(StockError, match='insuficiente'):
+            move_stock(file_app.product_id, 'saida', 1)
+
+def test_entradas_concorrentes_sem_perda(file_app):
+    results = _run_threads(file_app, 'entrada', 2)
+
+    assert len(results) == THREADS * ATTEMPTS
+    with file_app.app_context():
+        expected = 100 + 2 * THREADS * ATTEMPTS
+        assert db.session.get(Product, file_app.product_id).current_stock == expected
+        assert sorted(new for _, new in results) == list(range(102, expected + 1, 2))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Testes do serviço de totais do estoque
+"""
+
+from sqlalchemy import event
+
+from app import db
+from app.models.inventory import Category, Product
+from app.services.stock import stock_totals, invalidate_stock_totals
+
+def _count_statements():
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_totais_em_consulta_unica_com_cache_e_invalidacao(app):
+    invalidate_stock_totals()
+    product = Product(name='Caneta', current_stock=10, cost_price=2, sale_price=5)
+    db.session.add_all([product, Product(name='Lápis', current_stock=4, cost_price=1, sale_price=3)])
+    db.session.commit()
+
+    statements = _count_statements()
+    totals = stock_totals()
+    assert len(statements) == 1
+    assert totals['total_quantity'] == 14
+    assert totals['total_value'] == 24
+    assert totals['total_potential_sales_value'] == 62
+
+    # Segunda leitura vem do cache
+    assert stock_totals() == totals
+    assert len(statements) == 1
+
+    # Alterar o estoque invalida o cache no commit
+    product.current_stock = 20
+    db.session.commit()
+    assert stock_totals()['total_quantity'] == 24
+
+    # Alterar só a descrição não invalida
+    product.description = 'Azul'
+    db.session.commit()
+    before = len(statements)
+    stock_totals()
+    assert len(statements) == before
+
+def test_stock_summary_e_dashboard_usam_o_servico(client):
+    invalidate_stock_totals()
+    db.session.add(Product(name='Caderno', current_stock=3, cost_price=10, sale_price=15))
+    db.session.commit()
+
+    data = client.get('/inventory/stock-summary').get_json()
+    assert data['total_quantity'] == 3
+    assert data['total_value'] == 30
+    assert data['total_potential_sales_value'] == 45
+
+    html = client.get('/dashboard').get_data(as_text=True)
+    assert 'R$ 30.00' in html
+    assert 'R$ 45.00' in html
+
+def test_relatorio_do_estoque(client):
+    invalidate_stock_totals()
+    category = Category(name='Papelaria')
+    db.session.add(category)
+    db.session.flush()
+    db.session.add_all([
+        Product(name='Caneta', category_id=category.id, current_stock=1, min_stock=5, max_stock=50, cost_price=2),
+        Product(name='Lápis', category_id=category.id, current_stock=10, min_stock=5, max_stock=50, cost_price=1),
+        Product(name='Borracha', current_stock=80, min_stock=5, max_stock=50, cost_price=1),
+    ])
+    db.session.commit()
+
+    response = client.get('/inventory/reports')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    # Dados dos gráficos no formato {labels, values} lido pelo script da página
+    assert 'const categoryData = {"labels": ["Papelaria"], "values": [2]};' in html
+    assert 'const stockStatusData = {"labels": ["Normal", "Baixo", "Alto"], "values": [1, 1, 1]};' in html
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Testes do gerador de dados sintéticos (tools/benchmarks/synthetic_data.py)
+"""
+
+import hashlib
+import importlib.util
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+TOOL = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'benchmarks', 'synthetic_data.py')
+
+SMALL = {'customers': 60, 'products': 40, 'categories': 5, 'sales': 400, 'events': 30,
+         'appointments': 40, 'days': 90, 'users': 3}
+END = date(2024, 12, 31)
+
+@pytest.fixture(scope='module')
+def synthetic():
+    spec = importlib.util.spec_from_file_location('synthetic_data', TOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _generate(synthetic, path, seed=42, **overrides):
+    profile = dict(SMALL, **overrides)
+    return synthetic.generate_database(f'sqlite:///{path}', seed=seed, end=END, **profile)
+
+def _fingerprint(path):
+    conn = sqlite3.connect(path)
+    digest = hashlib.sha256()
+    for table in ('customer', 'product', 'sale', 'sale_item', 'stock_movement', 'transaction',
+                  'invoice', 'event', 'appointment'):
+        for row in conn.execute(f'SELECT * FROM "{table}" ORDER BY id'):
+            digest.update(repr(row).encode())
+    conn.close()
+    return digest.hexdigest()
+
+def test_mesma_semente_gera_os_mesmos_dados(synthetic, tmp_path):
+    first, second, other = (str(tmp_path / name) for name in ('a.db', 'b.db', 'c.db'))
+    counts = _generate(synthetic, first)
+    assert _generate(synthetic, second) == counts
+    _generate(synthetic, other, seed=7)
+
+    assert _fingerprint(first) == _fingerprint(second)
+    assert _fingerprint(first) != _fingerprint(other)
+    assert counts['customer'] == 60 and counts['product'] == 40 and counts['sale'] == 400
+
+def test_dados_coerentes(synthetic, tmp_path):
+    path = str(tmp_path / 'synthetic.db')
+    _generate(synthetic, path)
+    conn = sqlite3.connect(path)
+
+    # Vendas no período e clientes já cadastrados na data da venda
+    first_sale, last_sale = conn.execute('SELECT min(date(sale_date)), max(date(sale_date)) FROM sale').fetchone()
+    assert first_sale >= '2024-10-03' and last_sale <= '2024-12-31'
+    assert conn.execute('SELECT count(*) FROM sale JOIN customer ON customer.id = sale.customer_id '
+                        'WHERE customer.created_at > sale.sale_date').fetchone()[0] == 0
+
+    # Total da venda = itens - desconto
+    assert conn.execute('''
+        SELECT count(*) FROM sale
+        WHERE abs(sale.total_amount + sale.discount -
+                  (SELECT sum(total_price) FROM sale_item WHERE sale_item.sale_id = sale.id)) > 0.05
+    ''').fetchone()[0] == 0
+
+    # Estoque nunca negativo e igual ao saldo da última movimentação
+    assert conn.execute('SELECT count(*) FROM stock_movement WHERE new_stock < 0').fetchone()[0] == 0
+    assert conn.execute('''
+        SELECT count(*) FROM product
+        WHERE current_stock != coalesce((SELECT new_stock FROM stock_movement
+                                         WHERE product_id = product.id ORDER BY id DESC LIMIT 1), 0)
+    ''').fetchone()[0] == 0
+
+    # Gasto concentrado: os 20% maiores clientes respondem pela maior parte das vendas
+    totals = [row[0] for row in conn.execute(
+        'SELECT sum(total_amount) FROM sale GROUP BY customer_id ORDER BY 1 DESC')]
+    top = totals[:max(1, len(totals) // 5)]
+    assert sum(top) > 0.5 * sum(totals)
+
+    # Agregados do dashboard recalculados
+    assert conn.execute('SELECT sum(sales_count) FROM daily_kpi').fetchone()[0] == 400
+    # Índices recriados
+    names = {row[1] for row in conn.execute("PRAGMA index_list('sale')")}
+    assert 'ix_sale_sale_date' in names
+    conn.close()
+
+def test_recusa_banco_com_dados(synthetic, tmp_path):
+    path = str(tmp_path / 'synthetic.db')
+    _generate(synthetic, path)
+    with pytest.raises(RuntimeError, match='--reset'):
+        _generate(synthetic, path)
+    assert _generate(synthetic, path, reset=True)['sale'] == 400
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Testes do typeahead de produtos (app/services/typeahead.py): índice de
+trigramas, atualização incremental e o endpoint usado pela tela de venda
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.inventory import Product
+from app.services.typeahead import ProductTypeahead, normalize_key, trigrams
+
+ROWS = [
+    {'id': 1, 'sku': 'CAF-0001', 'barcode': '7891234000011', 'name': 'Café Pilão 500g'},
+    {'id': 2, 'sku': 'CAF-0002', 'barcode': '7891234000028', 'name': 'Café Melitta 250g'},
+    {'id': 3, 'sku': 'ACU-0003', 'barcode': '7896543210987', 'name': 'Açúcar Refinado 1kg'},
+    {'id': 4, 'sku': 'FIL-0004', 'barcode': None, 'name': 'Filtro de Papel 103'},
+]
+
+@pytest.fixture
+def index():
+    index = ProductTypeahead()
+    index.load(ROWS)
+    return index
+
+def _ids(matches):
+    return [product_id for product_id, _, _ in matches]
+
+def test_normalizacao_e_trigramas():
+    assert normalize_key('SKU-0001 Café') == 'sku0001cafe'
+    assert normalize_key('Açúcar') == 'acucar'
+    assert normalize_key(None) == ''
+    assert trigrams('abcd') == {'^ab', 'abc', 'bcd', 'cd$'}
+    assert trigrams('abcd', complete=False) == {'^ab', 'abc', 'bcd'}
+
+def test_exato_comeco_e_final(index):
+    assert index.search('7891234000011') == [(1, 'barcode', 3.0)]
+    assert index.search('caf 0002')[0] == (2, 'sku', 3.0)
+    # Começo do SKU: os dois cafés, o de chave mais curta/menor id primeiro
+    assert _ids(index.search('caf-')) == [1, 2]
+    # Final do código de barras (dígitos impressos embaixo do código)
+    assert index.search('210987') == [(3, 'barcode', 1.5)]
+    assert index.search('acucar') == [(3, 'name', 2.0)]
+    assert index.search('  ') == []
+
+def test_erros_de_digitacao(index):
+    # Dígitos trocados e um dígito a menos no código de barras
+    assert _ids(index.search('7896543201987'))[0] == 3
+    assert _ids(index.search('789654321987'))[0] == 3
+    # SKU com um dígito a mais
+    assert _ids(index.search('FIL-00044'))[0] == 4
+    # Nome com erro
+    assert 4 in _ids(index.search('filtro papl'))
+    assert index.search('xyzxyz') == []
+    assert len(index.search('caf', limit=1)) == 1
+
+def test_atualizacao_incremental(index):
+    index.upsert(3, {'sku': 'ADO-0003', 'barcode': '7896543210987', 'name': 'Adoçante Líquido'})
+    assert index.search('acucar') == []
+    assert _ids(index.search('adocante')) == [3]
+
+    index.upsert(2, {'sku': 'CAF-0002', 'name': 'Café Melitta 250g', 'is_active': False})
+    assert _ids(index.search('caf-')) == [1]
+    index.remove(1)
+    assert index.search('CAF-0001') == []
+    assert len(index) == 2
+
+def test_compactacao_das_entradas_removidas():
+    index = ProductTypeahead()
+    index.load({'id': product_id, 'sku': f'SKU-{product_id:05d}'} for product_id in range(1, 3001))
+    for product_id in range(1, 2001):
+        index.remove(product_id)
+    # As listas de ocorrências são refeitas sem as entradas mortas
+    assert index.dead < 1000
+    assert len(index.entries) < 3000
+    assert index.search('SKU-02500') == [(2500, 'sku', 3.0)]
+    assert index.search('SKU-00010') == []
+
+@pytest.fixture
+def products(app):
+    db.session.add_all([
+        Product(id=row['id'], name=row['name'], sku=row['sku'], barcode=row['barcode'],
+                sale_price=10 + row['id'], current_stock=row['id'] * 5)
+        for row in ROWS
+    ])
+    db.session.commit()
+
+def test_endpoint(app, client, products):
+    data = client.get('/inventory/api/products/typeahead?q=7891234000011').get_json()
+    assert data['query'] == '7891234000011'
+    assert data['items'] == [{
+        'id': 1, 'name': 'Café Pilão 500g', 'sku': 'CAF-0001', 'barcode': '7891234000011',
+        'sale_price': 11.0, 'current_stock': 5, 'unit': 'un', 'match': 'barcode', 'score': 3.0,
+    }]
+    items = client.get('/inventory/api/products/typeahead?q=cafe&limit=1').get_json()['items']
+    assert len(items) == 1
+    assert client.get('/inventory/api/products/typeahead').get_json()['items'] == []
+
+def test_endpoint_acompanha_as_gravacoes(app, client, products):
+    url = '/inventory/api/products/typeahead?q='
+    assert [item['id'] for item in client.get(url + 'FIL-0004').get_json()['items']] == [4]
+
+    # Commit pelo ORM antecipa a releitura dos alterados
+    product = db.session.get(Product, 4)
+    product.name = 'Coador de Pano'
+    product.sale_price = 20
+    db.session.commit()
+    items = client.get(url + 'coador').get_json()['items']
+    assert [(item['id'], item['sale_price']) for item in items] == [(4, 20.0)]
+
+    product.is_active = False
+    db.session.commit()
+    assert client.get(url + 'coador').get_json()['items'] == []
+
+    # Inserção fora do ORM aparece na próxima verificação
+    later = datetime.utcnow() + timedelta(minutes=1)
+    db.session.execute(text("INSERT INTO product (name, sku, is_active, updated_at) "
+                            "VALUES ('Garrafa Térmica', 'GAR-0005', 1, :later)"), {'later': later})
+    db.session.commit()
+    app.extensions['product_typeahead'].checked = 0.0
+    assert [item['name'] for item in client.get(url + 'garrafa').get_json()['items']] == ['Garrafa Térmica']
+
+    # Removido por fora: o índice é recarregado quando a contagem diminui
+    db.session.execute(text('DELETE FROM product WHERE id = 1'))
+    db.session.commit()
+    app.extensions['product_typeahead'].checked = 0.0
+    assert [item['id'] for item in client.get(url + 'caf-').get_json()['items']] == [2]
+
+def test_nova_venda_sem_o_catalogo(app, client, products):
+    response = client.get('/crm/sales/new')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'Café Pilão' not in html
+    assert '/inventory/api/products/typeahead' in html
+    # O script da página (bloco scripts do base.html) é renderizado
+    assert 'function fetchProducts' in html
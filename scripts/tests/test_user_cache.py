@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Testes do cache do usuário autenticado (load_user)
+"""
+
+from flask import g
+from sqlalchemy import event
+
+from app import db
+from app.models.user import User, load_user
+from app.services.user_cache import invalidate_user
+
+def _fresh_request():
+    """Simula o início de uma nova requisição (sessão vazia, usuário não carregado)"""
+    db.session.expunge_all()
+    g.pop('_login_user', None)
+
+def _count_statements():
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_load_user_sem_select_apos_primeira_carga(app, admin):
+    invalidate_user()
+    user_id = admin.id
+    _fresh_request()
+
+    statements = _count_statements()
+    assert load_user(str(user_id)).username == 'admin'
+    assert len(statements) == 1
+
+    _fresh_request()
+    user = load_user(str(user_id))
+    assert user.username == 'admin'
+    assert user.check_password('admin123')
+    assert len(statements) == 1
+    assert load_user('999') is None
+
+def test_perfil_e_senha_invalidam_o_cache(client, admin):
+    user_id = admin.id
+
+    _fresh_request()
+    response = client.post('/profile', data={
+        'first_name': 'Ana', 'last_name': 'Souza', 'username': 'admin',
+        'email': 'ana@erp.com', 'role': 'admin', 'is_active': 'on'
+    })
+    assert response.status_code == 302
+
+    # A alteração feita na instância vinda do cache foi gravada
+    _fresh_request()
+    assert db.session.get(User, user_id).first_name == 'Ana'
+    _fresh_request()
+    assert load_user(str(user_id)).first_name == 'Ana'
+
+    _fresh_request()
+    client.post('/change_password', data={
+        'current_password': 'admin123', 'new_password': 'nova123', 'confirm_password': 'nova123'
+    })
+    _fresh_request()
+    assert load_user(str(user_id)).check_password('nova123')
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Teste de carga local, sem serviços externos.
+
+Cada usuário virtual é uma thread com sua própria sessão (cookie do
+auth.login) que repete jornadas sorteadas por peso:
+
+    produtos    listagem, busca, página 2 e detalhe de produto
+    movimento   formulário e POST de uma entrada de estoque, depois a listagem
+    venda       formulário e POST de uma venda
+    agenda      feeds do calendário (eventos e agendamentos)
+    dashboard   painel inicial
+
+A carga sobe em estágios (--users 1,5,10,20,40), cada um por --duration
+segundos (ou até cada usuário completar --journeys jornadas). Para cada estágio o relatório mostra vazão (req/s), p50/p95/p99 e
+taxa de erro, no total e por endpoint, e no final aponta o ponto de
+saturação: o primeiro estágio em que a vazão para de crescer enquanto o p95
+continua subindo. Erro é exceção de rede, status >= 400, ou POST que não
+redireciona (os formulários devolvem 200 quando a gravação falha, por
+exemplo com "database is locked").
+
+Com --spawn o gunicorn é iniciado com o wsgi.py (FLASK_ENV=production) sobre
+uma cópia do banco --database, ou, sem ela, sobre um banco sintético novo
+de --scale (synthetic_data.py); as jornadas gravam no banco. Sem --spawn,
+--url aponta para um servidor já em execução. Os usuários usam o login
+admin / admin123 do banco sintético (ou --username/--password).
+
+O gerador de carga roda em um único processo Python: acima de algumas
+centenas de req/s ele pode virar o gargalo (veja o uso de CPU dele).
+
+Uso:
+    python tools/benchmarks/load_test.py --spawn --workers 4 --users 1,5,10,20,40
+    python tools/benchmarks/load_test.py --spawn --database instance/synthetic.db --duration 30
+    python tools/benchmarks/load_test.py --url http://127.0.0.1:8000 --users 10 --json carga.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.abspath(os.path.join(BENCHMARKS_DIR, '..', '..'))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+GUNICORN_LOG = os.path.join(PROJECT_DIR, 'logs', 'load_test_gunicorn.log')
+
+SEARCH_TERMS = ['Kit', 'Pro', 'Premium', 'Caixa', 'Slim', 'Eco', 'SKU-00001']
+PAYMENT_METHODS = ['pix', 'cartao_credito', 'cartao_debito', 'dinheiro']
+
+# Vazão que não cresce pelo menos isso de um estágio para o outro = saturação
+SATURATION_GAIN = 0.10
+
+class Session:
+    """Conexão HTTP de um usuário virtual, com os cookies da sessão"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, method, path, form=None):
+        """Executa a requisição; devolve (status, location, ms). Exceções de rede sobem"""
+        headers = {'User-Agent': 'erp-load-test'}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+
+        # O cookie de produção é Secure; aqui ele é guardado mesmo em http
+        for header in response.headers.get_all('Set-Cookie') or ():
+            name, _, value = header.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value
+        return response.status, response.headers.get('Location'), elapsed
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+class Recorder:
+    """Latências e erros por endpoint, compartilhado entre as threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.journeys = {}
+
+    def add(self, endpoint, elapsed, ok):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def add_journey(self, name):
+        with self.lock:
+            self.journeys[name] = self.journeys.get(name, 0) + 1
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def _summary(samples, errors, duration):
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / duration, 1),
+        'p50_ms': round(_percentile(samples, 0.50), 1),
+        'p95_ms': round(_percentile(samples, 0.95), 1),
+        'p99_ms': round(_percentile(samples, 0.99), 1),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+class VirtualUser:
+    """Jornadas de um usuário; cada passo é registrado com o nome do endpoint"""
+
+    def __init__(self, session, recorder, context, rng):
+        self.session = session
+        self.recorder = recorder
+        self.context = context
+        self.rng = rng
+
+    def _call(self, endpoint, method, path, form=None):
+        started = time.perf_counter()
+        try:
+            status, location, elapsed = self.session.request(method, path, form)
+        except (OSError, http.client.HTTPException):
+            self.recorder.add(endpoint, (time.perf_counter() - started) * 1000, False)
+            return None
+        if method == 'POST':
+            ok = status == 302 and '/login' not in (location or '')
+        else:
+            ok = status == 200
+        self.recorder.add(endpoint, elapsed, ok)
+        return status
+
+    def login(self):
+        status, location, _ = self.session.request('POST', '/login', {
+            'username': self.context['username'], 'password': self.context['password'],
+        })
+        if status != 302 or '/login' in (location or ''):
+            raise RuntimeError(f'Login falhou para {self.context["username"]} (status {status})')
+
+    def products(self):
+        self._call('inventory.products', 'GET', '/inventory/products')
+        term = self.rng.choice(SEARCH_TERMS)
+        self._call('inventory.products?search', 'GET', f'/inventory/products?{urlencode({"search": term})}')
+        self._call('inventory.products?page', 'GET', '/inventory/products?page=2')
+        self._call('inventory.product_detail', 'GET',
+                   f'/inventory/products/{self.rng.randint(1, self.context["products"])}')
+
+    def movement(self):
+        self._call('inventory.new_movement', 'GET', '/inventory/movements/new')
+        # Opções do campo de produto, buscadas pela página
+        term = self.rng.choice(SEARCH_TERMS)
+        self._call('main.lookup', 'GET', f'/lookups/products?{urlencode({"q": term})}')
+        self._call('inventory.new_movement POST', 'POST', '/inventory/movements/new', {
+            'product_id': self.rng.randint(1, self.context['products']),
+            'movement_type': 'entrada',
+            'quantity': self.rng.randint(1, 20),
+            'unit_cost': round(self.rng.uniform(5, 200), 2),
+            'reference': 'carga',
+            'notes': '',
+        })
+        self._call('inventory.movements', 'GET', '/inventory/movements')
+
+    def sale(self):
+        self._call('crm.new_sale', 'GET', '/crm/sales/new')
+        self._call('main.lookup', 'GET', '/lookups/customers?active=1')
+        term = self.rng.choice(SEARCH_TERMS)
+        self._call('inventory.product_typeahead', 'GET',
+                   f'/inventory/api/products/typeahead?{urlencode({"q": term})}')
+        self._call('crm.new_sale POST', 'POST', '/crm/sales/new', {
+            'customer_id': self.rng.randint(1, self.context['customers']),
+            'total_amount': round(self.rng.uniform(20, 800), 2),
+            'discount': 0,
+            'tax': 0,
+            'payment_method': self.rng.choice(PAYMENT_METHODS),
+            'notes': 'carga',
+        })
+
+    def calendar(self):
+        start = self.context['today'] - timedelta(days=self.rng.randint(0, 60))
+        window = urlencode({'start': start.isoformat(), 'end': (start + timedelta(days=35)).isoformat()})
+        self._call('schedule.api_events', 'GET', f'/schedule/api/events?{window}')
+        self._call('schedule.api_appointments', 'GET', f'/schedule/api/appointments?{window}')
+
+    def dashboard(self):
+        self._call('main.dashboard', 'GET', '/dashboard')
+
+# Jornadas e pesos (proporção aproximada de uso real)
+JOURNEYS = [
+    ('produtos', 40, VirtualUser.products),
+    ('agenda', 20, VirtualUser.calendar),
+    ('movimento', 15, VirtualUser.movement),
+    ('venda', 15, VirtualUser.sale),
+    ('dashboard', 10, VirtualUser.dashboard),
+]
+
+def _user_loop(url, recorder, context, deadline, seed, think, ready, max_journeys=None):
+    rng = random.Random(seed)
+    session = Session(url)
+    user = VirtualUser(session, recorder, context, rng)
+    try:
+        user.login()
+    except Exception as e:
+        ready.append(e)
+        session.close()
+        return
+    weights = [weight for _, weight, _ in JOURNEYS]
+    done = 0
+    while time.monotonic() < deadline and (max_journeys is None or done < max_journeys):
+        name, _, journey = rng.choices(JOURNEYS, weights)[0]
+        journey(user)
+        recorder.add_journey(name)
+        done += 1
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+    session.close()
+
+def run_stage(url, users, duration, context, think=0.0, seed=0, max_journeys=None):
+    """
+    Um estágio de carga com `users` usuários simultâneos. Com `max_journeys`
+    cada usuário para após esse número de jornadas (sorteadas pela semente),
+    e o estágio não depende da velocidade da máquina se couber em `duration`.
+    """
+    recorder = Recorder()
+    failures = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_user_loop, daemon=True,
+                         args=(url, recorder, context, deadline, seed * 1000 + index, think, failures,
+                               max_journeys))
+        for index in range(users)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    if failures:
+        raise failures[0]
+
+    all_samples = [value for values in recorder.samples.values() for value in values]
+    return {
+        'users': users,
+        'duration_s': round(elapsed, 2),
+        'journeys': dict(sorted(recorder.journeys.items())),
+        'total': _summary(all_samples, sum(recorder.errors.values()), elapsed),
+        'endpoints': {
+            endpoint: _summary(samples, recorder.errors.get(endpoint, 0), elapsed)
+            for endpoint, samples in sorted(recorder.samples.items())
+        },
+    }
+
+def find_saturation(stages, gain=SATURATION_GAIN):
+    """Primeiro estágio cuja vazão cresce menos que `gain` com o p95 subindo"""
+    for previous, current in zip(stages, stages[1:]):
+        throughput = current['total']['rps'] / max(previous['total']['rps'], 0.001) - 1
+        if throughput < gain and current['total']['p95_ms'] > previous['total']['p95_ms']:
+            return current['users']
+    return None
+
+def discover_context(database):
+    """Quantidade de produtos e clientes do banco (ids 1..n nos dados sintéticos)"""
+    connection = sqlite3.connect(database)
+    try:
+        products = connection.execute('SELECT max(id) FROM product').fetchone()[0] or 1
+        customers = connection.execute('SELECT max(id) FROM customer').fetchone()[0] or 1
+    finally:
+        connection.close()
+    return {'products': products, 'customers': customers}
+
+def _wait_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn terminou com código {process.returncode}')
+        try:
+            status, _, _ = Session(url, timeout=2).request('GET', '/login')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError('gunicorn não respondeu a tempo')
+
+def spawn_gunicorn(database, workers, port, log):
+    """Inicia o gunicorn com o wsgi.py sobre o banco informado"""
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=f'sqlite:///{os.path.abspath(database)}')
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'wsgi:app']
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_ready(url, process)
+    except Exception:
+        stop_gunicorn(process)
+        raise
+    return process, url
+
+def stop_gunicorn(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _print_stage(stage):
+    total = stage['total']
+    print(f"\n👥 {stage['users']} usuários: {total['rps']} req/s, p50 {total['p50_ms']} ms, "
+          f"p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms, erros {total['error_rate']:.1%}")
+    print(f"   {'endpoint':<32} {'req':>7} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>7}")
+    for endpoint, stats in stage['endpoints'].items():
+        print(f"   {endpoint:<32} {stats['requests']:>7} {stats['rps']:>7} {stats['p50_ms']:>8} "
+              f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['error_rate']:>7.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local com jornadas de usuários')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='servidor já em execução')
+    parser.add_argument('--spawn', action='store_true', help='inicia o gunicorn com o wsgi.py')
+    parser.add_argument('--workers', type=int, default=4, help='workers do gunicorn (--spawn)')
+    parser.add_argument('--port', type=int, default=8765, help='porta do gunicorn (--spawn)')
+    parser.add_argument('--database', help='banco SQLite (copiado com --spawn; ids de produtos e clientes)')
+    parser.add_argument('--scale', type=float, default=0.5,
+                        help='escala do banco sintético gerado quando não há --database')
+    parser.add_argument('--users', default='1,5,10,20,40', help='usuários simultâneos por estágio')
+    parser.add_argument('--duration', type=float, default=20, help='segundos por estágio')
+    parser.add_argument('--journeys', type=int, help='jornadas por usuário (padrão: até o fim da duração)')
+    parser.add_argument('--think', type=float, default=0.0, help='pausa média entre jornadas (s)')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--seed', type=int, default=42, help='semente das jornadas')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    stages_users = [int(value) for value in args.users.split(',') if value.strip()]
+    workdir = tempfile.mkdtemp(prefix='erp-load-')
+    process = None
+    try:
+        database = args.database
+        if args.spawn:
+            copy = os.path.join(workdir, 'load.db')
+            if database:
+                shutil.copyfile(database, copy)
+            else:
+                from synthetic_data import generate_database
+                print(f"🏭 Gerando banco sintético (escala {args.scale:g})...")
+                generate_database(f'sqlite:///{copy}', scale=args.scale)
+            database = copy
+            os.makedirs(os.path.dirname(GUNICORN_LOG), exist_ok=True)
+            log = open(GUNICORN_LOG, 'w')
+            process, url = spawn_gunicorn(database, args.workers, args.port, log)
+            print(f"🚀 gunicorn com {args.workers} workers em {url} (log: {GUNICORN_LOG})")
+        else:
+            url = args.url
+
+        context = {'username': args.username, 'password': args.password, 'today': date.today(),
+                   'products': 100, 'customers': 100}
+        if database:
+            context.update(discover_context(database))
+
+        stages = []
+        for users in stages_users:
+            stage = run_stage(url, users, args.duration, context, args.think, args.seed, args.journeys)
+            stages.append(stage)
+            _print_stage(stage)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return False
+    finally:
+        if process is not None:
+            stop_gunicorn(process)
+            log.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    saturation = find_saturation(stages)
+    print("\n" + "=" * 78)
+    print(f"{'usuários':>9} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>8}")
+    for stage in stages:
+        total = stage['total']
+        print(f"{stage['users']:>9} {total['rps']:>9} {total['p50_ms']:>8} {total['p95_ms']:>8} "
+              f"{total['p99_ms']:>8} {total['error_rate']:>8.1%}")
+    if saturation:
+        print(f"📈 Saturação a partir de {saturation} usuários simultâneos")
+    else:
+        print("📈 Vazão ainda crescendo no último estágio; aumente --users para achar a saturação")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'url': url, 'workers': args.workers if args.spawn else None,
+                       'saturation_users': saturation, 'stages': stages}, output, indent=2)
+        print(f"\n✅ Resultado gravado em {args.json}")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Benchmark das rotas mais usadas, com limite de regressão.
+
+Para cada escala o banco é gerado com synthetic_data.py em um arquivo
+(instance/benchmarks/, reaproveitado nas execuções seguintes com a mesma
+escala, semente, data final e esquema) e a aplicação é criada com a configuração de
+testes apontando para ele. As rotas são chamadas pelo test client do Flask,
+já autenticado como admin: algumas chamadas de aquecimento (caches e
+páginas do SQLite) e depois N chamadas medidas.
+
+O resultado (JSON) traz p50/p95/máximo, consultas SQL e tamanho da resposta
+por rota e escala. Com uma baseline gravada (--save-baseline), o p95 de cada
+rota é comparado ao dela e a execução falha (código 1) quando piora mais que
+--threshold e mais que --min-delta-ms, ou quando alguma rota não responde 200.
+Os tempos dependem da máquina: compare apenas execuções no mesmo ambiente.
+
+Escalas (total aproximado de linhas):
+    10k, 100k, 1m
+
+Uso:
+    python tools/benchmarks/route_benchmark.py --save-baseline
+    python tools/benchmarks/route_benchmark.py
+    python tools/benchmarks/route_benchmark.py --scale 100k --iterations 50 --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', '..'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import config as config_module
+from app import create_app, db
+from app.services.search import SEARCH_INDEXES
+from synthetic_data import generate_database
+
+# Escala do gerador para cada volume (escala 1 ≈ 140 mil linhas)
+SCALES = {
+    '10k': 0.07,
+    '100k': 0.7,
+    '1m': 7.0,
+}
+
+# Rotas medidas; as datas vêm da data final dos dados
+ROUTES = [
+    ('main.dashboard', '/dashboard'),
+    ('inventory.products', '/inventory/products'),
+    ('inventory.products search', '/inventory/products?search=premium'),
+    ('finance.transactions', '/finance/transactions'),
+    ('finance.reports', '/finance/reports'),
+    ('crm.reports', '/crm/reports?start_date={month_start}&end_date={end}'),
+    ('schedule.api_events', '/schedule/api/events?start={month_start}&end={month_end}'),
+    ('schedule.api_appointments', '/schedule/api/appointments?start={month_start}&end={month_end}'),
+    ('crm.api_get_customers', '/crm/api/customers'),
+    ('main.search', '/search?q=silva'),
+]
+
+OUTPUT_DIR = os.path.join(config_module.basedir, 'instance', 'benchmarks')
+DEFAULT_OUTPUT = os.path.join(OUTPUT_DIR, 'routes-latest.json')
+DEFAULT_BASELINE = os.path.join(OUTPUT_DIR, 'routes-baseline.json')
+
+_QUERIES = re.compile(r'desc="(\d+) queries')
+
+def _benchmark_app(database):
+    class BenchmarkConfig(config_module.TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database
+        SQL_WORKLOAD_FILE = None
+        SLOW_QUERY_MS = None
+        METRICS_ENABLED = False
+        # Só para contar as consultas de cada rota (cabeçalho Server-Timing)
+        SQL_INSTRUMENTATION = True
+
+    config_module.config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+def schema_fingerprint():
+    """Hash do DDL dos modelos e dos índices FTS5: muda quando o esquema muda"""
+    dialect = sqlite.dialect()
+    statements = []
+    for table in db.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements += sorted(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    for index in SEARCH_INDEXES.values():
+        statements += index.create_statements()
+    return hashlib.sha1('\n'.join(statements).encode()).hexdigest()[:10]
+
+def database_path(scale, seed, end):
+    # Banco gerado com um esquema antigo não é reaproveitado
+    return os.path.join(OUTPUT_DIR, f'routes-{scale}-s{seed}-{end.isoformat()}-{schema_fingerprint()}.db')
+
+def count_rows(path):
+    connection = sqlite3.connect(path)
+    try:
+        tables = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return sum(connection.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0] for table in tables)
+    finally:
+        connection.close()
+
+def prepare_database(path, scale, seed, end, rebuild=False, **overrides):
+    """Gera o banco da escala (em um arquivo temporário) se ainda não existir"""
+    if os.path.exists(path) and not rebuild:
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.partial'
+    for leftover in (partial, f'{partial}-journal'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    generate_database(f'sqlite:///{partial}', scale=scale, seed=seed, end=end, **overrides)
+    os.replace(partial, path)
+    return True
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(samples):
+    return {
+        'samples': len(samples),
+        'p50_ms': round(_percentile(samples, 0.50), 2),
+        'p95_ms': round(_percentile(samples, 0.95), 2),
+        'max_ms': round(max(samples), 2) if samples else 0.0,
+        'mean_ms': round(sum(samples) / len(samples), 2) if samples else 0.0,
+    }
+
+def benchmark_routes(database, end, iterations=30, warmup=3, routes=ROUTES):
+    """Mede as rotas no banco informado; devolve {endpoint: estatísticas}"""
+    month_start = end - timedelta(days=30)
+    dates = {'month_start': month_start.isoformat(), 'end': end.isoformat(),
+             'month_end': (end + timedelta(days=1)).isoformat()}
+
+    app = _benchmark_app(database)
+    client = app.test_client()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    if response.status_code != 302:
+        raise RuntimeError('Login do admin falhou no banco de benchmark')
+
+    results = {}
+    for endpoint, template in routes:
+        path = template.format(**dates)
+        samples = []
+        try:
+            # Os prints de depuração das rotas não entram no relatório
+            with contextlib.redirect_stdout(io.StringIO()):
+                for index in range(warmup + iterations):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if response.status_code != 200:
+                        break
+                    if index >= warmup:
+                        samples.append(elapsed)
+        except Exception as e:
+            # TESTING propaga as exceções da rota: conta como erro 500
+            results[endpoint] = dict(summarize([]), path=path, status=500, queries=None, bytes=0,
+                                     error=f'{type(e).__name__}: {e}')
+            continue
+
+        match = _QUERIES.search(response.headers.get('Server-Timing', ''))
+        results[endpoint] = dict(summarize(samples), path=path, status=response.status_code,
+                                 queries=int(match.group(1)) if match else None,
+                                 bytes=len(response.get_data()))
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return results
+
+def compare(current, baseline, threshold=0.2, min_delta_ms=5.0):
+    """
+    Compara o p95 de cada rota com a baseline. Devolve (linhas, falhas):
+    falha é rota sem status 200 ou com p95 acima de baseline * (1 + threshold)
+    e pelo menos min_delta_ms mais lenta.
+    """
+    rows, failures = [], []
+    for scale, result in current['scales'].items():
+        reference = (baseline or {}).get('scales', {}).get(scale, {}).get('routes', {})
+        for endpoint, stats in result['routes'].items():
+            before = reference.get(endpoint, {}).get('p95_ms')
+            row = {'scale': scale, 'endpoint': endpoint, 'status': stats['status'],
+                   'p95_ms': stats['p95_ms'], 'baseline_p95_ms': before, 'change': None}
+            if stats['status'] != 200:
+                row['failure'] = f'status {stats["status"]}'
+            elif before:
+                row['change'] = round(stats['p95_ms'] / before - 1, 4)
+                if stats['p95_ms'] > before * (1 + threshold) and stats['p95_ms'] - before >= min_delta_ms:
+                    row['failure'] = f'p95 {row["change"]:+.0%}'
+            rows.append(row)
+            if 'failure' in row:
+                failures.append(row)
+    return rows, failures
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=config_module.basedir,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(scales, seed=42, end=None, iterations=30, warmup=3, rebuild=False, progress=print):
+    end = end or date.today()
+    result = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'seed': seed,
+            'end': end.isoformat(),
+            'iterations': iterations,
+            'warmup': warmup,
+        },
+        'scales': {},
+    }
+    for scale in scales:
+        path = database_path(scale, seed, end)
+        started = time.perf_counter()
+        if prepare_database(path, SCALES[scale], seed, end, rebuild):
+            progress(f"🏭 {scale}: banco gerado em {time.perf_counter() - started:.1f}s")
+        result['scales'][scale] = {
+            'rows': count_rows(path),
+            'database': os.path.relpath(path, config_module.basedir),
+            'routes': benchmark_routes(f'sqlite:///{path}', end, iterations, warmup),
+        }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas com limite de regressão do p95')
+    parser.add_argument('--scale', choices=list(SCALES), action='append',
+                        help='escala a executar (padrão: todas)')
+    parser.add_argument('--seed', type=int, default=42, help='semente dos dados sintéticos')
+    parser.add_argument('--end', type=date.fromisoformat, help='data final dos dados (padrão: hoje)')
+    parser.add_argument('--iterations', type=int, default=30, help='chamadas medidas por rota')
+    parser.add_argument('--warmup', type=int, default=3, help='chamadas descartadas por rota')
+    parser.add_argument('--rebuild', action='store_true', help='gera os bancos novamente')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='arquivo JSON do resultado')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON de referência')
+    parser.add_argument('--save-baseline', action='store_true', help='grava o resultado como nova baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='piora máxima do p95 (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='piora mínima em ms para contar como regressão')
+    args = parser.parse_args()
+
+    scales = args.scale or list(SCALES)
+    print(f"🏁 Rotas: {len(ROUTES)}, escalas: {', '.join(scales)}, "
+          f"{args.iterations} chamadas (+{args.warmup} de aquecimento)")
+    result = run(scales, args.seed, args.end, args.iterations, args.warmup, args.rebuild)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as output:
+        json.dump(result, output, indent=2)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+    rows, failures = compare(result, baseline, args.threshold, args.min_delta_ms)
+
+    print("=" * 86)
+    print(f"{'escala':<6} {'rota':<28} {'linhas':>9} {'consultas':>9} {'p50':>9} {'p95':>9} "
+          f"{'baseline':>9} {'variação':>9}")
+    for row in rows:
+        scale = result['scales'][row['scale']]
+        stats = scale['routes'][row['endpoint']]
+        before = f"{row['baseline_p95_ms']:.1f}" if row['baseline_p95_ms'] else '-'
+        change = f"{row['change']:+.0%}" if row['change'] is not None else '-'
+        flag = f"  ❌ {row['failure']}" if 'failure' in row else ''
+        print(f"{row['scale']:<6} {row['endpoint']:<28} {scale['rows']:>9} {stats['queries'] or '-':>9} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {before:>9} {change:>9}{flag}")
+
+    print(f"\n✅ Resultado gravado em {args.output}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as output:
+            json.dump(result, output, indent=2)
+        print(f"📌 Baseline gravada em {args.baseline}")
+    elif baseline is None:
+        print(f"ℹ️  Sem baseline em {args.baseline}; use --save-baseline para criar uma")
+
+    if failures:
+        print(f"❌ {len(failures)} regressão(ões) acima do limite")
+        return False
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
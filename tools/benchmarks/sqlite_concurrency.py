@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark de leitura/escrita concorrente no SQLite.
+
+Simula vários workers do gunicorn (um processo por worker) usando o mesmo
+arquivo de banco: escritores atualizam o estoque de um produto e registram a
+movimentação; leitores calculam o valor do estoque e listam as movimentações
+recentes. Cada perfil é executado em um banco novo e o resultado mostra
+operações por segundo, latência p95 e erros "database is locked".
+
+Perfis:
+    padrao   - conexões sem PRAGMAs (comportamento anterior)
+    producao - ProductionConfig.SQLITE_PRAGMAS (WAL, busy_timeout, mmap...)
+
+Uso:
+    python tools/benchmarks/sqlite_concurrency.py
+    python tools/benchmarks/sqlite_concurrency.py --writers 4 --readers 8 --duration 10
+    python tools/benchmarks/sqlite_concurrency.py --json resultado.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from config import ProductionConfig
+from app import db
+from app.services.sqlite_pragmas import apply_sqlite_pragmas
+import app.models  # noqa: F401  (registra as tabelas no metadata)
+
+PROFILES = {
+    'padrao': None,
+    'producao': ProductionConfig.SQLITE_PRAGMAS,
+}
+
+PRODUCTS = 200
+
+WRITE_STATEMENTS = (
+    text('UPDATE product SET current_stock = current_stock + :quantity WHERE id = :product_id'),
+    text('INSERT INTO stock_movement (product_id, movement_type, quantity, previous_stock, '
+         'new_stock, user_id, movement_date) VALUES (:product_id, \'entrada\', :quantity, 0, 0, 1, :now)'),
+)
+
+READ_STATEMENTS = (
+    text('SELECT SUM(current_stock * cost_price) FROM product WHERE is_active = 1'),
+    text('SELECT id, product_id, quantity FROM stock_movement ORDER BY movement_date DESC LIMIT 20'),
+)
+
+def _engine(path, pragmas):
+    engine = create_engine(f'sqlite:///{path}')
+    apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+def _prepare(path, pragmas):
+    engine = _engine(path, pragmas)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            text('INSERT INTO product (name, current_stock, cost_price, sale_price, is_active) '
+                 'VALUES (:name, 100, 10, 15, 1)'),
+            [{'name': f'Produto {index}'} for index in range(PRODUCTS)]
+        )
+    engine.dispose()
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def _worker(role, path, pragmas, duration, queue):
+    engine = _engine(path, pragmas)
+    rng = random.Random(os.getpid())
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'writer':
+                params = {'product_id': rng.randint(1, PRODUCTS), 'quantity': rng.randint(1, 5),
+                          'now': datetime.now()}
+                with engine.begin() as connection:
+                    for statement in WRITE_STATEMENTS:
+                        connection.execute(statement, params)
+            else:
+                with engine.connect() as connection:
+                    for statement in READ_STATEMENTS:
+                        connection.execute(statement).fetchall()
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+    engine.dispose()
+    queue.put((role, latencies, errors))
+
+def run_profile(name, pragmas, writers, readers, duration):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        _prepare(path, pragmas)
+
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_worker, args=(role, path, pragmas, duration, queue))
+            for role in ['writer'] * writers + ['reader'] * readers
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    summary = {'profile': name}
+    for role in ('writer', 'reader'):
+        latencies = [value for r, values, _ in results if r == role for value in values]
+        summary[role] = {
+            'ops': len(latencies),
+            'ops_per_sec': round(len(latencies) / duration, 1),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            'locked_errors': sum(errors for r, _, errors in results if r == role),
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de concorrência do SQLite')
+    parser.add_argument('--writers', type=int, default=4, help='processos escritores')
+    parser.add_argument('--readers', type=int, default=4, help='processos leitores')
+    parser.add_argument('--duration', type=float, default=5, help='segundos por perfil')
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                        help='perfil a executar (padrão: todos)')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    print(f"🏁 {args.writers} escritores, {args.readers} leitores, {args.duration:g}s por perfil")
+    print("=" * 78)
+    print(f"{'perfil':<10} {'escritas/s':>11} {'p95 esc.':>9} {'locks':>6} "
+          f"{'leituras/s':>11} {'p95 leit.':>10} {'locks':>6}")
+
+    results = []
+    for name in args.profile or PROFILES:
+        summary = run_profile(name, PROFILES[name], args.writers, args.readers, args.duration)
+        results.append(summary)
+        writer, reader = summary['writer'], summary['reader']
+        print(f"{name:<10} {writer['ops_per_sec']:>11} {writer['p95_ms']:>7}ms {writer['locked_errors']:>6} "
+              f"{reader['ops_per_sec']:>11} {reader['p95_ms']:>8}ms {reader['locked_errors']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"\n✅ Resultado gravado em {args.json}")
+
+if __name__ == '__main__':
+    main()
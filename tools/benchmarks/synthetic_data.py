@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+Gerador de dados sintéticos em escala de produção.
+
+Cria um banco novo (por padrão instance/synthetic.db, nunca o banco da
+aplicação) com usuários, contas, categorias, produtos, clientes, vendas com
+itens, movimentações de estoque, transações, faturas, eventos e
+agendamentos. As distribuições imitam um varejo real:
+
+    - gasto concentrado: o peso de compra de cada cliente segue uma Pareto
+      (poucos clientes respondem pela maior parte das vendas);
+    - cauda longa de SKUs: a popularidade dos produtos segue uma Zipf;
+    - sazonalidade: vendas por dia variam com o dia da semana, o mês
+      (pico em novembro/dezembro) e uma tendência de crescimento;
+    - estoque coerente: cada item vendido gera uma saída, e produtos abaixo
+      do mínimo são repostos (entrada + despesa de compra).
+
+A geração é determinística: a mesma semente, escala e data final produzem
+exatamente os mesmos dados (sem --end, a data final é hoje). As linhas são
+gravadas com inserts do Core em executemany, em lotes, com os índices
+secundários removidos durante a carga e recriados no final; em seguida os
+agregados diários do dashboard são recalculados (rebuild_rollups).
+
+Escala 1 gera cerca de 140 mil linhas; --scale 25 passa de 3,5 milhões.
+
+Uso:
+    python tools/benchmarks/synthetic_data.py
+    python tools/benchmarks/synthetic_data.py --scale 20 --seed 7 --reset
+    python tools/benchmarks/synthetic_data.py --database sqlite:////tmp/erp.db --customers 50000
+    DATABASE_URL=sqlite:///instance/synthetic.db python app.py
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from sqlalchemy import bindparam, func, select
+
+import config as config_module
+from app import create_app, db
+from app.models.crm import Customer, Sale, SaleItem
+from app.models.finance import Account, Invoice, Transaction
+from app.models.inventory import Category, Product, StockMovement
+from app.models.schedule import Appointment, Event
+from app.models.user import User
+from app.services.rollup import rebuild_rollups
+
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(config_module.basedir, 'instance', 'synthetic.db')
+
+# Volumes com --scale 1 (usuários, contas e dias não escalam)
+BASE_PROFILE = {
+    'users': 6,
+    'categories': 20,
+    'products': 1000,
+    'customers': 2000,
+    'sales': 20000,
+    'events': 3000,
+    'appointments': 4000,
+    'days': 730,
+}
+
+# Linhas acumuladas antes de cada executemany
+BATCH_SIZE = 20000
+
+# Agenda (eventos e agendamentos) continua depois da data final
+FUTURE_DAYS = 30
+
+ZIPF_EXPONENT = 1.1
+PARETO_ALPHA = 1.2
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+               'João', 'Juliana', 'Lucas', 'Mariana', 'Mateus', 'Natália', 'Pedro', 'Rafaela', 'Rodrigo',
+               'Sofia', 'Thiago', 'Vanessa', 'Vinícius', 'Larissa', 'Gustavo', 'Camila', 'André']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Araújo', 'Barbosa']
+CITIES = [('São Paulo', 'SP', 30), ('Rio de Janeiro', 'RJ', 15), ('Belo Horizonte', 'MG', 8),
+          ('Curitiba', 'PR', 6), ('Porto Alegre', 'RS', 6), ('Salvador', 'BA', 5), ('Recife', 'PE', 5),
+          ('Fortaleza', 'CE', 4), ('Campinas', 'SP', 4), ('Goiânia', 'GO', 3), ('Florianópolis', 'SC', 3),
+          ('Natal', 'RN', 2), ('Manaus', 'AM', 2), ('Belém', 'PA', 2)]
+CATEGORY_NAMES = ['Eletrônicos', 'Vestuário', 'Casa', 'Livros', 'Papelaria', 'Brinquedos', 'Esporte',
+                  'Beleza', 'Alimentos', 'Bebidas', 'Ferramentas', 'Jardim', 'Informática', 'Celulares',
+                  'Calçados', 'Acessórios', 'Pet', 'Automotivo', 'Saúde', 'Decoração']
+PRODUCT_WORDS = ['Kit', 'Conjunto', 'Caixa', 'Pacote', 'Modelo', 'Linha', 'Edição', 'Versão']
+PRODUCT_ADJECTIVES = ['Premium', 'Básico', 'Plus', 'Compacto', 'Pro', 'Clássico', 'Slim', 'Max', 'Eco']
+UNITS = [('un', 85), ('kg', 8), ('l', 4), ('cx', 3)]
+CUSTOMER_STATUS = [('active', 80), ('inactive', 12), ('prospect', 8)]
+SALE_STATUS = [('completed', 86), ('pending', 9), ('cancelled', 5)]
+PAYMENT_METHODS = [('pix', 40), ('cartao_credito', 30), ('cartao_debito', 15), ('dinheiro', 10), ('boleto', 5)]
+ACCOUNTS = [('Caixa Principal', 'caixa'), ('Banco do Brasil', 'banco'), ('Nubank', 'banco'),
+            ('Cartão Corporativo', 'cartao')]
+# Conta que recebe cada forma de pagamento (índice em ACCOUNTS)
+PAYMENT_ACCOUNT = {'dinheiro': 0, 'pix': 2, 'boleto': 1, 'cartao_credito': 1, 'cartao_debito': 1}
+MONTHLY_EXPENSES = [('Aluguel', 'Aluguel', 0.05), ('Salários', 'Pessoal', 0.12),
+                    ('Energia elétrica', 'Utilidades', 0.01), ('Internet e telefone', 'Utilidades', 0.004),
+                    ('Contabilidade', 'Serviços', 0.008)]
+EVENT_TYPES = [('meeting', 40), ('call', 25), ('task', 25), ('reminder', 10)]
+EVENT_PRIORITIES = [('normal', 60), ('low', 15), ('high', 20), ('urgent', 5)]
+APPOINTMENT_TYPES = [('consulta', 50), ('reunião', 30), ('visita', 20)]
+# Fator de vendas por mês (jan..dez) e por dia da semana (seg..dom)
+MONTH_FACTOR = [0.85, 0.8, 0.9, 0.92, 1.0, 0.95, 0.97, 1.0, 0.98, 1.05, 1.35, 1.6]
+WEEKDAY_FACTOR = [0.9, 0.95, 1.0, 1.0, 1.15, 1.3, 0.6]
+
+def build_profile(scale=1.0, **overrides):
+    """Volumes para a escala informada; valores explícitos têm prioridade"""
+    profile = dict(BASE_PROFILE)
+    for key in ('products', 'customers', 'sales', 'events', 'appointments'):
+        profile[key] = max(1, int(round(profile[key] * scale)))
+    profile['categories'] = max(1, int(round(BASE_PROFILE['categories'] * math.sqrt(scale))))
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    return profile
+
+class _Weighted:
+    """Sorteio ponderado em O(log n), opcionalmente limitado aos n primeiros itens"""
+
+    def __init__(self, rng, weights):
+        self.rng = rng
+        self.cumulative = list(accumulate(weights))
+
+    def pick(self, limit=None):
+        limit = limit or len(self.cumulative)
+        return bisect(self.cumulative, self.rng.random() * self.cumulative[limit - 1], 0, limit - 1)
+
+def _choice(rng, options):
+    return rng.choices([value for value, _ in options], weights=[weight for _, weight in options])[0]
+
+def _geometric(rng, p, limit):
+    value = 0
+    while value < limit and rng.random() > p:
+        value += 1
+    return value
+
+class SyntheticData:
+    """Gera e grava os dados em uma conexão, em ordem cronológica"""
+
+    # Ordem de gravação dos lotes (pais antes dos filhos)
+    TABLES = [User.__table__, Account.__table__, Category.__table__, Product.__table__,
+              Customer.__table__, Sale.__table__, SaleItem.__table__, Invoice.__table__,
+              StockMovement.__table__, Transaction.__table__, Event.__table__, Appointment.__table__]
+
+    def __init__(self, connection, profile, seed, end):
+        self.connection = connection
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.end = end
+        self.start = end - timedelta(days=profile['days'] - 1)
+        self.buffers = {table: [] for table in self.TABLES}
+        self.pending = 0
+        self.counts = {table.name: 0 for table in self.TABLES}
+        self.ids = {table.name: 0 for table in self.TABLES}
+
+    def _next_id(self, table):
+        self.ids[table.name] += 1
+        return self.ids[table.name]
+
+    def _add(self, table, row):
+        self.buffers[table].append(row)
+        self.pending += 1
+        if self.pending >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        for table in self.TABLES:
+            rows = self.buffers[table]
+            if rows:
+                self.connection.execute(table.insert(), rows)
+                self.counts[table.name] += len(rows)
+                self.buffers[table] = []
+        self.pending = 0
+
+    def _moment(self, day, start_hour=8, end_hour=20, peak_hour=14):
+        hours = self.rng.triangular(start_hour, end_hour, peak_hour)
+        return datetime(day.year, day.month, day.day) + timedelta(seconds=int(hours * 3600))
+
+    def _spread(self, count, existing_share):
+        """Datas de criação: parte antes do período, o resto crescendo até o fim"""
+        before = datetime(self.start.year, self.start.month, self.start.day) - timedelta(days=365)
+        moments = []
+        for _ in range(count):
+            if self.rng.random() < existing_share:
+                offset = self.rng.random() * 365
+                moments.append(before + timedelta(days=offset))
+            else:
+                # Densidade crescente ao longo do período
+                offset = math.sqrt(self.rng.random()) * self.profile['days']
+                moments.append(datetime(self.start.year, self.start.month, self.start.day)
+                               + timedelta(days=offset))
+        moments.sort()
+        return [moment.replace(microsecond=0) for moment in moments]
+
+    def users(self):
+        hasher = User()
+        hasher.set_password('admin123')
+        password_hash = hasher.password_hash
+        created = datetime(self.start.year, self.start.month, self.start.day) - timedelta(days=400)
+        self._add(User.__table__, {
+            'id': self._next_id(User.__table__), 'username': 'admin', 'email': 'admin@erp.com',
+            'password_hash': password_hash, 'first_name': 'Administrador', 'last_name': 'Sistema',
+            'role': 'admin', 'is_active': True, 'created_at': created,
+        })
+        for index in range(1, self.profile['users']):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            self._add(User.__table__, {
+                'id': self._next_id(User.__table__), 'username': f'vendedor{index}',
+                'email': f'vendedor{index}@erp.com', 'password_hash': password_hash,
+                'first_name': first, 'last_name': last, 'role': 'manager' if index == 1 else 'user',
+                'is_active': True, 'created_at': created,
+            })
+        self.user_ids = list(range(1, self.ids['user'] + 1))
+
+    def accounts(self):
+        created = datetime(self.start.year, self.start.month, self.start.day)
+        self.account_balances = []
+        for name, account_type in ACCOUNTS:
+            initial = round(self.rng.uniform(1000, 20000), 2)
+            self.account_balances.append(initial)
+            self._add(Account.__table__, {
+                'id': self._next_id(Account.__table__), 'name': name, 'account_type': account_type,
+                'initial_balance': initial, 'current_balance': initial, 'is_active': True,
+                'created_at': created,
+            })
+
+    def categories(self):
+        created = datetime(self.start.year, self.start.month, self.start.day) - timedelta(days=365)
+        for index in range(self.profile['categories']):
+            base = CATEGORY_NAMES[index % len(CATEGORY_NAMES)]
+            round_ = index // len(CATEGORY_NAMES)
+            name = base if round_ == 0 else f'{base} {round_ + 1}'
+            slug = name.lower().replace(' ', '-')
+            self._add(Category.__table__, {
+                'id': self._next_id(Category.__table__), 'name': name, 'slug': slug,
+                'description': f'Produtos de {name.lower()}', 'is_active': True, 'created_at': created,
+            })
+
+    def products(self):
+        count = self.profile['products']
+        category_weights = [1 / (rank ** ZIPF_EXPONENT) for rank in range(1, self.profile['categories'] + 1)]
+        categories = _Weighted(self.rng, category_weights)
+        ranks = list(range(1, count + 1))
+        self.rng.shuffle(ranks)
+
+        self.product_created = self._spread(count, existing_share=0.7)
+        self.product_price = []
+        self.product_cost = []
+        self.product_stock = []
+        self.product_min = []
+        self.product_max = []
+        popularity = []
+        for index, created in enumerate(self.product_created):
+            product_id = self._next_id(Product.__table__)
+            weight = 1 / (ranks[index] ** ZIPF_EXPONENT)
+            popularity.append(weight)
+            cost = round(min(5000.0, self.rng.lognormvariate(3.2, 0.9)), 2)
+            price = round(cost * self.rng.uniform(1.3, 2.2), 2)
+            # Produtos populares têm estoque maior
+            maximum = int(40 + 400 * weight ** 0.5 * self.rng.uniform(0.5, 1.5))
+            minimum = max(2, maximum // 5)
+            self.product_cost.append(cost)
+            self.product_price.append(price)
+            self.product_min.append(minimum)
+            self.product_max.append(maximum)
+            self.product_stock.append(0)
+            adjective = self.rng.choice(PRODUCT_ADJECTIVES)
+            self._add(Product.__table__, {
+                'id': product_id,
+                'name': f'{self.rng.choice(PRODUCT_WORDS)} {adjective} {product_id:06d}',
+                'description': f'Produto sintético {product_id}',
+                'sku': f'SKU-{product_id:07d}',
+                'barcode': f'789{self.rng.randrange(10 ** 9, 10 ** 10)}',
+                'category_id': categories.pick() + 1,
+                'cost_price': cost, 'sale_price': price,
+                'current_stock': 0, 'min_stock': minimum, 'max_stock': maximum,
+                'unit': _choice(self.rng, UNITS), 'is_active': self.rng.random() > 0.03,
+                'created_at': created, 'updated_at': created,
+            })
+        self.popular_products = _Weighted(self.rng, popularity)
+
+    def customers(self):
+        self.customer_created = self._spread(self.profile['customers'], existing_share=0.3)
+        spend = []
+        for created in self.customer_created:
+            customer_id = self._next_id(Customer.__table__)
+            spend.append(self.rng.paretovariate(PARETO_ALPHA))
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            city, state = _choice(self.rng, [((city, state), weight) for city, state, weight in CITIES])
+            company = self.rng.random() < 0.15
+            document = (f'{self.rng.randrange(10 ** 13, 10 ** 14)}' if company
+                        else f'{self.rng.randrange(10 ** 10, 10 ** 11)}')
+            self._add(Customer.__table__, {
+                'id': customer_id,
+                'name': f'{first} {last} {customer_id}',
+                'email': f'{first.lower()}.{last.lower()}.{customer_id}@exemplo.com.br',
+                'phone': f'({self.rng.randint(11, 99)}) 9{self.rng.randint(1000, 9999)}-{self.rng.randint(1000, 9999)}',
+                'instagram': f'@{first.lower()}{customer_id}' if self.rng.random() < 0.35 else None,
+                'address': f'Rua {self.rng.choice(LAST_NAMES)}, {self.rng.randint(1, 3000)}',
+                'city': city, 'state': state, 'zip_code': f'{self.rng.randint(10000, 99999)}-000',
+                'company': f'{last} Comércio Ltda' if company else None,
+                'cpf_cnpj': document, 'status': _choice(self.rng, CUSTOMER_STATUS),
+                'created_at': created, 'updated_at': created,
+            })
+        self.spending_customers = _Weighted(self.rng, spend)
+
+    def _day_weights(self):
+        weights = []
+        for offset in range(self.profile['days']):
+            day = self.start + timedelta(days=offset)
+            trend = 0.7 + 0.6 * offset / max(1, self.profile['days'] - 1)
+            # Black Friday: última sexta de novembro e o fim de semana seguinte
+            black_friday = day.month == 11 and day.day >= 22 and day.weekday() in (4, 5, 6)
+            weights.append(trend * MONTH_FACTOR[day.month - 1] * WEEKDAY_FACTOR[day.weekday()]
+                           * (2.5 if black_friday else 1))
+        total = sum(weights)
+        return [weight / total for weight in weights]
+
+    def _movement(self, product, movement_type, quantity, moment, reference, user_id):
+        previous = self.product_stock[product]
+        if movement_type == 'entrada':
+            new = previous + quantity
+        else:
+            new = previous - quantity
+        self.product_stock[product] = new
+        cost = self.product_cost[product]
+        self._add(StockMovement.__table__, {
+            'id': self._next_id(StockMovement.__table__), 'product_id': product + 1,
+            'movement_type': movement_type, 'quantity': quantity,
+            'previous_stock': previous, 'new_stock': new,
+            'unit_cost': cost, 'total_cost': round(cost * quantity, 2),
+            'reference': reference, 'notes': None, 'user_id': user_id, 'movement_date': moment,
+        })
+
+    def _transaction(self, account, transaction_type, category, description, amount, day,
+                     status, user_id, moment, due_date=None, payment_method=None, reference=None):
+        if status == 'completed':
+            sign = 1 if transaction_type == 'receita' else -1
+            self.account_balances[account] = round(self.account_balances[account] + sign * amount, 2)
+        self._add(Transaction.__table__, {
+            'id': self._next_id(Transaction.__table__), 'account_id': account + 1,
+            'transaction_type': transaction_type, 'category': category, 'description': description,
+            'amount': amount, 'transaction_date': day, 'due_date': due_date, 'status': status,
+            'payment_method': payment_method, 'reference': reference, 'notes': None,
+            'user_id': user_id, 'created_at': moment,
+        })
+
+    def _restock(self, product, moment):
+        quantity = self.product_max[product] - self.product_stock[product]
+        if quantity <= 0:
+            return
+        self.restock_sequence += 1
+        reference = f'NF-C{self.restock_sequence:08d}'
+        self._movement(product, 'entrada', quantity, moment, reference, 1)
+        self.restock_cost += self.product_cost[product] * quantity
+
+    def _sale(self, day, moment, customers_available, products_available, day_index):
+        sale_id = self._next_id(Sale.__table__)
+        customer = self.spending_customers.pick(customers_available) + 1
+        user_id = self.rng.choice(self.user_ids[1:] or self.user_ids)
+        status = _choice(self.rng, SALE_STATUS)
+        payment_method = _choice(self.rng, PAYMENT_METHODS)
+
+        items = 1 + _geometric(self.rng, 0.45, 9)
+        chosen = {}
+        for _ in range(items):
+            product = self.popular_products.pick(products_available)
+            chosen[product] = chosen.get(product, 0) + 1 + _geometric(self.rng, 0.65, 5)
+
+        subtotal = 0.0
+        for product, quantity in chosen.items():
+            price = self.product_price[product]
+            total = round(price * quantity, 2)
+            subtotal += total
+            self._add(SaleItem.__table__, {
+                'id': self._next_id(SaleItem.__table__), 'sale_id': sale_id, 'product_id': product + 1,
+                'quantity': quantity, 'unit_price': price, 'total_price': total,
+            })
+            if status != 'cancelled':
+                if self.product_stock[product] < quantity:
+                    self._restock(product, moment - timedelta(minutes=30))
+                self._movement(product, 'saida', quantity, moment, f'VENDA-{sale_id}', user_id)
+
+        discount = round(subtotal * self.rng.choice((0.05, 0.1, 0.15)), 2) if self.rng.random() < 0.12 else 0.0
+        total_amount = round(subtotal - discount, 2)
+        self._add(Sale.__table__, {
+            'id': sale_id, 'customer_id': customer, 'user_id': user_id, 'sale_date': moment,
+            'total_amount': total_amount, 'discount': discount, 'tax': 0.0, 'status': status,
+            'payment_method': payment_method, 'notes': None,
+        })
+
+        if status == 'cancelled':
+            return
+        account = PAYMENT_ACCOUNT[payment_method]
+        due = day + timedelta(days=30)
+        if status == 'completed':
+            self._transaction(account, 'receita', 'Vendas', f'Venda #{sale_id}', total_amount, day,
+                              'completed', user_id, moment, payment_method=payment_method,
+                              reference=f'VENDA-{sale_id}')
+        else:
+            self._transaction(account, 'receita', 'Vendas', f'Venda #{sale_id} (a receber)', total_amount,
+                              day, 'pending', user_id, moment, due_date=due, payment_method=payment_method,
+                              reference=f'VENDA-{sale_id}')
+
+        if self.rng.random() < 0.4:
+            if status == 'completed':
+                invoice_status, paid, payment_date = 'paid', total_amount, day
+            elif due < self.end:
+                invoice_status, paid, payment_date = 'overdue', 0.0, None
+            else:
+                invoice_status, paid, payment_date = 'pending', 0.0, None
+            invoice_id = self._next_id(Invoice.__table__)
+            self._add(Invoice.__table__, {
+                'id': invoice_id, 'invoice_number': f'NF-{invoice_id:08d}', 'customer_id': customer,
+                'sale_id': sale_id, 'issue_date': day, 'due_date': due, 'total_amount': total_amount,
+                'paid_amount': paid, 'status': invoice_status, 'payment_date': payment_date,
+                'notes': None, 'created_at': moment,
+            })
+
+    def _monthly_expenses(self, day, moment):
+        # Despesas fixas proporcionais ao faturamento médio mensal
+        monthly_revenue = self.average_ticket * self.profile['sales'] / (self.profile['days'] / 30)
+        for description, category, share in MONTHLY_EXPENSES:
+            amount = round(monthly_revenue * share * self.rng.uniform(0.95, 1.05), 2)
+            self._transaction(1, 'despesa', category, f'{description} {day:%m/%Y}', amount, day,
+                              'completed', 1, moment, due_date=day, payment_method='boleto')
+
+    def _agenda(self, day, day_index, events_per_day, appointments_per_day, carry, customers_available):
+        past = day <= self.end
+        weekday = day.weekday() < 5
+        carry['events'] += events_per_day * (1.3 if weekday else 0.25)
+        while carry['events'] >= 1:
+            carry['events'] -= 1
+            start = self._moment(day, 8, 18, 11).replace(minute=0, second=0)
+            duration = self.rng.choice((15, 30, 60, 60, 90, 120))
+            all_day = self.rng.random() < 0.05
+            self._add(Event.__table__, {
+                'id': self._next_id(Event.__table__),
+                'title': f'{_choice(self.rng, EVENT_TYPES).capitalize()} {self.ids["event"]}',
+                'description': None, 'start_date': start, 'end_date': start + timedelta(minutes=duration),
+                'location': self.rng.choice((None, 'Escritório', 'Loja', 'Online')),
+                'event_type': _choice(self.rng, EVENT_TYPES), 'priority': _choice(self.rng, EVENT_PRIORITIES),
+                'status': ('completed' if self.rng.random() < 0.9 else 'cancelled') if past else 'scheduled',
+                'is_all_day': all_day, 'reminder_minutes': self.rng.choice((5, 15, 30, 60)),
+                'user_id': self.rng.choice(self.user_ids), 'created_at': start - timedelta(days=3),
+            })
+
+        carry['appointments'] += appointments_per_day * (1.2 if weekday else 0.5)
+        while carry['appointments'] >= 1:
+            carry['appointments'] -= 1
+            start = self._moment(day, 8, 19, 15).replace(second=0)
+            start = start.replace(minute=start.minute - start.minute % 15)
+            if past:
+                status = 'completed' if self.rng.random() < 0.8 else 'cancelled'
+            else:
+                status = 'confirmed' if self.rng.random() < 0.3 else 'scheduled'
+            appointment_type = _choice(self.rng, APPOINTMENT_TYPES)
+            self._add(Appointment.__table__, {
+                'id': self._next_id(Appointment.__table__),
+                'customer_id': self.spending_customers.pick(customers_available) + 1,
+                'user_id': self.rng.choice(self.user_ids), 'title': f'{appointment_type.capitalize()}',
+                'description': None, 'appointment_date': start,
+                'duration_minutes': self.rng.choice((30, 45, 60, 60, 90)),
+                'appointment_type': appointment_type, 'status': status,
+                'location': self.rng.choice((None, 'Loja', 'Cliente', 'Online')), 'notes': None,
+                'reminder_sent': past, 'created_at': start - timedelta(days=self.rng.randint(1, 14)),
+            })
+
+    def generate(self, progress=None):
+        self.users()
+        self.accounts()
+        self.categories()
+        self.products()
+        self.customers()
+
+        self.restock_sequence = 0
+        self.average_ticket = sum(self.product_price) / len(self.product_price) * 2.5
+        start_moment = datetime(self.start.year, self.start.month, self.start.day)
+        # Carga inicial de estoque dos produtos já existentes no início do período
+        self.restock_cost = 0.0
+        for product, created in enumerate(self.product_created):
+            if created <= start_moment:
+                self._restock(product, start_moment)
+
+        weights = self._day_weights()
+        total_days = self.profile['days'] + FUTURE_DAYS
+        events_per_day = self.profile['events'] / total_days
+        appointments_per_day = self.profile['appointments'] / total_days
+        # Começa em 0,5 para arredondar (e não truncar) os totais
+        carry = {'sales': 0.5, 'events': 0.5, 'appointments': 0.5}
+        customers_available = products_available = 0
+
+        for day_index in range(total_days):
+            day = self.start + timedelta(days=day_index)
+            # Cadastros do dia só entram nas vendas a partir do dia seguinte
+            day_start = datetime(day.year, day.month, day.day)
+            while customers_available < len(self.customer_created) and \
+                    self.customer_created[customers_available] < day_start:
+                customers_available += 1
+            while products_available < len(self.product_created) and \
+                    self.product_created[products_available] < day_start:
+                if self.product_created[products_available] > start_moment:
+                    self._restock(products_available, self.product_created[products_available])
+                products_available += 1
+            customers_available = customers_available or 1
+            products_available = products_available or 1
+
+            if day_index < self.profile['days']:
+                self.restock_cost = 0.0
+                carry['sales'] += self.profile['sales'] * weights[day_index]
+                while carry['sales'] >= 1:
+                    carry['sales'] -= 1
+                    self._sale(day, self._moment(day), customers_available, products_available, day_index)
+
+                # Reposição no fim do dia dos produtos abaixo do mínimo
+                evening = datetime(day.year, day.month, day.day, 18, 30)
+                for product in range(products_available):
+                    if self.product_stock[product] <= self.product_min[product]:
+                        self._restock(product, evening)
+                if self.restock_cost:
+                    self._transaction(1, 'despesa', 'Compras', f'Compra de mercadorias {day:%d/%m/%Y}',
+                                      round(self.restock_cost, 2), day, 'completed', 1, evening,
+                                      due_date=day, payment_method='boleto')
+                if day.day == 5:
+                    self._monthly_expenses(day, datetime(day.year, day.month, day.day, 9))
+
+            self._agenda(day, day_index, events_per_day, appointments_per_day, carry, customers_available)
+            if progress and day_index % 30 == 0:
+                progress(day_index, total_days)
+
+        self.flush()
+
+        # Estoque final e saldos (updated_at explícito para não cair no onupdate)
+        updated = datetime(self.end.year, self.end.month, self.end.day, 23, 59, 59)
+        self.connection.execute(
+            Product.__table__.update().where(Product.__table__.c.id == bindparam('b_id')),
+            [{'b_id': index + 1, 'current_stock': stock, 'updated_at': updated}
+             for index, stock in enumerate(self.product_stock)]
+        )
+        self.connection.execute(
+            Account.__table__.update().where(Account.__table__.c.id == bindparam('b_id')),
+            [{'b_id': index + 1, 'current_balance': balance}
+             for index, balance in enumerate(self.account_balances)]
+        )
+        return self.counts
+
+def _synthetic_app(database):
+    class SyntheticConfig(config_module.Config):
+        SQLALCHEMY_DATABASE_URI = database
+        SQL_WORKLOAD_FILE = None
+        SLOW_QUERY_MS = None
+        SQL_INSTRUMENTATION = False
+        METRICS_ENABLED = False
+
+    config_module.config['synthetic'] = SyntheticConfig
+    return create_app('synthetic')
+
+def generate_database(database=DEFAULT_DATABASE, scale=1.0, seed=42, end=None, reset=False,
+                      progress=None, **overrides):
+    """
+    Cria e preenche o banco `database`. Retorna o total de linhas por tabela.
+    Recusa bancos com dados, a menos que reset=True (que recria as tabelas).
+    """
+    profile = build_profile(scale, **overrides)
+    end = end or date.today()
+    app = _synthetic_app(database)
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            os.makedirs(os.path.dirname(os.path.abspath(engine.url.database)), exist_ok=True)
+        if reset:
+            db.drop_all()
+        db.create_all()
+
+        with engine.connect() as connection:
+            existing = sum(connection.execute(select(func.count()).select_from(table)).scalar()
+                           for table in SyntheticData.TABLES)
+        if existing:
+            raise RuntimeError('O banco já tem dados; use --reset para recriá-lo')
+
+        # Índices secundários atrasam a carga: removidos e recriados no final
+        indexes = [index for table in SyntheticData.TABLES for index in table.indexes]
+        for index in indexes:
+            index.drop(bind=engine)
+
+        with engine.connect() as connection:
+            if engine.dialect.name == 'sqlite':
+                connection.connection.dbapi_connection.execute('PRAGMA synchronous=OFF')
+            with connection.begin():
+                counts = SyntheticData(connection, profile, seed, end).generate(progress)
+
+        for index in indexes:
+            index.create(bind=engine)
+        if engine.dialect.name == 'sqlite':
+            with engine.begin() as connection:
+                connection.exec_driver_sql('ANALYZE')
+
+        rebuild_rollups()
+        db.session.remove()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerador de dados sintéticos para benchmarks')
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help='URL do banco (padrão: instance/synthetic.db)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplicador dos volumes (1 ≈ 140 mil linhas)')
+    parser.add_argument('--seed', type=int, default=42, help='semente do gerador')
+    parser.add_argument('--end', type=date.fromisoformat, help='última data com vendas (AAAA-MM-DD, padrão: hoje)')
+    parser.add_argument('--reset', action='store_true', help='apaga e recria as tabelas do banco')
+    for key in ('customers', 'products', 'categories', 'sales', 'events', 'appointments', 'days', 'users'):
+        parser.add_argument(f'--{key}', type=int, help=f'quantidade de {key} (sobrepõe a escala)')
+    args = parser.parse_args()
+
+    overrides = {key: getattr(args, key) for key in BASE_PROFILE}
+    profile = build_profile(args.scale, **overrides)
+    print(f"🏭 Gerando dados sintéticos em {args.database} (semente {args.seed})")
+    print("   " + ", ".join(f"{key}={value}" for key, value in profile.items()))
+
+    def progress(day, total):
+        print(f"   ... dia {day}/{total}", end='\r', flush=True)
+
+    started = time.perf_counter()
+    try:
+        counts = generate_database(args.database, args.scale, args.seed, args.end, args.reset,
+                                   progress, **overrides)
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        return False
+    elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    print("\n" + "=" * 50)
+    for table, count in counts.items():
+        print(f"   {table:<16} {count:>12,}".replace(',', '.'))
+    print(f"✅ {total:,} linhas em {elapsed:.1f}s ({total / elapsed:,.0f} linhas/s)".replace(',', '.'))
+    print("👤 Login: admin / admin123")
+    return True
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark do typeahead de produtos (app/services/typeahead.py).
+
+Monta o índice de trigramas sobre um catálogo sintético em memória (mesmo
+formato de nome, SKU e código de barras do synthetic_data.py) e mede a
+carga completa, a atualização incremental e as consultas típicas do ponto
+de venda:
+
+    sku        SKU completo               barcode    código de barras lido
+    prefixo    começo do SKU              troca      dois dígitos trocados
+    errado     um dígito errado           nome       parte do nome e do número
+
+Para as consultas com erro de digitação, "acerto" é a fração em que o
+produto procurado está entre os resultados. Termina com código 1 se o p95
+de algum tipo de consulta passar de --max-p95 ms.
+
+Uso:
+    python tools/benchmarks/typeahead_benchmark.py
+    python tools/benchmarks/typeahead_benchmark.py --products 100000 --queries 2000 --max-p95 5
+    python tools/benchmarks/typeahead_benchmark.py --json typeahead.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', '..'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from app.services.typeahead import ProductTypeahead, TYPEAHEAD_LIMIT
+from synthetic_data import PRODUCT_ADJECTIVES, PRODUCT_WORDS
+
+def catalog(rng, size):
+    return [
+        {'id': product_id,
+         'name': f'{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_ADJECTIVES)} {product_id:06d}',
+         'sku': f'SKU-{product_id:07d}',
+         'barcode': f'789{rng.randrange(10 ** 9, 10 ** 10)}',
+         'is_active': True}
+        for product_id in range(1, size + 1)
+    ]
+
+def _swap(rng, code):
+    digits = list(code)
+    index = rng.randrange(3, len(digits) - 1)
+    digits[index], digits[index + 1] = digits[index + 1], digits[index]
+    return ''.join(digits)
+
+def _wrong(rng, code):
+    index = rng.randrange(3, len(code))
+    digit = rng.choice([char for char in '0123456789' if char != code[index]])
+    return code[:index] + digit + code[index + 1:]
+
+# Tipo de consulta -> (texto a partir do produto, se o acerto é medido)
+QUERIES = {
+    'sku': (lambda rng, row: row['sku'], True),
+    'barcode': (lambda rng, row: row['barcode'], True),
+    'prefixo': (lambda rng, row: row['sku'][:rng.randint(5, 9)], False),
+    'troca': (lambda rng, row: _swap(rng, row['barcode']), True),
+    'errado': (lambda rng, row: _wrong(rng, row['barcode']), True),
+    'nome': (lambda rng, row: f"{row['name'].split()[1][:4]} {row['name'][-4:]}", True),
+}
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run(products, queries, seed, limit):
+    rng = random.Random(seed)
+    rows = catalog(rng, products)
+
+    index = ProductTypeahead()
+    started = time.perf_counter()
+    index.load(rows)
+    load_seconds = time.perf_counter() - started
+
+    # Atualização incremental: 1% dos produtos renomeados
+    changed = rng.sample(rows, max(1, products // 100))
+    started = time.perf_counter()
+    for row in changed:
+        index.upsert(row['id'], dict(row, name=row['name'] + ' Novo'))
+    upsert_ms = (time.perf_counter() - started) * 1000 / len(changed)
+
+    results = {}
+    for kind, (make, measured) in QUERIES.items():
+        latencies, found = [], 0
+        for _ in range(queries):
+            row = rng.choice(rows)
+            text = make(rng, row)
+            started = time.perf_counter()
+            matches = index.search(text, limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found += any(product_id == row['id'] for product_id, _, _ in matches)
+        results[kind] = {
+            'p50_ms': round(_percentile(latencies, 0.5), 3),
+            'p95_ms': round(_percentile(latencies, 0.95), 3),
+            'max_ms': round(max(latencies), 3),
+            'recall': round(found / queries, 3) if measured else None,
+        }
+    return {'products': products, 'load_seconds': round(load_seconds, 2),
+            'upsert_ms': round(upsert_ms, 3), 'queries': results}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do typeahead de produtos')
+    parser.add_argument('--products', type=int, default=100000, help='tamanho do catálogo')
+    parser.add_argument('--queries', type=int, default=1000, help='consultas por tipo')
+    parser.add_argument('--limit', type=int, default=TYPEAHEAD_LIMIT, help='resultados por consulta')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-p95', type=float, default=5.0, help='p95 máximo por tipo de consulta (ms)')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    print(f"🔎 Typeahead: {args.products} produtos, {args.queries} consultas por tipo")
+    summary = run(args.products, args.queries, args.seed, args.limit)
+    print(f"   carga completa: {summary['load_seconds']}s | atualização: {summary['upsert_ms']} ms/produto")
+    print("=" * 60)
+    print(f"{'consulta':<10} {'p50':>9} {'p95':>9} {'máx':>9} {'acerto':>8}")
+
+    slow = []
+    for kind, result in summary['queries'].items():
+        recall = '-' if result['recall'] is None else f"{result['recall']:.0%}"
+        print(f"{kind:<10} {result['p50_ms']:>7}ms {result['p95_ms']:>7}ms {result['max_ms']:>7}ms {recall:>8}")
+        if result['p95_ms'] > args.max_p95:
+            slow.append(kind)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(summary, output, indent=2)
+        print(f"\n✅ Resultado gravado em {args.json}")
+
+    if slow:
+        print(f"\n❌ p95 acima de {args.max_p95:g} ms: {', '.join(slow)}")
+        sys.exit(1)
+    print(f"\n✅ p95 abaixo de {args.max_p95:g} ms em todas as consultas")
+
+if __name__ == '__main__':
+    main()
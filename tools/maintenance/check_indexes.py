@@ -1,9 +1,80 @@
 #!/usr/bin/env python3
 """
-Script para verificar todos os índices da tabela customer
+Verificação e assistente de índices do banco.
+
+Comandos:
+    list    - índices da tabela customer (verificação original, padrão)
+    record  - navega pelas telas (GET) com um administrador durante um
+              período e grava o SQL executado (workload); exportações,
+              monitoração e APIs ficam de fora, exceto as de
+              WORKLOAD_API_URLS, chamadas com os parâmetros das telas
+    advise  - roda EXPLAIN QUERY PLAN em cada SELECT distinto do workload,
+              aponta varreduras completas (SCAN) e ordenações em B-tree
+              temporária e propõe CREATE INDEX, ordenados pelo tempo
+              economizado estimado
+
+O workload também pode ser gravado pela própria aplicação ou por uma rodada
+de testes com SQL_WORKLOAD_FILE (ver app/services/sql_workload.py).
+
+A estimativa de economia é medida em uma cópia do banco: cada comando
+afetado é executado antes e depois de criar o índice proposto, e a diferença
+é multiplicada pelo número de execuções gravadas. Com --no-measure, usa-se
+o tempo gravado dos comandos afetados (limite superior).
+
+Uso:
+    python tools/maintenance/check_indexes.py
+    python tools/maintenance/check_indexes.py record --output workload.jsonl --duration 60
+    SQL_WORKLOAD_FILE=workload.jsonl python -m pytest scripts/tests
+    python tools/maintenance/check_indexes.py advise workload.jsonl --db instance/erp.db
 """
 
+import argparse
+import json
+import os
+import re
+import shutil
 import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from app.services.sql_workload import load_workload, WorkloadRecorder
+
+DEFAULT_DB = 'instance/erp.db'
+
+# Máximo de colunas por índice proposto
+MAX_INDEX_COLUMNS = 4
+
+# Execuções de cada comando na medição (vale a menor)
+MEASURE_REPEAT = 3
+
+_NAME = r'(?:"([^"]+)"|(\w+))'
+_COLUMN = _NAME + r'\.' + _NAME
+_OPERATOR = r'(<=|>=|<>|!=|=|<|>|\bNOT\s+IN\b|\bIN\b|\bIS\s+NOT\b|\bIS\b|\bBETWEEN\b|\bNOT\s+LIKE\b|\bLIKE\b)'
+_PREDICATE = re.compile(_COLUMN + r'\s*' + _OPERATOR, re.IGNORECASE)
+_JOIN_RIGHT = re.compile(r'(?<![<>!])=\s*' + _COLUMN)
+_KEYWORDS = r'(?:WHERE|JOIN|LEFT|INNER|OUTER|CROSS|ON|ORDER|GROUP|LIMIT|UNION)\b'
+_SOURCE = re.compile(r'\b(?:FROM|JOIN)\s+' + _NAME + r'(?:\s+(?:AS\s+)?(?!' + _KEYWORDS + r')' + _NAME + r')?',
+                     re.IGNORECASE)
+_CLAUSE_END = re.compile(r'\b(?:LIMIT|OFFSET|UNION|HAVING)\b|\)', re.IGNORECASE)
+
+# Telas que não entram na navegação do `record`: alteram estado, exportam
+# tabelas inteiras, servem monitoração ou são APIs (que precisam de parâmetros)
+SKIP_ENDPOINTS = {'static', 'auth.logout', 'main.create_backup'}
+_SKIP_ENDPOINT = re.compile(r'\.export')
+_SKIP_RULE = re.compile(r'/api/|^/stats/|^/metrics$')
+
+# APIs visitadas com os parâmetros que as telas usam ({start}/{end}: mês atual)
+WORKLOAD_API_URLS = [
+    '/schedule/api/events?start={start}&end={end}',
+    '/schedule/api/appointments?start={start}&end={end}',
+]
+
+EQUALITY = {'=', 'IN', 'IS'}
+RANGE = {'<', '>', '<=', '>=', 'BETWEEN'}
 
 def check_indexes():
     db_path = 'instance/erp.db'
@@ -79,5 +150,357 @@ def check_indexes():
         print(f"❌ Erro durante a verificação: {e}")
         return False
 
+def _name(quoted, bare):
+    return quoted or bare
+
+def _schema(conn):
+    """Colunas e índices (listas de colunas) de cada tabela"""
+    tables = {}
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                                 "AND name NOT LIKE 'sqlite_%'").fetchall():
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+        indexes = []
+        for row in conn.execute(f'PRAGMA index_list("{table}")'):
+            indexes.append([info[2] for info in conn.execute(f'PRAGMA index_info("{row[1]}")')])
+        tables[table] = {'columns': columns, 'indexes': indexes}
+    return tables
+
+def _aliases(statement, tables):
+    """Nome ou apelido usado no comando -> tabela"""
+    aliases = {}
+    for match in _SOURCE.finditer(statement):
+        table = _name(match.group(1), match.group(2))
+        if table not in tables:
+            continue
+        alias = _name(match.group(3), match.group(4))
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+def _column(match, offset, aliases, tables):
+    table = aliases.get(_name(match.group(offset), match.group(offset + 1)))
+    column = _name(match.group(offset + 2), match.group(offset + 3))
+    if table and column in tables[table]['columns']:
+        return table, column
+    return None
+
+def _predicates(statement, aliases, tables):
+    """{tabela: {'eq': [...], 'range': [...]}} das condições após o FROM"""
+    start = re.search(r'\bFROM\b', statement, re.IGNORECASE)
+    text = statement[start.start():] if start else statement
+    predicates = {}
+
+    def add(found, kind):
+        if found:
+            columns = predicates.setdefault(found[0], {'eq': [], 'range': []})[kind]
+            if found[1] not in columns:
+                columns.append(found[1])
+
+    for match in _PREDICATE.finditer(text):
+        operator = ' '.join(match.group(5).upper().split())
+        if operator in EQUALITY:
+            add(_column(match, 1, aliases, tables), 'eq')
+        elif operator in RANGE:
+            add(_column(match, 1, aliases, tables), 'range')
+    # Lado direito das junções (a.x = b.y)
+    for match in _JOIN_RIGHT.finditer(text):
+        add(_column(match, 1, aliases, tables), 'eq')
+    return predicates
+
+def _clause_columns(statement, keyword, aliases, tables):
+    """Colunas do último ORDER BY / GROUP BY do comando, na ordem"""
+    positions = [match.end() for match in re.finditer(keyword, statement, re.IGNORECASE)]
+    if not positions:
+        return []
+    text = statement[positions[-1]:]
+    end = _CLAUSE_END.search(text)
+    text = text[:end.start()] if end else text
+    columns = []
+    for match in re.finditer(_COLUMN, text):
+        found = _column(match, 1, aliases, tables)
+        if found and found not in columns:
+            columns.append(found)
+    return columns
+
+def _single_table(columns):
+    tables = {table for table, _ in columns}
+    return tables.pop() if len(tables) == 1 else None
+
+def _covered(columns, indexes):
+    return any(index[:len(columns)] == columns for index in indexes)
+
+def _propose(table, equality, tail, tables):
+    columns = []
+    for column in equality + tail:
+        if column not in columns:
+            columns.append(column)
+    columns = columns[:MAX_INDEX_COLUMNS]
+    if not columns or columns == ['id'] or _covered(columns, tables[table]['indexes']):
+        return None
+    return columns
+
+def _issues(statement, params, conn, tables):
+    """Problemas do plano de um SELECT e as colunas propostas para cada um"""
+    plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', params).fetchall()]
+    aliases = _aliases(statement, tables)
+    predicates = _predicates(statement, aliases, tables)
+    order = _clause_columns(statement, r'\bORDER\s+BY\b', aliases, tables)
+    group = _clause_columns(statement, r'\bGROUP\s+BY\b', aliases, tables)
+
+    issues = []
+    for detail in plan:
+        scan = re.match(r'SCAN (\S+)$', detail)
+        if scan:
+            table = aliases.get(scan.group(1).strip('"'))
+            if not table:
+                continue
+            found = predicates.get(table, {'eq': [], 'range': []})
+            if order and _single_table(order) == table:
+                tail = [column for _, column in order]
+            else:
+                tail = found['range'][:1]
+            issues.append({'kind': 'scan', 'detail': detail, 'table': table,
+                           'columns': _propose(table, found['eq'], tail, tables)})
+        elif detail.startswith('USE TEMP B-TREE FOR'):
+            columns = group if 'GROUP BY' in detail else order
+            table = _single_table(columns)
+            if not table:
+                issues.append({'kind': 'sort', 'detail': detail, 'table': None, 'columns': None})
+                continue
+            equality = predicates.get(table, {'eq': []})['eq']
+            issues.append({'kind': 'sort', 'detail': detail, 'table': table,
+                           'columns': _propose(table, equality, [column for _, column in columns], tables)})
+    return issues
+
+def _timed(conn, statement, params):
+    best = None
+    for _ in range(MEASURE_REPEAT):
+        started = time.perf_counter()
+        conn.execute(statement, params).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _measure(conn, proposal):
+    """Tempo (ms) do workload afetado antes e depois de criar o índice"""
+    columns = ', '.join(f'"{column}"' for column in proposal['columns'])
+    before = sum(_timed(conn, s['statement'], s['params']) * s['count'] for s in proposal['statements'])
+    conn.execute(f'CREATE INDEX advisor_candidate ON "{proposal["table"]}" ({columns})')
+    try:
+        after = sum(_timed(conn, s['statement'], s['params']) * s['count'] for s in proposal['statements'])
+        used = any('advisor_candidate' in row[3]
+                   for s in proposal['statements']
+                   for row in conn.execute(f'EXPLAIN QUERY PLAN {s["statement"]}', s['params']))
+    finally:
+        conn.execute('DROP INDEX advisor_candidate')
+    return before, after, used
+
+def _snapshot(db_path, directory):
+    """Cópia consistente do banco para EXPLAIN e medições"""
+    target = os.path.join(directory, 'advisor.db')
+    source = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    copy = sqlite3.connect(target)
+    try:
+        source.backup(copy)
+    finally:
+        source.close()
+    return copy
+
+def analyze_workload(workload, db_path, measure=True):
+    """
+    Analisa o workload (ver load_workload) contra o banco em `db_path`.
+    Retorna (problemas por comando, índices propostos ordenados pela
+    economia estimada em ms)
+    """
+    directory = tempfile.mkdtemp(prefix='index-advisor-')
+    conn = _snapshot(db_path, directory)
+    try:
+        tables = _schema(conn)
+        findings = []
+        proposals = {}
+
+        for statement, entry in workload.items():
+            if not re.match(r'\s*(SELECT|WITH)\b', statement, re.IGNORECASE):
+                continue
+            if 'sqlite_master' in statement:
+                continue
+            params = entry['params']
+            params = tuple(params) if isinstance(params, list) else params
+            try:
+                issues = _issues(statement, params, conn, tables)
+            except sqlite3.Error:
+                continue
+            if not issues:
+                continue
+            findings.append({'statement': statement, 'count': entry['count'],
+                             'total_ms': round(entry['total_ms'], 3), 'issues': issues})
+
+            for issue in issues:
+                if not issue['columns']:
+                    continue
+                key = (issue['table'], tuple(issue['columns']))
+                proposal = proposals.setdefault(key, {
+                    'table': issue['table'], 'columns': issue['columns'],
+                    'reasons': [], 'statements': [], 'count': 0, 'observed_ms': 0.0,
+                })
+                if issue['kind'] not in proposal['reasons']:
+                    proposal['reasons'].append(issue['kind'])
+                if all(s['statement'] != statement for s in proposal['statements']):
+                    proposal['statements'].append({'statement': statement, 'params': params,
+                                                   'count': entry['count']})
+                    proposal['count'] += entry['count']
+                    proposal['observed_ms'] += entry['total_ms']
+
+        ranked = []
+        for proposal in proposals.values():
+            name = 'ix_' + '_'.join([proposal['table']] + proposal['columns'])
+            columns = ', '.join(proposal['columns'])
+            proposal['sql'] = f'CREATE INDEX {name} ON "{proposal["table"]}" ({columns});'
+            if measure:
+                before, after, used = _measure(conn, proposal)
+                proposal.update(before_ms=round(before, 3), after_ms=round(after, 3), used=used,
+                                saved_ms=round(before - after, 3) if used else 0.0)
+            else:
+                proposal['saved_ms'] = round(proposal['observed_ms'], 3)
+            proposal['observed_ms'] = round(proposal['observed_ms'], 3)
+            for item in proposal['statements']:
+                item['params'] = list(item['params']) if isinstance(item['params'], tuple) else item['params']
+            ranked.append(proposal)
+        ranked.sort(key=lambda proposal: proposal['saved_ms'], reverse=True)
+        return findings, ranked
+    finally:
+        conn.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _short(statement, size=110):
+    return statement if len(statement) <= size else statement[:size - 3] + '...'
+
+def advise(paths, db_path, top, measure, json_path):
+    print("🔍 Analisando o workload gravado...")
+    print("=" * 70)
+
+    workload = load_workload(paths)
+    executions = sum(entry['count'] for entry in workload.values())
+    recorded = sum(entry['total_ms'] for entry in workload.values())
+    print(f"✅ {len(workload)} comandos distintos, {executions} execuções, {recorded:.1f} ms gravados")
+
+    findings, proposals = analyze_workload(workload, db_path, measure)
+
+    print(f"\n⚠️  Comandos com varredura completa ou ordenação temporária: {len(findings)}")
+    for finding in sorted(findings, key=lambda item: item['total_ms'], reverse=True)[:top]:
+        kinds = ', '.join(sorted({issue['detail'] for issue in finding['issues']}))
+        print(f"   - {finding['count']}x, {finding['total_ms']:.1f} ms: {kinds}")
+        print(f"     {_short(finding['statement'])}")
+
+    useful = [proposal for proposal in proposals if proposal['saved_ms'] > 0]
+    print(f"\n💡 Índices propostos (por tempo economizado estimado): {len(useful)}")
+    for position, proposal in enumerate(useful[:top], 1):
+        print(f"{position:>3}. {proposal['sql']}")
+        detail = (f"antes {proposal['before_ms']:.1f} ms, depois {proposal['after_ms']:.1f} ms"
+                  if measure else f"até {proposal['observed_ms']:.1f} ms gravados")
+        print(f"     economia: {proposal['saved_ms']:.1f} ms em {proposal['count']} execuções "
+              f"({len(proposal['statements'])} comandos; {', '.join(proposal['reasons'])}) - {detail}")
+
+    discarded = len(proposals) - len(useful)
+    if discarded:
+        print(f"\n   {discarded} proposta(s) sem ganho medido foram descartadas")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as output:
+            json.dump({'findings': findings, 'proposals': proposals}, output, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultado gravado em {json_path}")
+    return proposals
+
+def _skipped(rule):
+    return (rule.endpoint in SKIP_ENDPOINTS or _SKIP_ENDPOINT.search(rule.endpoint)
+            or _SKIP_RULE.search(rule.rule))
+
+def _default_urls(app, today=None):
+    """Telas GET sem parâmetros na URL e as APIs de WORKLOAD_API_URLS"""
+    urls = []
+    for rule in app.url_map.iter_rules():
+        if 'GET' not in rule.methods or rule.arguments or _skipped(rule):
+            continue
+        urls.append(rule.rule)
+    today = today or date.today()
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    urls += [url.format(start=start.isoformat(), end=end.isoformat()) for url in WORKLOAD_API_URLS]
+    return sorted(urls)
+
+def record(output, duration, urls, config_name):
+    from app import create_app, db
+    from app.models.user import User
+
+    app = create_app(config_name)
+    with app.app_context():
+        user = User.query.filter_by(role='admin', is_active=True).first()
+        if not user:
+            print("❌ Nenhum administrador ativo para navegar pelas telas")
+            return False
+        user_id = user.id
+
+    urls = urls or _default_urls(app)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    print(f"🎬 Gravando o SQL de {len(urls)} telas por {duration:g}s em {output}...")
+    requests = 0
+    errors = {}
+    with app.app_context():
+        recorder = WorkloadRecorder(db.engine, output).start()
+    try:
+        deadline = time.monotonic() + duration
+        while True:
+            for url in urls:
+                try:
+                    status = client.get(url).status_code
+                except Exception as e:
+                    status = type(e).__name__
+                if status != 200:
+                    errors[url] = status
+                requests += 1
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        recorder.stop()
+
+    print(f"✅ {requests} requisições gravadas")
+    for url, status in sorted(errors.items()):
+        print(f"   ⚠️  {url}: {status}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificação e assistente de índices')
+    parser.set_defaults(command='list')
+    commands = parser.add_subparsers(dest='command')
+
+    commands.add_parser('list', help='índices da tabela customer')
+
+    recording = commands.add_parser('record', help='grava o SQL de uma navegação pelas telas')
+    recording.add_argument('--output', default='workload.jsonl', help='arquivo JSON Lines de saída')
+    recording.add_argument('--duration', type=float, default=30, help='segundos de navegação')
+    recording.add_argument('--url', action='append', help='tela a visitar (padrão: todas sem parâmetros)')
+    recording.add_argument('--config', default=None, help='configuração da aplicação (padrão: FLASK_ENV)')
+
+    advising = commands.add_parser('advise', help='propõe índices a partir de workloads gravados')
+    advising.add_argument('workload', nargs='+', help='arquivos JSON Lines gravados')
+    advising.add_argument('--db', default=DEFAULT_DB, help='banco SQLite analisado (é copiado)')
+    advising.add_argument('--top', type=int, default=10, help='itens exibidos por seção')
+    advising.add_argument('--no-measure', action='store_true',
+                          help='não mede na cópia do banco; usa o tempo gravado')
+    advising.add_argument('--json', help='grava o resultado neste arquivo')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.output, args.duration, args.url, args.config)
+    elif args.command == 'advise':
+        advise(args.workload, args.db, args.top, not args.no_measure, args.json)
+    else:
+        check_indexes()
+
 if __name__ == "__main__":
-    check_indexes()
+    main()